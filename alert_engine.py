@@ -0,0 +1,190 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from services.database import to_epoch_ms
+
+class AlertState:
+    """Alert state of one metric in one area"""
+
+    __slots__ = ('raised', 'severity', 'above_since', 'below_since', 'raised_at', 'peak')
+
+    def __init__(self):
+        self.raised = False
+        self.severity = None
+        self.above_since = None   # first reading over the threshold while normal
+        self.below_since = None   # first reading under the clear level while raised
+        self.raised_at = None
+        self.peak = None
+
+class AlertEngine:
+    """Per-area, per-metric threshold alerts with hysteresis and hold times.
+
+    A metric goes normal -> raised once it has stayed above its threshold
+    for ``raise_hold`` seconds, and back to normal (an alert with state
+    ``cleared``) once it has stayed below ``threshold * clear_ratio`` for
+    ``clear_hold`` seconds. Readings between the two levels keep the
+    current state, so a value hovering at the threshold cannot flap.
+    While raised, an alert is only emitted again when it escalates from
+    medium to high severity. Each reading costs one dict lookup per metric.
+
+    Hold times are measured on the readings' own timestamps, so a late or
+    replayed batch behaves as it would have live. The state machines are
+    kept per process, but every alert must first be claimed: with a
+    ``db_manager`` the claim is made in the shared database, so when
+    several workers raise the same alert within ``cooldown`` seconds only
+    the first one stores and sends it.
+
+    ``thresholds`` is read on every evaluation, so updates made through
+    the thresholds API apply immediately.
+    """
+
+    def __init__(self, thresholds: Dict[str, float], metrics: Sequence[str] = ('methane', 'co'),
+                 clear_ratio: float = 0.9, raise_hold: float = 0.0, clear_hold: float = 300.0,
+                 high_ratio: float = 1.5, forecast_window: float = 3600.0,
+                 cooldown: float = 300.0, db_manager=None):
+        self.thresholds = thresholds
+        self.metrics = tuple(metrics)
+        self.clear_ratio = clear_ratio
+        self.raise_hold = raise_hold
+        self.clear_hold = clear_hold
+        self.high_ratio = high_ratio
+        self.forecast_window = forecast_window
+        self.cooldown = cooldown
+        self.db_manager = db_manager
+
+        self._lock = threading.Lock()
+        self._states = {}      # (area_id, metric) -> AlertState
+        self._claimed_at = {}  # alert key -> time it was last claimed, without a db_manager
+
+    def state(self, area_id, metric: str) -> AlertState:
+        key = (area_id, metric)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = AlertState()
+        return state
+
+    def active_alerts(self) -> List[Dict]:
+        """Metrics currently in the raised state"""
+        with self._lock:
+            return [
+                {'area_id': area_id, 'type': metric, 'severity': state.severity,
+                 'raised_at': state.raised_at, 'peak': state.peak}
+                for (area_id, metric), state in self._states.items() if state.raised
+            ]
+
+    def claim(self, key: str, now: float, window: float) -> bool:
+        """Whether this process should emit the alert ``key``; False within ``window`` of the last claim"""
+        if self.db_manager is not None:
+            return self.db_manager.claim_alert(key, now, window)
+
+        with self._lock:
+            claimed_at = self._claimed_at.get(key)
+            if claimed_at is not None and now < claimed_at + window:
+                return False
+            self._claimed_at[key] = now
+            return True
+
+    def evaluate(self, reading: Dict, now: Optional[float] = None) -> List[Dict]:
+        """Advance the state machines with one reading; returns alerts to store and notify"""
+        if now is None:
+            now = (reading['ts'] if 'ts' in reading else to_epoch_ms(reading['timestamp'])) / 1000
+        alerts = []
+
+        with self._lock:
+            for metric in self.metrics:
+                threshold = self.thresholds.get(metric)
+                value = reading.get(metric)
+                if threshold is None or value is None:
+                    continue
+
+                alert = self._advance(self.state(reading['area_id'], metric), metric, value, threshold, now)
+                if alert:
+                    alert.update({
+                        'type': metric,
+                        'area_id': reading['area_id'],
+                        'value': value,
+                        'threshold': threshold,
+                        'timestamp': reading['timestamp']
+                    })
+                    alerts.append(alert)
+
+        return [alert for alert in alerts
+                if self.claim(f"{alert['area_id']}:{alert['type']}:{alert['state']}", now, self.cooldown)]
+
+    def _advance(self, state: AlertState, metric: str, value: float, threshold: float,
+                 now: float) -> Optional[Dict]:
+        severity = 'high' if value > threshold * self.high_ratio else 'medium'
+
+        if value > threshold:
+            state.below_since = None
+            if state.raised:
+                state.peak = max(state.peak, value)
+                if severity == 'high' and state.severity != 'high':
+                    state.severity = 'high'
+                    return {'state': 'escalated', 'severity': 'high'}
+                return None
+
+            if state.above_since is None:
+                state.above_since = now
+            if now - state.above_since < self.raise_hold:
+                return None
+
+            state.raised = True
+            state.severity = severity
+            state.raised_at = now
+            state.peak = value
+            state.above_since = None
+            return {'state': 'raised', 'severity': severity}
+
+        # At or below the threshold: a pending raise is abandoned
+        state.above_since = None
+        if not state.raised:
+            return None
+        if value >= threshold * self.clear_ratio:
+            # Inside the hysteresis band: stay raised and restart the clear hold
+            state.below_since = None
+            return None
+
+        if state.below_since is None:
+            state.below_since = now
+        if now - state.below_since < self.clear_hold:
+            return None
+
+        alert = {'state': 'cleared', 'severity': 'low', 'peak': state.peak,
+                 'duration': now - state.raised_at}
+        state.raised = False
+        state.severity = None
+        state.below_since = None
+        state.raised_at = None
+        state.peak = None
+        return alert
+
+    def evaluate_forecast(self, area_id, forecast: List[Dict],
+                          now: Optional[float] = None) -> Optional[Dict]:
+        """Coalesce every dangerous forecast point into at most one warning per area per window"""
+        now = time.time() if now is None else now
+
+        dangerous = [
+            point for point in forecast
+            if any(point.get(metric, 0) > self.thresholds[metric]
+                   for metric in self.metrics if metric in self.thresholds)
+        ]
+        if not dangerous:
+            return None
+
+        if not self.claim(f'{area_id}:forecast_warning', now, self.forecast_window):
+            return None
+
+        return {
+            'type': 'forecast_warning',
+            'area_id': area_id,
+            'severity': 'medium',
+            'predicted_time': dangerous[0]['timestamp'],
+            'predicted_until': dangerous[-1]['timestamp'],
+            'dangerous_points': len(dangerous),
+            'predicted_values': {
+                metric: max(point[metric] for point in dangerous)
+                for metric in self.metrics if metric in dangerous[0]
+            }
+        }
@@ -1,26 +1,158 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import sqlite3
 import json
+import logging
 from datetime import datetime, timedelta
-import threading
+import atexit
+import base64
+from itertools import chain, islice
+import multiprocessing
+import os
 import time
-from services.database import DatabaseManager
+from services.database import DatabaseManager, DatabaseBusy, ROLLUP_RESOLUTIONS, READING_FIELDS, ALERT_FIELDS
 from services.sms_service import SMSService
-from ml.forecasting import ForecastingModel
+from services.notification_queue import NotificationQueue
+from services.alert_engine import AlertEngine
+from ml.forecasting import FORECAST_COLUMNS
+from ml.model_registry import ModelRegistry
+from ml.forecast_cache import ForecastCache
 from ingestion.data_processor import DataProcessor
+from ingestion.ingest_writer import IngestWriter, IngestQueueFull
+from services.reading_buffer import ReadingBuffer
+from services.event_stream import EventBroadcaster, TooManySubscribers
+from services.scheduler import ForecastScheduler
+from services.retention import RetentionManager
+from services.log_config import configure_logging, parse_module_levels
+from services.json_provider import FastJSONProvider
+from services.metrics import metrics
+
+# Leveled logging through a queue drained by a background thread, so request
+# threads never block on stdout; LEMOS_LOG_LEVELS sets per-module levels such
+# as 'services.database=WARNING' and 1 in LEMOS_LOG_SAMPLE_RATE debug lines is kept
+configure_logging(
+    level=os.environ.get('LEMOS_LOG_LEVEL', 'INFO'),
+    module_levels=parse_module_levels(os.environ.get('LEMOS_LOG_LEVELS')),
+    json_format=os.environ.get('LEMOS_LOG_FORMAT', 'text') == 'json',
+    sample_rate=int(os.environ.get('LEMOS_LOG_SAMPLE_RATE', 100))
+)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# orjson for request bodies and responses when it is installed
+app.json = FastJSONProvider(app)
+# Bodies past LEMOS_MAX_BODY_BYTES get a 413 before they are read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('LEMOS_MAX_BODY_BYTES', 64 * 1024 * 1024))
 CORS(app)
 
 # Initialize services
-db_manager = DatabaseManager()
+# Request threads share the pooled connections; one that waits longer than
+# LEMOS_DB_POOL_TIMEOUT seconds for a free connection gets a 503
+db_manager = DatabaseManager(
+    os.environ.get('LEMOS_DB_PATH', 'lemos.db'),
+    pool_size=int(os.environ.get('LEMOS_DB_POOL_SIZE', 8)),
+    pool_timeout=float(os.environ.get('LEMOS_DB_POOL_TIMEOUT', 5))
+)
+DB_RETRY_AFTER = os.environ.get('LEMOS_DB_RETRY_AFTER', '1')
+
+# Timings, counters and queue depths for /api/metrics; every gunicorn worker
+# writes its own under LEMOS_METRICS_DIR and a scrape adds them up
+metrics.configure(
+    enabled=os.environ.get('LEMOS_METRICS', '1') == '1',
+    directory=os.environ.get('LEMOS_METRICS_DIR', f'{db_manager.db_path}.metrics'),
+    flush_interval=float(os.environ.get('LEMOS_METRICS_FLUSH_INTERVAL', 5))
+)
 sms_service = SMSService()
-forecasting_model = ForecastingModel()
+# Alerts are queued in the database and sent by background workers, so a
+# request that raises an alert never waits on Twilio
+notification_queue = NotificationQueue(
+    db_manager,
+    sms_service,
+    workers=int(os.environ.get('LEMOS_SMS_WORKERS', 4)),
+    max_attempts=int(os.environ.get('LEMOS_SMS_MAX_ATTEMPTS', 5)),
+    rate_limit=int(os.environ.get('LEMOS_SMS_RATE_LIMIT', 5)),
+    rate_window=float(os.environ.get('LEMOS_SMS_RATE_WINDOW', 60)),
+    dedup_window=float(os.environ.get('LEMOS_SMS_DEDUP_WINDOW', 300))
+)
+model_registry = ModelRegistry(
+    model_dir=os.environ.get('LEMOS_MODEL_DIR', 'models/'),
+    max_loaded=int(os.environ.get('LEMOS_MAX_LOADED_MODELS', 16)),
+    retrain_interval=float(os.environ.get('LEMOS_RETRAIN_INTERVAL', 24 * 3600)),
+    # 'none' lets workers memory-map and share model arrays; or e.g. 'zlib:3', 'lz4'
+    compression=os.environ.get('LEMOS_MODEL_COMPRESSION', 'none')
+)
+forecast_cache = ForecastCache(
+    max_entries=int(os.environ.get('LEMOS_FORECAST_CACHE_SIZE', 512)),
+    ttl=float(os.environ.get('LEMOS_FORECAST_CACHE_TTL', 300))
+)
 data_processor = DataProcessor()
+# Recent readings per area in memory, for /api/current and short windows
+reading_buffer = ReadingBuffer(
+    db_manager,
+    capacity=int(os.environ.get('LEMOS_RECENT_BUFFER_SIZE', 512)),
+    refresh_interval=float(os.environ.get('LEMOS_RECENT_BUFFER_REFRESH', 1.0))
+)
+# Live readings and alerts for /api/stream subscribers
+event_broadcaster = EventBroadcaster(
+    db_manager,
+    replay_size=int(os.environ.get('LEMOS_STREAM_REPLAY_SIZE', 2000)),
+    poll_interval=float(os.environ.get('LEMOS_STREAM_POLL_INTERVAL', 1.0)),
+    # Each stream holds one of the worker's threads for as long as it is open
+    max_subscribers=int(os.environ.get('LEMOS_STREAM_MAX_SUBSCRIBERS', 64))
+)
+STREAM_RETRY_AFTER = os.environ.get('LEMOS_STREAM_RETRY_AFTER', '30')
+
+def on_readings_committed(readings, ids):
+    """Publish readings once they are committed, from the request or the ingest writer"""
+    reading_buffer.add(readings, ids)
+    event_broadcaster.notify()
+    metrics.inc('lemos_readings_stored_total', len(readings))
+
+# Ingest mode: 'sync' commits inside the request, 'async' hands readings to
+# a background writer that group-commits them
+INGEST_MODE = os.environ.get('LEMOS_INGEST_MODE', 'sync')
+INGEST_RETRY_AFTER = os.environ.get('LEMOS_INGEST_RETRY_AFTER', '1')
+ingest_writer = None
+
+if INGEST_MODE == 'async':
+    ingest_writer = IngestWriter(
+        db_manager,
+        max_pending=int(os.environ.get('LEMOS_INGEST_QUEUE_SIZE', 10000)),
+        batch_size=int(os.environ.get('LEMOS_INGEST_BATCH_SIZE', 500)),
+        flush_interval=float(os.environ.get('LEMOS_INGEST_FLUSH_INTERVAL', 0.25)),
+        on_commit=on_readings_committed
+    )
+    ingest_writer.start()
+    atexit.register(ingest_writer.stop)
+
+atexit.register(model_registry.shutdown, wait=False)
+
+metrics.register_gauge('lemos_ingest_queue_depth', lambda: ingest_writer.depth() if ingest_writer else None,
+                       'Requests waiting for the group-commit writer')
+metrics.register_gauge('lemos_stream_subscribers', lambda: event_broadcaster.subscribers,
+                       'Open /api/stream connections')
+metrics.register_gauge('lemos_sms_outbox_messages',
+                       lambda: {(('status', status),): count for status, count in notification_queue.counts().items()},
+                       'SMS outbox messages by status', shared=True)
+
+# Payload formats accepted by the ingest endpoints
+MULTI_ZONE_AREAS = ['area_1', 'area_2', 'area_3']
+REQUIRED_FIELDS = ['area_id', 'methane', 'co', 'temperature', 'humidity', 'water_level']
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+MAX_BATCH_ROWS = int(os.environ.get('LEMOS_MAX_BATCH_ROWS', 50000))
+# Batch rows older than this many seconds are backfill: stored, but never alerted on
+BATCH_ALERT_WINDOW = float(os.environ.get('LEMOS_BATCH_ALERT_WINDOW', 300))
+
+# Largest page a limit= query may ask for
+MAX_PAGE_SIZE = int(os.environ.get('LEMOS_MAX_PAGE_SIZE', 10000))
+
+# format= for row listings: a dict per row, or field names once and a
+# value array per row; readings can also come back as one array per field
+ROW_FORMATS = ('objects', 'rows')
+READING_FORMATS = ('objects', 'rows', 'columns')
 
 # Global variables for real-time monitoring
-latest_readings = {}
 alert_thresholds = {
     'methane': 1000,  # ppm
     'co': 50,         # ppm
@@ -28,6 +160,53 @@ alert_thresholds = {
     'humidity': 80     # percentage
 }
 
+# Thresholds are passed by reference so /api/thresholds updates apply at once
+alert_engine = AlertEngine(
+    alert_thresholds,
+    clear_ratio=float(os.environ.get('LEMOS_ALERT_CLEAR_RATIO', 0.9)),
+    raise_hold=float(os.environ.get('LEMOS_ALERT_RAISE_HOLD', 0)),
+    clear_hold=float(os.environ.get('LEMOS_ALERT_CLEAR_HOLD', 300)),
+    forecast_window=float(os.environ.get('LEMOS_FORECAST_WARNING_WINDOW', 3600)),
+    cooldown=float(os.environ.get('LEMOS_ALERT_COOLDOWN', 300)),
+    db_manager=db_manager
+)
+
+def error_response(e):
+    """500 with the error message, or 503 when no database connection came free in time"""
+    if isinstance(e, DatabaseBusy):
+        logger.warning("Rejecting request: %s", e)
+        return jsonify({'error': str(e)}), 503, {'Retry-After': DB_RETRY_AFTER}
+    return jsonify({'error': str(e)}), 500
+
+@app.errorhandler(DatabaseBusy)
+def database_busy(e):
+    return error_response(e)
+
+@app.errorhandler(RequestEntityTooLarge)
+def body_too_large(e):
+    return jsonify({'error': f"Body exceeds {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def observe_request(response):
+    """Time each request by route pattern, so ids in paths do not add series"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('lemos_http_request_duration_seconds', time.perf_counter() - started,
+                        route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.route('/api/metrics')
+def get_metrics():
+    """All workers' metrics in the Prometheus text format"""
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/')
 def dashboard():
     """Main dashboard page"""
@@ -37,37 +216,33 @@ def dashboard():
 def receive_readings():
     """Receive sensor readings from Arduino"""
     try:
-        data = request.get_json()
+        with metrics.timer('lemos_ingest_stage_duration_seconds', stage='parse'):
+            # None for a body that is not JSON, which the check below turns into a 400
+            data = request.get_json(silent=True)
         
-        print(f"Received data: {data}")
+        logger.debug("Received reading payload: %s", data)
         
-        if 'area_1' in data and 'area_2' in data and 'area_3' in data:
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object'}), 400
+        
+        if is_multi_zone(data):
             # Multi-zone format from single ESP32
-            processed_readings = []
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='process'):
+                processed_readings = [
+                    data_processor.process_reading(area_data)
+                    for area_data in expand_multi_zone(data)
+                ]
             
-            for area_key in ['area_1', 'area_2', 'area_3']:
-                area_data = data[area_key]
-                
-                # Add shared sensor data to each area
-                area_data['water_level'] = data.get('water_level', 0)
-                area_data['soil_moisture'] = data.get('soil_moisture', 0)
-                area_data['vibration'] = data.get('vibration', 0)
-                area_data['ir_detection'] = data.get('ir_detection', 0)
-                area_data['timestamp'] = data.get('timestamp', datetime.now().isoformat())
-                area_data['device_id'] = data.get('device_id', 'ESP32_MultiZone')
-                
-                # Process and store each area's data
-                processed_data = data_processor.process_reading(area_data)
-                db_manager.store_reading(processed_data)
-                processed_readings.append(processed_data)
-                
-                # Update latest readings
-                latest_readings[area_data['area_id']] = processed_data
-                
-                # Check for alerts
-                check_alerts(processed_data)
-                
-                print(f"Successfully stored reading for area {area_data['area_id']}")
+            # Store all areas together, then publish and check alerts
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='store'):
+                persist_readings(processed_readings)
+            
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='alerts'):
+                for processed_data in processed_readings:
+                    # Check for alerts
+                    check_alerts(processed_data)
+                    
+                    logger.debug("Stored reading for area %s", processed_data['area_id'], extra={'area_id': processed_data['area_id']})
             
             return jsonify({
                 'status': 'success', 
@@ -77,43 +252,358 @@ def receive_readings():
         
         else:
             # Single-zone format (backward compatibility)
-            required_fields = ['area_id', 'methane', 'co', 'temperature', 'humidity', 'water_level']
-            missing_fields = [field for field in required_fields if field not in data]
+            missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
             
             if missing_fields:
-                print(f"Missing required fields: {missing_fields}")
+                logger.info("Rejected reading with missing fields: %s", missing_fields)
                 return jsonify({'error': f'Missing required fields: {missing_fields}'}), 400
             
             # Process and store data
-            processed_data = data_processor.process_reading(data)
-            db_manager.store_reading(processed_data)
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='process'):
+                processed_data = data_processor.process_reading(data)
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='store'):
+                persist_readings([processed_data])
             
-            # Update latest readings
-            latest_readings[data['area_id']] = processed_data
-            
-            print(f"Successfully stored reading for area {data['area_id']}")
+            logger.debug("Stored reading for area %s", processed_data['area_id'], extra={'area_id': processed_data['area_id']})
             
             # Check for alerts
-            check_alerts(processed_data)
+            with metrics.timer('lemos_ingest_stage_duration_seconds', stage='alerts'):
+                check_alerts(processed_data)
             
             return jsonify({'status': 'success', 'message': 'Reading stored successfully'})
     
+    except IngestQueueFull as e:
+        logger.warning("Rejecting reading: %s", e)
+        return jsonify({'error': str(e)}), 503, {'Retry-After': INGEST_RETRY_AFTER}
+    
+    except ValueError as e:
+        # DataProcessor rejected the reading, e.g. a NaN value
+        logger.info("Rejected reading: %s", e)
+        return jsonify({'error': str(e)}), 400
+    
+    except DatabaseBusy as e:
+        return error_response(e)
+    
+    except RequestEntityTooLarge as e:
+        return body_too_large(e)
+    
+    except Exception as e:
+        logger.exception("Error processing reading")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/readings/batch', methods=['POST'])
+def receive_readings_batch():
+    """Receive a backlog of readings as a JSON array or an NDJSON stream"""
+    try:
+        payloads = parse_batch_payload()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if len(payloads) > MAX_BATCH_ROWS:
+        return jsonify({'error': f'Batch exceeds {MAX_BATCH_ROWS} rows'}), 413
+    
+    try:
+        # Flatten every payload into raw per-area readings, remembering which row each came from
+        results = []
+        raw_readings = []
+        row_indexes = []
+        
+        for index, data in enumerate(payloads):
+            if isinstance(data, Exception):
+                results.append({'index': index, 'status': 'error', 'error': str(data)})
+                continue
+            
+            if not isinstance(data, dict):
+                results.append({'index': index, 'status': 'error', 'error': 'Row must be a JSON object'})
+                continue
+            
+            if is_multi_zone(data):
+                try:
+                    area_readings = expand_multi_zone(data)
+                except ValueError as e:
+                    results.append({'index': index, 'status': 'error', 'error': str(e)})
+                    continue
+            else:
+                missing_fields = [field for field in REQUIRED_FIELDS if field not in data]
+                if missing_fields:
+                    results.append({'index': index, 'status': 'error',
+                                    'error': f'Missing required fields: {missing_fields}'})
+                    continue
+                area_readings = [data]
+            
+            results.append({'index': index, 'status': 'ok', 'areas': []})
+            raw_readings.extend(area_readings)
+            row_indexes.extend([len(results) - 1] * len(area_readings))
+        
+        # Validate everything in one pass; a bad area rejects its whole row
+        processed = data_processor.process_batch(raw_readings)
+        
+        for result_index, (processed_data, error) in zip(row_indexes, processed):
+            result = results[result_index]
+            if error:
+                result.update({'status': 'error', 'error': error})
+                result.pop('areas', None)
+            elif result['status'] == 'ok':
+                result['areas'].append(processed_data['area_id'])
+        
+        accepted_rows = {}
+        for result_index, (processed_data, _) in zip(row_indexes, processed):
+            if results[result_index]['status'] == 'ok':
+                accepted_rows.setdefault(result_index, []).append(processed_data)
+        accepted = [reading for row in accepted_rows.values() for reading in row]
+        
+        # The whole backlog lands in a single transaction
+        try:
+            ids = db_manager.store_readings(accepted)
+        except sqlite3.IntegrityError:
+            # Something validation let through; store row by row and report the rows that fail
+            accepted, ids = [], []
+            for result_index, row in accepted_rows.items():
+                try:
+                    ids.extend(db_manager.store_readings(row))
+                except sqlite3.IntegrityError as e:
+                    results[result_index] = {'index': results[result_index]['index'],
+                                             'status': 'error', 'error': str(e)}
+                    continue
+                accepted.extend(row)
+        on_readings_committed(accepted, ids)
+        
+        for area_id in {reading['area_id'] for reading in accepted}:
+            forecast_cache.invalidate(area_id)
+        
+        # Backfilled history must not page anyone about conditions long past
+        alert_cutoff = (time.time() - BATCH_ALERT_WINDOW) * 1000
+        for processed_data in accepted:
+            if processed_data['ts'] >= alert_cutoff:
+                check_alerts(processed_data)
+        
+        rejected = sum(1 for result in results if result['status'] == 'error')
+        logger.info("Batch ingest stored %d readings, rejected %d rows", len(accepted), rejected,
+                    extra={'stored': len(accepted), 'rejected': rejected})
+        
+        return jsonify({
+            'status': 'success' if not rejected else ('partial' if accepted else 'error'),
+            'readings_stored': len(accepted),
+            'rows_rejected': rejected,
+            'results': results
+        }), (200 if accepted or not results else 400)
+    
+    except DatabaseBusy as e:
+        return error_response(e)
+    
     except Exception as e:
-        print(f"Error processing reading: {e}")
+        logger.exception("Error processing reading batch")
         return jsonify({'error': str(e)}), 500
 
+def parse_batch_payload():
+    """Decode a batch body into a list of rows; undecodable NDJSON lines become exceptions"""
+    mimetype = request.mimetype
+    
+    if mimetype in NDJSON_MIMETYPES:
+        rows = []
+        # Stream the lines and stop one past MAX_BATCH_ROWS, which is enough for the 413
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                rows.append(app.json.loads(line))
+            except ValueError as e:
+                rows.append(ValueError(f'Invalid JSON: {e}'))
+            if len(rows) > MAX_BATCH_ROWS:
+                break
+        return rows
+    
+    data = request.get_json(silent=True)
+    if data is None:
+        raise ValueError('Body must be a JSON array or NDJSON')
+    
+    return data if isinstance(data, list) else [data]
+
+def is_multi_zone(data):
+    """Whether a payload uses the three-area format sent by lemos_esp32_multi_zone"""
+    return all(area_key in data for area_key in MULTI_ZONE_AREAS)
+
+def expand_multi_zone(data):
+    """Split a multi-zone payload into one raw reading per area, leaving the payload untouched"""
+    area_readings = []
+    
+    for area_key in MULTI_ZONE_AREAS:
+        if not isinstance(data[area_key], dict):
+            raise ValueError(f'{area_key} must be a JSON object')
+        area_data = dict(data[area_key])
+        
+        # Add shared sensor data to each area
+        area_data['water_level'] = data.get('water_level', 0)
+        area_data['soil_moisture'] = data.get('soil_moisture', 0)
+        area_data['vibration'] = data.get('vibration', 0)
+        area_data['ir_detection'] = data.get('ir_detection', 0)
+        area_data['timestamp'] = data.get('timestamp', datetime.now().isoformat())
+        area_data['device_id'] = data.get('device_id', 'ESP32_MultiZone')
+        
+        area_readings.append(area_data)
+    
+    return area_readings
+
+def persist_readings(readings):
+    """Store processed readings, through the group-commit writer when enabled"""
+    if ingest_writer:
+        ingest_writer.submit(readings)
+    else:
+        ids = db_manager.store_readings(readings)
+        on_readings_committed(readings, ids)
+    
+    for area_id in {reading['area_id'] for reading in readings}:
+        forecast_cache.invalidate(area_id)
+
+def parse_fields(value, allowed):
+    """Validate a comma-separated fields= projection; None selects every column"""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {unknown}; choose from {', '.join(allowed)}")
+    return fields
+
+def encode_cursor(key):
+    """Opaque pagination cursor for a (ts, id) keyset position"""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip('=')
+
+def decode_cursor(value):
+    if not value:
+        return None
+    try:
+        ts, row_id = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        return int(ts), int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def stream_json_array(rows, chunk_rows=500, prefix=b'', suffix=b''):
+    """Serialize rows as one JSON array, encoding a chunk of rows per call"""
+    rows = iter(rows)
+    yield prefix + b'['
+    separator = b''
+    for chunk in iter(lambda: list(islice(rows, chunk_rows)), []):
+        # A chunk encodes as a JSON array; its brackets come off to splice it in
+        yield separator + app.json.dumps_bytes(chunk)[1:-1]
+        separator = b','
+    yield b']' + suffix
+
+def keyset_response(pairs, limit, row_fields=None):
+    """Stream (row, key) pairs as JSON; with a limit, return one page and its X-Next-Cursor.
+    Given row_fields, rows are value tuples sent as {"fields": [...], "rows": [[...], ...]}"""
+    headers = {}
+    if limit is None:
+        # Run the first page's query before the response starts, so a failure
+        # such as a busy pool still gets its status code
+        first = list(islice(pairs, 1))
+        rows = (row for row, _ in chain(first, pairs))
+    else:
+        # One row past the page tells whether there is a next one
+        page = list(islice(pairs, limit + 1))
+        if len(page) > limit:
+            page = page[:limit]
+            headers['X-Next-Cursor'] = encode_cursor(page[-1][1])
+            headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+        rows = [row for row, _ in page]
+    
+    if row_fields is None:
+        body = stream_json_array(rows)
+    else:
+        body = stream_json_array(rows, prefix=b'{"fields":' + app.json.dumps_bytes(row_fields) + b',"rows":',
+                                 suffix=b'}')
+    return Response(body, mimetype='application/json', headers=headers)
+
+def parse_page_args(allowed, formats=ROW_FORMATS):
+    """fields, cursor, limit and format query parameters shared by the paginated endpoints"""
+    response_format = request.args.get('format', 'objects')
+    if response_format not in formats:
+        raise ValueError(f"format must be one of: {', '.join(formats)}")
+    fields = parse_fields(request.args.get('fields'), allowed)
+    after = decode_cursor(request.args.get('cursor'))
+    limit = request.args.get('limit', type=int)
+    if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return fields, after, limit, response_format
+
 @app.route('/api/readings')
 def get_readings():
     """Get recent sensor readings"""
     try:
         hours = request.args.get('hours', 24, type=int)
         area_id = request.args.get('area_id')
+        minutes = request.args.get('minutes', type=float)
+        resolution = request.args.get('resolution', 'raw')
+        
+        if area_id:
+            try:
+                area_id = int(area_id)
+            except ValueError:
+                return jsonify({'error': 'area_id must be an integer'}), 400
+        
+        readings = None
+        if resolution == 'raw' and minutes is not None:
+            # Short windows for one area come straight from memory when it reaches back far enough
+            if area_id:
+                readings = reading_buffer.recent(area_id, minutes)
+            if readings is None:
+                readings = db_manager.get_readings(hours=minutes / 60, area_id=area_id)
+        elif resolution == 'raw':
+            # Streamed page by page, so memory stays bounded however long the window
+            try:
+                fields, after, limit, response_format = parse_page_args(READING_FIELDS, READING_FORMATS)
+                if response_format == 'columns' and (after is not None or limit is not None):
+                    raise ValueError('format=columns returns the whole window and takes no cursor or limit')
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if response_format == 'columns':
+                # One array per field in time order, encoded straight from the NumPy columns
+                columns = db_manager.get_readings_columns(area_id=area_id or None, columns=fields,
+                                                          since=datetime.now() - timedelta(hours=hours))
+                return app.json.response(columns)
+            
+            as_rows = response_format == 'rows'
+            pairs = db_manager.iter_readings(hours=hours, area_id=area_id, fields=fields, as_tuples=as_rows,
+                                             after=after, limit=None if limit is None else limit + 1)
+            return keyset_response(pairs, limit, row_fields=(fields or READING_FIELDS) if as_rows else None)
+        elif resolution in ROLLUP_RESOLUTIONS:
+            # Long ranges are served from the rollup tables, one row per bucket
+            readings = db_manager.get_rollups(resolution, hours=hours, area_id=area_id)
+        else:
+            return jsonify({
+                'error': f"resolution must be one of: raw, {', '.join(ROLLUP_RESOLUTIONS)}"
+            }), 400
         
-        readings = db_manager.get_readings(hours=hours, area_id=area_id)
         return jsonify(readings)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
+
+@app.route('/api/stream')
+def stream_events():
+    """Server-Sent Events stream of new readings and alerts"""
+    area_param = request.args.get('area_id')
+    try:
+        area_ids = {int(area_id) for area_id in area_param.split(',')} if area_param else None
+    except ValueError:
+        return jsonify({'error': 'area_id must be a comma-separated list of integers'}), 400
+    
+    # EventSource sends Last-Event-ID by itself when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    try:
+        stream = event_broadcaster.subscribe(last_event_id, area_ids)
+    except TooManySubscribers as e:
+        logger.warning("Rejecting event stream: %s", e)
+        metrics.inc('lemos_stream_rejected_total')
+        return jsonify({'error': str(e)}), 503, {'Retry-After': STREAM_RETRY_AFTER}
+    
+    return Response(
+        stream,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/forecast')
 def get_forecast():
@@ -125,30 +615,35 @@ def get_forecast():
         if not area_id:
             return jsonify({'error': 'area_id is required'}), 400
         
-        # Get historical data for forecasting
-        historical_data = db_manager.get_readings(hours=168, area_id=area_id)  # 1 week
+        # Generate forecast from the last week of data
+        forecast = forecast_area(area_id, hours)
         
-        if len(historical_data) < 10:
+        if forecast is None:
             return jsonify({'error': 'Insufficient historical data for forecasting'}), 400
         
-        # Generate forecast
-        forecast = forecasting_model.predict(historical_data, hours=hours)
-        
         return jsonify(forecast)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @app.route('/api/alerts')
 def get_alerts():
     """Get recent alerts"""
     try:
         hours = request.args.get('hours', 24, type=int)
-        alerts = db_manager.get_alerts(hours=hours)
-        return jsonify(alerts)
+        
+        try:
+            fields, after, limit, response_format = parse_page_args(ALERT_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        as_rows = response_format == 'rows'
+        pairs = db_manager.iter_alerts(hours=hours, fields=fields, after=after, as_tuples=as_rows,
+                                       limit=None if limit is None else limit + 1)
+        return keyset_response(pairs, limit, row_fields=(fields or ALERT_FIELDS) if as_rows else None)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @app.route('/api/thresholds', methods=['GET', 'POST'])
 def manage_thresholds():
@@ -171,6 +666,8 @@ def manage_thresholds():
 def system_status():
     """Get system status and latest readings"""
     try:
+        # Shared by every worker, so the answer does not depend on which one serves it
+        latest_readings = db_manager.get_latest_readings()
         total_areas = len(latest_readings)
         active_alerts = sum(1 for reading in latest_readings.values() 
                           if (reading.get('methane', 0) > alert_thresholds['methane'] or 
@@ -187,24 +684,24 @@ def system_status():
         }
         return jsonify(status)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @app.route('/api/current/<int:area_id>')
 def get_current_reading(area_id):
     """Get current/latest reading for specific area"""
     try:
         # Get the most recent reading for this area
-        readings = db_manager.get_readings(hours=1, area_id=area_id)
+        latest = reading_buffer.latest(area_id)
         
-        if not readings:
+        one_hour_ago = (datetime.now() - timedelta(hours=1)).timestamp() * 1000
+        if latest is None or latest['ts'] < one_hour_ago:
             return jsonify({'error': 'No recent readings found'}), 404
         
         # Return the most recent reading
-        latest = readings[0]
         return jsonify(latest)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
 @app.route('/api/forecast/<int:area_id>')
 def get_area_forecast(area_id):
@@ -212,99 +709,129 @@ def get_area_forecast(area_id):
     try:
         hours = request.args.get('hours', 48, type=int)
         
-        # Get historical data for forecasting
-        historical_data = db_manager.get_readings(hours=168, area_id=area_id)  # 1 week
+        # Generate forecast from the last week of data
+        forecast = forecast_area(area_id, hours)
         
-        if len(historical_data) < 10:
+        if forecast is None:
             return jsonify({'error': 'Insufficient historical data for forecasting'}), 400
         
-        # Generate forecast
-        forecast = forecasting_model.predict(historical_data, hours=hours)
-        
         return jsonify(forecast)
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return error_response(e)
 
-def check_alerts(reading):
-    """Check if reading exceeds thresholds and send alerts"""
-    alerts = []
+def forecast_area(area_id, hours):
+    """Forecast an area, served from the cache until a new reading or model arrives"""
+    marker = db_manager.get_last_reading_marker(area_id)
+    if marker is None:
+        return None
     
-    # Check methane levels
-    if reading['methane'] > alert_thresholds['methane']:
-        alert = {
-            'type': 'methane',
-            'area_id': reading['area_id'],
-            'value': reading['methane'],
-            'threshold': alert_thresholds['methane'],
-            'severity': 'high' if reading['methane'] > alert_thresholds['methane'] * 1.5 else 'medium',
-            'timestamp': reading['timestamp']
-        }
-        alerts.append(alert)
+    key = ForecastCache.make_key(area_id, hours, model_registry.version(area_id), marker)
+    forecast = forecast_cache.get(key)
     
-    # Check CO levels
-    if reading['co'] > alert_thresholds['co']:
-        alert = {
-            'type': 'co',
-            'area_id': reading['area_id'],
-            'value': reading['co'],
-            'threshold': alert_thresholds['co'],
-            'severity': 'high' if reading['co'] > alert_thresholds['co'] * 1.5 else 'medium',
-            'timestamp': reading['timestamp']
-        }
-        alerts.append(alert)
+    if forecast is None:
+        historical_data = load_forecast_history(area_id)
+        if len(historical_data['timestamp']) < 10:
+            return None
+        
+        forecast = model_registry.forecast(area_id, historical_data, hours=hours)
+        forecast_cache.put(key, forecast)
     
-    # Store alerts and send notifications
-    for alert in alerts:
+    return forecast
+
+def load_forecast_history(area_id):
+    """Last week of readings for an area as NumPy columns, ready for the forecaster"""
+    return db_manager.get_readings_columns(
+        area_id,
+        since=datetime.now() - timedelta(hours=168),
+        columns=FORECAST_COLUMNS
+    )
+
+def check_alerts(reading):
+    """Advance the alert state machines and notify on raise, escalation and clear"""
+    for alert in alert_engine.evaluate(reading):
         db_manager.store_alert(alert)
+        event_broadcaster.notify()
         
-        message = f"LEMOS ALERT: {alert['type'].upper()} level {alert['value']} exceeds threshold {alert['threshold']} in Area {alert['area_id']}"
-        sms_service.send_alert(message, alert['severity'], alert['area_id'])
-
-def background_monitoring():
-    """Background task for continuous monitoring and forecasting"""
-    while True:
-        try:
-            # Run forecasting for all areas every hour
-            for area_id in [1, 2, 3]:
-                historical_data = db_manager.get_readings(hours=168, area_id=area_id)
-                if len(historical_data) >= 10:
-                    forecast = forecasting_model.predict(historical_data, hours=48)
-                    
-                    # Check if forecast predicts dangerous levels
-                    for point in forecast:
-                        if (point['methane'] > alert_thresholds['methane'] or 
-                            point['co'] > alert_thresholds['co']):
-                            
-                            alert = {
-                                'type': 'forecast_warning',
-                                'area_id': area_id,
-                                'predicted_time': point['timestamp'],
-                                'predicted_values': {
-                                    'methane': point['methane'],
-                                    'co': point['co']
-                                },
-                                'timestamp': datetime.now().isoformat()
-                            }
-                            
-                            db_manager.store_alert(alert)
-                            message = f"LEMOS FORECAST WARNING: Dangerous levels predicted for Area {area_id} at {point['timestamp']}"
-                            sms_service.send_alert(message, 'medium', area_id)
-            
-            time.sleep(3600)  # Run every hour
-            
-        except Exception as e:
-            print(f"Background monitoring error: {e}")
-            time.sleep(300)  # Wait 5 minutes before retrying
+        metric = alert['type'].upper()
+        if alert['state'] == 'cleared':
+            message = f"LEMOS ALERT CLEARED: {metric} back below {alert['threshold']} in Area {alert['area_id']} (peak {alert['peak']})"
+        elif alert['state'] == 'escalated':
+            message = f"LEMOS ALERT ESCALATED: {metric} level {alert['value']} exceeds threshold {alert['threshold']} in Area {alert['area_id']}"
+        else:
+            message = f"LEMOS ALERT: {metric} level {alert['value']} exceeds threshold {alert['threshold']} in Area {alert['area_id']}"
+        notification_queue.send_alert(message, alert['severity'], alert['area_id'])
 
-if __name__ == '__main__':
-    # Initialize database
-    db_manager.init_database()
+def handle_scheduled_forecast(result):
+    """Cache a scheduler forecast and warn if it predicts dangerous levels"""
+    area_id = result['area_id']
+    forecast = result['forecast']
     
-    # Start background monitoring thread
-    monitoring_thread = threading.Thread(target=background_monitoring, daemon=True)
-    monitoring_thread.start()
+    if result['marker'] is not None:
+        key = ForecastCache.make_key(area_id, forecast_scheduler.hours, result['version'], result['marker'])
+        forecast_cache.put(key, forecast)
     
-    import os
+    # All dangerous points of a forecast make a single warning per window
+    alert = alert_engine.evaluate_forecast(area_id, forecast)
+    if alert:
+        alert['timestamp'] = datetime.now().isoformat()
+        db_manager.store_alert(alert)
+        event_broadcaster.notify()
+        
+        message = (f"LEMOS FORECAST WARNING: Dangerous levels predicted for Area {area_id} "
+                   f"from {alert['predicted_time']} ({alert['dangerous_points']} forecast hours)")
+        notification_queue.send_alert(message, alert['severity'], area_id)
+
+def parse_area_intervals(value):
+    """Parse per-area forecast cadences such as '1=600,2=1800' (seconds)"""
+    intervals = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        area_id, seconds = item.split('=')
+        intervals[int(area_id)] = float(seconds)
+    return intervals
+
+# Background forecasting: every process starts a scheduler, but only the one
+# holding the lock file runs passes, so gunicorn workers don't duplicate work
+forecast_scheduler = ForecastScheduler(
+    db_manager,
+    model_dir=model_registry.model_dir,
+    on_forecast=handle_scheduled_forecast,
+    lock_path=os.environ.get('LEMOS_SCHEDULER_LOCK', f'{db_manager.db_path}.scheduler.lock'),
+    interval=float(os.environ.get('LEMOS_FORECAST_INTERVAL', 3600)),
+    area_intervals=parse_area_intervals(os.environ.get('LEMOS_FORECAST_AREA_INTERVALS', '')),
+    retrain_interval=model_registry.retrain_interval,
+    compression=model_registry.compression,
+    workers=int(os.environ.get('LEMOS_FORECAST_WORKERS', 0)) or None
+)
+
+# Expired readings and alerts are purged in small chunks by one leader
+# process; LEMOS_RETENTION_DAYS=0 keeps everything
+retention_manager = RetentionManager(
+    db_manager,
+    lock_path=os.environ.get('LEMOS_RETENTION_LOCK', f'{db_manager.db_path}.retention.lock'),
+    days=float(os.environ.get('LEMOS_RETENTION_DAYS', 30)),
+    alert_days=float(os.environ['LEMOS_ALERT_RETENTION_DAYS']) if os.environ.get('LEMOS_ALERT_RETENTION_DAYS') else None,
+    rollup_days=float(os.environ.get('LEMOS_ROLLUP_RETENTION_DAYS', 365)),
+    sms_days=float(os.environ.get('LEMOS_SMS_RETENTION_DAYS', 30)),
+    archive_dir=os.environ.get('LEMOS_ARCHIVE_DIR') or None,
+    interval=float(os.environ.get('LEMOS_RETENTION_INTERVAL', 3600)),
+    chunk_size=int(os.environ.get('LEMOS_RETENTION_CHUNK', 1000))
+)
+
+# Pool processes re-import this module; they must not migrate or start
+# schedulers of their own. Every other process brings the schema up to date
+# before serving, whether or not it runs the background services.
+if multiprocessing.parent_process() is None:
+    db_manager.init_database()
+
+if os.environ.get('LEMOS_BACKGROUND', '1') == '1' and multiprocessing.parent_process() is None:
+    forecast_scheduler.start()
+    atexit.register(forecast_scheduler.stop)
+    notification_queue.start()
+    atexit.register(notification_queue.stop)
+    retention_manager.start()
+    atexit.register(retention_manager.stop)
+
+if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,92 @@
+"""Compare per-reading threshold alerts with the stateful AlertEngine.
+
+Replays noisy methane excursions that hover around the threshold at a
+30-second reading interval, plus hourly 48-point forecasts, and reports
+how many alert rows/SMS batches each approach produces and the cost of
+one evaluation.
+
+    python -m benchmarks.bench_alerts --areas 3 --hours 6
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from services.alert_engine import AlertEngine
+
+THRESHOLDS = {'methane': 1000, 'co': 50, 'temperature': 35, 'humidity': 80}
+INTERVAL = 30
+
+
+def legacy_alert_count(reading):
+    """The old check_alerts: one alert per metric over its threshold, every reading"""
+    return sum(reading[metric] > THRESHOLDS[metric] for metric in ('methane', 'co'))
+
+
+def make_readings(areas, hours, seed=0):
+    rng = np.random.default_rng(seed)
+    steps = hours * 3600 // INTERVAL
+    start = datetime(2024, 1, 1)
+    t = np.arange(steps)
+
+    readings = []
+    for area_id in range(1, areas + 1):
+        # An hour-long excursion every three hours, noisy enough to cross
+        # the threshold back and forth near its edges
+        excursion = ((t * INTERVAL) % (3 * 3600)) < 3600
+        methane = np.where(excursion, 1080, 700) + rng.normal(0, 60, steps)
+        co = 20 + rng.normal(0, 3, steps)
+        for i in range(steps):
+            readings.append((i * INTERVAL, {
+                'area_id': area_id,
+                'methane': float(methane[i]),
+                'co': float(co[i]),
+                'timestamp': (start + timedelta(seconds=i * INTERVAL)).isoformat()
+            }))
+
+    readings.sort(key=lambda item: item[0])
+    return readings
+
+
+def make_forecast(hours=48):
+    return [{'timestamp': f'h{h}', 'methane': 1100.0 if h % 3 == 0 else 800.0, 'co': 20.0}
+            for h in range(hours)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--hours', type=int, default=6)
+    args = parser.parse_args()
+
+    readings = make_readings(args.areas, args.hours)
+    engine = AlertEngine(THRESHOLDS, clear_hold=300)
+
+    legacy = sum(legacy_alert_count(reading) for _, reading in readings)
+
+    start = time.perf_counter()
+    emitted = [alert for offset, reading in readings for alert in engine.evaluate(reading, now=offset)]
+    elapsed = time.perf_counter() - start
+
+    states = {state: sum(alert['state'] == state for alert in emitted)
+              for state in ('raised', 'escalated', 'cleared')}
+    print(f"{len(readings)} readings over {args.hours}h in {args.areas} areas")
+    print(f"{'per-reading alerts':<22} {legacy:7d}")
+    print(f"{'state machine alerts':<22} {len(emitted):7d}  {states}")
+    print(f"reduction: {legacy / max(len(emitted), 1):.0f}x, "
+          f"{elapsed / len(readings) * 1e6:.2f} us per evaluation")
+
+    # Hourly scheduler passes over one day
+    forecast = make_forecast()
+    legacy_forecast = 24 * args.areas * sum(point['methane'] > THRESHOLDS['methane'] for point in forecast)
+    coalesced = sum(
+        engine.evaluate_forecast(area_id, forecast, now=hour * 3600) is not None
+        for hour in range(24) for area_id in range(1, args.areas + 1)
+    )
+    print(f"{'per-point forecast warnings':<28} {legacy_forecast:5d} per day")
+    print(f"{'coalesced forecast warnings':<28} {coalesced:5d} per day")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Compare database lookups with the in-memory ReadingBuffer for /api/current.
+
+Fills a database with readings at 30-second intervals, then times the old
+``get_readings(hours=1)[0]`` lookup and a last-10-minutes query against
+the per-area ring buffer, checking both return the same readings.
+
+    python -m benchmarks.bench_current --areas 3 --hours 24
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from services.database import DatabaseManager
+from services.reading_buffer import ReadingBuffer
+
+
+def fill(db_manager, areas, hours):
+    now = datetime.now()
+    steps = hours * 120
+    db_manager.store_readings([
+        {
+            'area_id': area_id,
+            'methane': float(i % 900),
+            'co': float(i % 40),
+            'temperature': 24.0,
+            'humidity': 55.0,
+            'water_level': 40.0,
+            'timestamp': (now - timedelta(seconds=30 * (steps - i))).isoformat()
+        }
+        for i in range(steps) for area_id in range(1, areas + 1)
+    ])
+
+
+def time_calls(label, fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / calls * 1e6
+    print(f"{label:<32} {per_call_us:9.1f} us/call")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--calls', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.init_database()
+        fill(db_manager, args.areas, args.hours)
+
+        # Serve purely from memory once seeded, as between refreshes
+        buffer = ReadingBuffer(db_manager, refresh_interval=3600)
+
+        assert buffer.latest(1) == db_manager.get_readings(hours=1, area_id=1)[0]
+        assert buffer.recent(1, 10) == db_manager.get_readings(hours=10 / 60, area_id=1)
+
+        legacy_us = time_calls('get_readings(hours=1)[0]',
+                               lambda: db_manager.get_readings(hours=1, area_id=1)[0], args.calls)
+        latest_us = time_calls('ReadingBuffer.latest', lambda: buffer.latest(1), args.calls)
+        time_calls('get_readings(10 min)',
+                   lambda: db_manager.get_readings(hours=10 / 60, area_id=1), args.calls)
+        time_calls('ReadingBuffer.recent(10 min)', lambda: buffer.recent(1, 10), args.calls)
+        db_manager.close()
+
+    print(f"latest speedup: {legacy_us / latest_us:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compare connect-per-call SQLite access with the pooled DatabaseManager.
+
+Simulates the work of one multi-zone POST (three store_reading calls) plus
+a dashboard read, and reports the mean cost per request for each strategy.
+
+    python -m benchmarks.bench_database --requests 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from services.database import DatabaseManager, INSERT_READING_SQL, SELECT_AREA_READINGS_SQL, to_epoch_ms
+
+
+def make_reading(area_id):
+    return {
+        'area_id': area_id,
+        'methane': 420.0,
+        'co': 12.5,
+        'temperature': 24.1,
+        'humidity': 55.0,
+        'water_level': 40.0,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def legacy_request(db_path):
+    """The pre-pool access pattern: one connect/commit/close per call"""
+    for area_id in (1, 2, 3):
+        reading = make_reading(area_id)
+        conn = sqlite3.connect(db_path)
+        conn.execute(INSERT_READING_SQL, (
+            reading['area_id'], reading['methane'], reading['co'], reading['temperature'],
+            reading['humidity'], reading['water_level'], reading['timestamp'],
+            to_epoch_ms(reading['timestamp'])
+        ))
+        conn.commit()
+        conn.close()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(SELECT_AREA_READINGS_SQL, (1, to_epoch_ms(datetime.now()))).fetchall()
+    conn.close()
+
+
+def pooled_request(db_manager):
+    for area_id in (1, 2, 3):
+        db_manager.store_reading(make_reading(area_id))
+    db_manager.get_readings(hours=0, area_id=1)
+
+
+def time_requests(label, fn, requests):
+    # store_reading still prints; keep that out of the measurement output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn()
+        elapsed = time.perf_counter() - start
+
+    per_request_ms = elapsed / requests * 1000
+    print(f"{label:<22} {per_request_ms:8.3f} ms/request  {requests / elapsed:9.1f} requests/s")
+    return per_request_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        setup = DatabaseManager(legacy_path, pool_size=1)
+        setup.init_database()
+        setup.close()
+        # The legacy layout used the default rollback journal
+        sqlite3.connect(legacy_path).execute('PRAGMA journal_mode=DELETE').fetchall()
+
+        pooled = DatabaseManager(os.path.join(tmp, 'pooled.db'))
+        pooled.init_database()
+
+        legacy_ms = time_requests('connect-per-call', lambda: legacy_request(legacy_path), args.requests)
+        pooled_ms = time_requests('pooled WAL', lambda: pooled_request(pooled), args.requests)
+        pooled.close()
+
+    print(f"speedup: {legacy_ms / pooled_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Check and time the vectorized ForecastingModel.prepare_features.
+
+The original row-by-row implementation is kept below as the reference:
+the benchmark fails if the two feature matrices differ in any element,
+then reports the speedup at each size.
+
+    python -m benchmarks.bench_features --rows 10000 100000
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ml.forecasting import ForecastingModel
+
+
+def legacy_prepare_features(data):
+    """Row-by-row feature builder that prepare_features replaced"""
+    df = pd.DataFrame(data)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = df.sort_values('timestamp')
+
+    features = []
+
+    for i in range(4, len(df)):
+        current_time = df.iloc[i]['timestamp']
+        hour = current_time.hour
+        day_of_week = current_time.weekday()
+
+        methane_history = df.iloc[i-4:i]['methane'].values
+        co_history = df.iloc[i-4:i]['co'].values
+        temp_history = df.iloc[i-4:i]['temperature'].values
+        humidity_history = df.iloc[i-4:i]['humidity'].values
+
+        features.append([
+            hour, day_of_week,
+            np.mean(methane_history), np.std(methane_history), methane_history[-1] - methane_history[0],
+            np.mean(co_history), np.std(co_history), co_history[-1] - co_history[0],
+            np.mean(temp_history), np.mean(humidity_history),
+            df.iloc[i]['temperature'], df.iloc[i]['humidity'], df.iloc[i]['water_level']
+        ])
+
+    return np.array(features)
+
+
+def make_history(rows, seed=42):
+    """Synthetic 5-second readings in the column layout get_readings_columns returns"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1)
+    times = [start + timedelta(seconds=5 * i) for i in range(rows)]
+    return {
+        'timestamp': np.array([t.isoformat() for t in times], dtype=object),
+        'ts': np.array([round(t.timestamp() * 1000) for t in times], dtype=np.int64),
+        'methane': np.round(400 + rng.normal(0, 50, rows), 2),
+        'co': np.round(10 + rng.normal(0, 2, rows), 2),
+        'temperature': np.round(25 + rng.normal(0, 3, rows), 2),
+        'humidity': np.round(50 + rng.normal(0, 10, rows), 2),
+        'water_level': np.round(40 + rng.normal(0, 5, rows), 2)
+    }
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    model = ForecastingModel(model_path=tempfile.mkdtemp(), autoload=False)
+
+    for rows in args.rows:
+        history = make_history(rows)
+
+        legacy_time, expected = best_of(lambda: legacy_prepare_features(history), 1)
+        vector_time, actual = best_of(lambda: model.prepare_features(history), args.repeat)
+
+        if expected.shape != actual.shape or not np.array_equal(expected, actual):
+            raise SystemExit(f"Feature mismatch at {rows} rows: max abs diff "
+                             f"{np.max(np.abs(expected - actual)) if expected.shape == actual.shape else 'shape'}")
+
+        print(f"{rows:>8} rows  legacy {legacy_time * 1000:10.1f} ms  "
+              f"vectorized {vector_time * 1000:8.2f} ms  speedup {legacy_time / vector_time:8.0f}x  (identical)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Check and time recursive forecasting in ForecastingModel.
+
+Trains a model on synthetic history, then compares predict() with the
+original implementation (rebuild the feature matrix and make two
+single-row forest calls per step), and times predict_many() across
+several areas at once.
+
+    python -m benchmarks.bench_forecast --hours 48 --areas 10
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from ml.forecasting import ForecastingModel, FORECAST_COLUMNS
+from benchmarks.bench_features import make_history
+
+
+def legacy_predict(model, history, hours):
+    """Step loop that predict() replaced"""
+    recent_data = history[FORECAST_COLUMNS].tail(10).to_dict('records')
+    forecast = []
+    current_time = datetime.fromisoformat(recent_data[-1]['timestamp'])
+
+    for hour in range(1, hours + 1):
+        future_time = current_time + timedelta(hours=hour)
+        features = model.prepare_features(recent_data)
+        features_scaled = model.scaler.transform([features[-1]])
+
+        methane_pred = max(0, model.methane_model.predict(features_scaled)[0])
+        co_pred = max(0, model.co_model.predict(features_scaled)[0])
+
+        forecast.append({
+            'timestamp': future_time.isoformat(),
+            'methane': round(methane_pred, 2),
+            'co': round(co_pred, 2),
+            'confidence': 0.8 - (hour * 0.01)
+        })
+        recent_data.append({
+            'timestamp': future_time.isoformat(),
+            'methane': methane_pred,
+            'co': co_pred,
+            'temperature': recent_data[-1]['temperature'],
+            'humidity': recent_data[-1]['humidity'],
+            'water_level': recent_data[-1]['water_level']
+        })
+
+    return forecast
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=int, default=48)
+    parser.add_argument('--areas', type=int, default=10)
+    parser.add_argument('--train-rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    model = ForecastingModel(model_path=tempfile.mkdtemp(), autoload=False)
+    model.train(make_history(args.train_rows))
+
+    history = model.to_frame(make_history(500, seed=7))
+
+    # Flattening the forests is a one-off cost per trained model
+    compile_time, _ = timed(model.compiled_forests)
+    print(f"forest compile: {compile_time * 1000:.1f} ms (once per trained model)")
+
+    legacy_time, expected = timed(lambda: legacy_predict(model, history, args.hours))
+    single_time, actual = timed(lambda: model.predict(history, hours=args.hours))
+    if actual != expected:
+        raise SystemExit("predict() output differs from the original implementation")
+
+    print(f"single area, {args.hours}h   legacy {legacy_time * 1000:9.1f} ms   "
+          f"incremental {single_time * 1000:8.1f} ms   speedup {legacy_time / single_time:5.1f}x  (identical)")
+
+    histories = {area_id: make_history(500, seed=area_id) for area_id in range(args.areas)}
+    per_area_time, _ = timed(lambda: [model.predict(h, hours=args.hours) for h in histories.values()])
+    batched_time, _ = timed(lambda: model.predict_many(histories, hours=args.hours))
+
+    print(f"{args.areas} areas, {args.hours}h       one by one {per_area_time * 1000:8.1f} ms   "
+          f"predict_many {batched_time * 1000:7.1f} ms   speedup {per_area_time / batched_time:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Compare JSON encoding and decoding with the stdlib and with orjson.
+
+Fills a database with a week of readings and times GET /api/readings for
+the whole window: the old stream that encoded one dict per call with the
+stdlib, then objects, rows and columns formats through FastJSONProvider
+on its stdlib fallback and on orjson. Checks every variant parses back
+to the same readings. Then times decoding an ingest batch.
+
+    python -m benchmarks.bench_json --days 7 --areas 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def fill(db_manager, days, areas):
+    now = datetime.now()
+    steps = days * 24 * 60  # one reading per minute per area
+    for start in range(0, steps, 20000):
+        db_manager.store_readings([
+            {
+                'area_id': area_id,
+                'methane': 400 + (i % 900) / 7,
+                'co': (i % 40) / 3,
+                'temperature': 24.0 + (i % 60) / 11,
+                'humidity': 55.0,
+                'water_level': 40.0,
+                'timestamp': (now - timedelta(minutes=steps - i)).isoformat()
+            }
+            for i in range(start, min(start + 20000, steps)) for area_id in range(1, areas + 1)
+        ])
+
+
+def legacy_stream_json_array(app, rows, chunk_rows=500):
+    """stream_json_array as it was: one stdlib dumps() call per row"""
+    yield '['
+    separator = ''
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(row, default=app.json.default, sort_keys=True, separators=(',', ':')))
+        if len(chunk) >= chunk_rows:
+            yield separator + ','.join(chunk)
+            separator = ','
+            chunk = []
+    if chunk:
+        yield separator + ','.join(chunk)
+    yield ']'
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def as_objects(body):
+    """Readings from any of the response formats, newest first"""
+    document = json.loads(body)
+    if isinstance(document, list):
+        return document
+    if 'rows' in document:
+        return [dict(zip(document['fields'], row)) for row in document['rows']]
+    columns = list(document)
+    return [dict(zip(columns, values)) for values in zip(*document.values())][::-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LEMOS_BACKGROUND'] = '0'
+        os.environ['LEMOS_DB_PATH'] = os.path.join(tmp, 'bench.db')
+        import app as lemos_app
+        from services import json_provider
+
+        orjson = json_provider.orjson
+        if orjson is None:
+            print('orjson is not installed; only the stdlib fallback can be measured')
+
+        db_manager = lemos_app.db_manager
+        fill(db_manager, args.days, args.areas)
+
+        app = lemos_app.app
+        client = app.test_client()
+        hours = args.days * 24 + 1
+
+        def legacy():
+            with app.app_context():
+                rows = (row for row, _ in db_manager.iter_readings(hours=hours))
+                return ''.join(legacy_stream_json_array(app, rows)).encode()
+
+        def get(query):
+            return lambda: client.get(f'/api/readings?hours={hours}{query}').get_data()
+
+        variants = [('per-row stdlib (before)', None, legacy)]
+        for encoder in ('stdlib', 'orjson'):
+            if encoder == 'orjson' and orjson is None:
+                continue
+            for response_format in ('objects', 'rows', 'columns'):
+                variants.append((f'{encoder} {response_format}', orjson if encoder == 'orjson' else None,
+                                 get(f'&format={response_format}')))
+
+        expected = None
+        baseline = None
+        for label, encoder, fn in variants:
+            json_provider.orjson = encoder
+            elapsed, body = timed(fn, args.repeat)
+            readings = as_objects(body)
+            if expected is None:
+                expected = readings
+                baseline = elapsed
+            assert readings == expected, f'{label} does not parse back to the same readings'
+            print(f"{label:<24} {elapsed * 1000:8.1f} ms  {len(body) / 2 ** 20:6.2f} MiB  "
+                  f"{baseline / elapsed:5.1f}x")
+        print(f"{len(expected)} readings, all formats parse back identically")
+
+        batch = json.dumps(expected[:5000]).encode()
+        for label, encoder in (('stdlib', None), ('orjson', orjson)):
+            if label == 'orjson' and orjson is None:
+                continue
+            json_provider.orjson = encoder
+            elapsed, decoded = timed(lambda: app.json.loads(batch), args.repeat * 5)
+            assert decoded == expected[:5000]
+            print(f"decode {len(decoded)}-row ingest batch, {label:<6} {elapsed * 1000:6.2f} ms")
+
+        json_provider.orjson = orjson
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Measure POST /api/readings latency with logging off, queued and synchronous.
+
+Posts single readings through the Flask app with the database in a temp
+directory and logs written to a file, under several logging setups:
+off (WARNING), INFO and sampled DEBUG through the QueueHandler, every
+DEBUG line through the queue, and every DEBUG line written synchronously
+on the request thread, as the old print() calls were. Setups take turns
+in rounds so drift affects them all alike. --write-delay makes each log
+write take that long, like a log pipeline that is applying backpressure.
+
+    python -m benchmarks.bench_logging --requests 2000 --write-delay 0.0002
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+
+class SlowFile:
+    """A file whose writes each take ``delay`` seconds"""
+
+    def __init__(self, file, delay):
+        self.file = file
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def post_readings(client, requests):
+    latencies = []
+    for i in range(requests):
+        reading = {'area_id': i % 3 + 1, 'methane': 400.0 + i % 50, 'co': 10.0, 'temperature': 24.0,
+                   'humidity': 55.0, 'water_level': 40.0, 'timestamp': datetime.now().isoformat()}
+        start = time.perf_counter()
+        response = client.post('/api/readings', json=reading)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--write-delay', type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LEMOS_BACKGROUND'] = '0'
+        os.environ['LEMOS_DB_PATH'] = os.path.join(tmp, 'bench.db')
+        import app as lemos_app
+        from services.log_config import configure_logging
+
+        db_manager = lemos_app.db_manager
+        client = lemos_app.app.test_client()
+        root = logging.getLogger()
+
+        setups = [
+            ('off (WARNING)', dict(level='WARNING')),
+            ('INFO, queued', dict(level='INFO')),
+            ('DEBUG 1/100, queued', dict(level='DEBUG', sample_rate=100)),
+            ('DEBUG every line, queued', dict(level='DEBUG', sample_rate=1)),
+            ('DEBUG every line, sync', None),
+        ]
+        latencies = {label: [] for label, _ in setups}
+        lines = dict.fromkeys(latencies, 0)
+
+        configure_logging(level='WARNING', stream=io.StringIO())
+        post_readings(client, 200)  # warm up
+        for _ in range(args.rounds):
+            for label, options in setups:
+                log_path = os.path.join(tmp, 'app.log')
+                with open(log_path, 'w') as log_file:
+                    stream = SlowFile(log_file, args.write_delay)
+                    if options is None:
+                        # Format and write on the request thread, like print()
+                        configure_logging(level='WARNING', stream=io.StringIO())
+                        sync_handler = logging.StreamHandler(stream)
+                        root.addHandler(sync_handler)
+                        root.setLevel('DEBUG')
+                    else:
+                        configure_logging(stream=stream, **options)
+
+                    latencies[label] += post_readings(client, args.requests // args.rounds)
+
+                    if options is None:
+                        root.removeHandler(sync_handler)
+                    configure_logging(level='WARNING', stream=io.StringIO())  # flushes the listener
+
+                with open(log_path) as log_file:
+                    lines[label] += sum(1 for _ in log_file)
+
+        for label, values in latencies.items():
+            values.sort()
+            print(f"{label:<26} p50 {statistics.median(values):6.3f} ms  "
+                  f"p99 {values[int(len(values) * 0.99)]:6.3f} ms  {lines[label]:>6} log lines")
+
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Measure what the /api/metrics instrumentation adds to POST /api/readings.
+
+Posts single readings through the Flask app with the database in a temp
+directory, with metrics off, kept in memory only, written to a metrics
+directory every 5 s as app.py does by default, and written on every
+update as a worst case. Setups take turns in rounds so drift affects
+them all alike. Also times one observe(), one timer() block and a
+scrape of the rendered text.
+
+    python -m benchmarks.bench_metrics --requests 2000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+
+def post_readings(client, requests):
+    latencies = []
+    for i in range(requests):
+        reading = {'area_id': i % 3 + 1, 'methane': 400.0 + i % 50, 'co': 10.0, 'temperature': 24.0,
+                   'humidity': 55.0, 'water_level': 40.0, 'timestamp': datetime.now().isoformat()}
+        start = time.perf_counter()
+        response = client.post('/api/readings', json=reading)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data()
+    return latencies
+
+
+def per_call_us(fn, calls=100000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LEMOS_BACKGROUND'] = '0'
+        os.environ['LEMOS_DB_PATH'] = os.path.join(tmp, 'bench.db')
+        os.environ.setdefault('LEMOS_LOG_LEVEL', 'WARNING')
+        import app as lemos_app
+        from services.metrics import metrics
+
+        db_manager = lemos_app.db_manager
+        client = lemos_app.app.test_client()
+        metrics_dir = os.path.join(tmp, 'metrics')
+
+        setups = [
+            ('off', dict(enabled=False)),
+            ('in memory', dict(enabled=True)),
+            ('directory, every 5 s', dict(enabled=True, directory=metrics_dir, flush_interval=5.0)),
+            ('directory, every update', dict(enabled=True, directory=metrics_dir, flush_interval=0.0)),
+        ]
+        latencies = {label: [] for label, _ in setups}
+
+        metrics.configure(enabled=False)
+        post_readings(client, 200)  # warm up
+        for _ in range(args.rounds):
+            for label, options in setups:
+                metrics.configure(**options)
+                latencies[label] += post_readings(client, args.requests // args.rounds)
+
+        baseline = statistics.median(latencies['off'])
+        for label, values in latencies.items():
+            values.sort()
+            median = statistics.median(values)
+            print(f"{label:<24} p50 {median:6.3f} ms ({median - baseline:+6.3f})  "
+                  f"p99 {values[int(len(values) * 0.99)]:6.3f} ms")
+
+        metrics.configure(enabled=True)
+        observe_us = per_call_us(lambda: metrics.observe('bench_seconds', 0.001, stage='store'))
+
+        def timed_block():
+            with metrics.timer('bench_seconds', stage='store'):
+                pass
+
+        timer_us = per_call_us(timed_block)
+        metrics.configure(enabled=True, directory=metrics_dir)
+        start = time.perf_counter()
+        text = metrics.render()
+        render_ms = (time.perf_counter() - start) * 1000
+        print(f"observe() {observe_us:.2f} us, timer() block {timer_us:.2f} us, "
+              f"scrape {render_ms:.2f} ms for {text.count(chr(10))} lines")
+
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
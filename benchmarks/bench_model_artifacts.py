@@ -0,0 +1,127 @@
+"""Measure saving and loading forecasting models under each artifact compression.
+
+Trains one model on synthetic readings, then for each compression saves
+it, loads it back the way a worker does (manifest, scaler and compiled
+forest arrays, memory-mapped when uncompressed) and runs a 48 hour
+predict. Loading every pickle up front, as models without a manifest
+are loaded, is timed alongside. Each load runs in a forked child, so it
+reads from the page cache as a new gunicorn worker would, and the
+child's private memory after the predict shows what one more worker
+serving the model costs: its dirty private pages, which no other
+process can share. Memory-mapped arrays are clean file pages and are
+not counted.
+
+    python -m benchmarks.bench_model_artifacts --rows 5000
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import joblib
+
+from benchmarks.bench_features import make_history
+from ml.forecasting import ARTIFACT_FILES, ForecastingModel
+
+
+def private_dirty_kb():
+    """Memory only this process can use, as heap and copied arrays are, or None off Linux"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return None
+    return int(fields['Private_Dirty'].split()[0])
+
+
+def in_child(fn):
+    """Run fn() in a forked process and return what it writes back"""
+    # Otherwise the child's garbage collector writes to every object it
+    # inherited, and the copied pages would be counted against the model
+    gc.freeze()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        try:
+            os.write(write_fd, json.dumps(fn()).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        output = pipe.read()
+    os.waitpid(pid, 0)
+    return json.loads(output)
+
+
+def load_and_predict(load, history):
+    before = private_dirty_kb()
+    start = time.perf_counter()
+    model = load()
+    loaded = time.perf_counter()
+    model.predict(history, hours=48)
+    predicted = time.perf_counter()
+    after = private_dirty_kb()
+    return ((loaded - start) * 1000, (predicted - loaded) * 1000,
+            None if before is None else after - before)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000, help='training readings')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--compressions', nargs='+', default=['none', 'zlib:3', 'lz4'],
+                        help="e.g. 'xz' too; it compresses best but takes over a minute to save")
+    args = parser.parse_args()
+
+    history = make_history(500, seed=9)
+    trained = ForecastingModel(model_path=tempfile.mkdtemp(), autoload=False)
+    trained.train(make_history(args.rows, seed=7))
+    assert trained.is_trained
+    # Pay for lazy imports and first-call setup before forking, so children measure only the model
+    trained.predict(history, hours=48)
+
+    def load_unversioned(path):
+        model = ForecastingModel(model_path=path, autoload=False)
+        model._methane_model = joblib.load(os.path.join(path, ARTIFACT_FILES['methane_model']))
+        model._co_model = joblib.load(os.path.join(path, ARTIFACT_FILES['co_model']))
+        model.scaler = joblib.load(os.path.join(path, ARTIFACT_FILES['scaler']))
+        model.is_trained = True
+        return model
+
+    print(f"{'':<22} {'save ms':>9} {'size MB':>8} {'load ms':>9} {'predict ms':>11} {'private MB':>11}")
+    for compression in args.compressions:
+        path = tempfile.mkdtemp()
+        try:
+            trained.model_path, trained.compression = path, compression
+            trained._compress = ForecastingModel(model_path=path, autoload=False, compression=compression)._compress
+        except ValueError as e:
+            print(f"{compression:<22} {e}")
+            continue
+
+        start = time.perf_counter()
+        trained.save_models()
+        save_ms = (time.perf_counter() - start) * 1000
+        if trained.manifest is None or trained.manifest['compression'] != compression:
+            print(f"{compression:<22} save failed (is the compressor installed?)")
+            continue
+        size_mb = sum(entry['bytes'] for entry in trained.manifest['files'].values()) / 1e6
+
+        setups = [(compression, lambda: ForecastingModel(model_path=path))]
+        if compression == 'none':
+            setups.append(('none, all pickles', lambda: load_unversioned(path)))
+        for label, load in setups:
+            runs = [in_child(lambda: load_and_predict(load, history)) for _ in range(args.repeat)]
+            load_ms = statistics.median(run[0] for run in runs)
+            predict_ms = statistics.median(run[1] for run in runs)
+            private = runs[-1][2]
+            print(f"{label:<22} {save_ms:9.1f} {size_mb:8.1f} {load_ms:9.1f} {predict_ms:11.1f} "
+                  f"{'n/a' if private is None else f'{private / 1024:.1f}':>11}")
+        trained.manifest = None
+
+
+if __name__ == '__main__':
+    main()
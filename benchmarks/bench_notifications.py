@@ -0,0 +1,105 @@
+"""Compare inline SMS sending with the queued NotificationQueue.
+
+Raises the same burst of alerts both ways against a local fake Twilio
+server with per-message latency. Reports how long the alerting code path
+blocks, how long the queue takes to deliver everything, and checks that
+every expected message arrived exactly once despite injected failures.
+
+    python -m benchmarks.bench_notifications --alerts 9 --latency 0.2
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fake_twilio import FakeTwilioServer
+
+
+def make_sms_service(api_base):
+    os.environ['TWILIO_ACCOUNT_SID'] = 'AC' + '0' * 32
+    os.environ['TWILIO_AUTH_TOKEN'] = 'token'
+    os.environ['TWILIO_API_BASE'] = api_base
+
+    from services.sms_service import SMSService
+    return SMSService()
+
+
+def alerts(count):
+    # A spike across three areas, half of them high severity
+    return [
+        (f"LEMOS ALERT: METHANE level {1200 + i} exceeds threshold 1000 in Area {i % 3 + 1}",
+         'high' if i % 2 else 'medium', i % 3 + 1)
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alerts', type=int, default=9)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--fail-every', type=int, default=5)
+    args = parser.parse_args()
+
+    from services.database import DatabaseManager
+    from services.notification_queue import NotificationQueue
+
+    burst = alerts(args.alerts)
+
+    server = FakeTwilioServer(latency=args.latency).start()
+    sms_service = make_sms_service(server.url)
+    expected = Counter(
+        (number, sms_service.format_message(message, severity))
+        for message, severity, area_id in burst
+        for number in sms_service.recipients_for(severity, area_id)
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for message, severity, area_id in burst:
+            sms_service.send_alert(message, severity, area_id)
+        inline_s = time.perf_counter() - start
+    server.stop()
+
+    print(f"{len(burst)} alerts, {sum(expected.values())} messages, {args.latency * 1000:.0f} ms per send")
+    print(f"{'inline send_alert':<24} blocks {inline_s * 1000:9.1f} ms")
+
+    server = FakeTwilioServer(latency=args.latency, fail_every=args.fail_every).start()
+    sms_service = make_sms_service(server.url)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        db_manager.init_database()
+        notifications = NotificationQueue(db_manager, sms_service, workers=args.workers,
+                                          backoff_base=0.05, rate_limit=100)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for message, severity, area_id in burst:
+                notifications.send_alert(message, severity, area_id)
+            enqueue_s = time.perf_counter() - start
+
+            notifications.start()
+            notifications.wait_idle(timeout=60)
+            drain_s = time.perf_counter() - start
+            notifications.stop()
+
+        counts = notifications.counts()
+        db_manager.close()
+    server.stop()
+
+    delivered = Counter((message['to'], message['body']) for message in server.messages)
+    print(f"{'queued send_alert':<24} blocks {enqueue_s * 1000:9.1f} ms")
+    print(f"{'queue drain':<24} total  {drain_s * 1000:9.1f} ms "
+          f"({args.workers} workers, {server.requests - len(server.messages)} injected failures retried)")
+    print(f"outbox: {counts}")
+
+    assert delivered == expected, 'queued delivery differs from the expected messages'
+    print("every message delivered exactly once")
+
+
+if __name__ == '__main__':
+    main()
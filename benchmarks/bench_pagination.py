@@ -0,0 +1,94 @@
+"""Compare peak memory of jsonify(get_readings) with the streamed /api/readings.
+
+Fills a database with a month of readings, then serializes the whole
+window both ways through the Flask app and reports the peak Python heap
+each needs. Also walks the window page by page with limit/cursor and
+checks the pages add up to the full result.
+
+    python -m benchmarks.bench_pagination --days 30 --areas 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+
+def fill(db_manager, days, areas):
+    now = datetime.now()
+    steps = days * 24 * 60  # one reading per minute per area
+    for start in range(0, steps, 20000):
+        db_manager.store_readings([
+            {
+                'area_id': area_id,
+                'methane': float(i % 900),
+                'co': float(i % 40),
+                'temperature': 24.0,
+                'humidity': 55.0,
+                'water_level': 40.0,
+                'timestamp': (now - timedelta(minutes=steps - i)).isoformat()
+            }
+            for i in range(start, min(start + 20000, steps)) for area_id in range(1, areas + 1)
+        ])
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} peak {peak / 2 ** 20:8.1f} MiB  {elapsed:6.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--page', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['LEMOS_BACKGROUND'] = '0'
+        os.environ['LEMOS_DB_PATH'] = os.path.join(tmp, 'bench.db')
+        import app as lemos_app
+
+        db_manager = lemos_app.db_manager
+        fill(db_manager, args.days, args.areas)
+
+        hours = args.days * 24 + 1
+        client = lemos_app.app.test_client()
+
+        def legacy():
+            with lemos_app.app.app_context():
+                return len(lemos_app.jsonify(db_manager.get_readings(hours=hours)).get_data())
+
+        def streamed():
+            response = client.get(f'/api/readings?hours={hours}', buffered=False)
+            return sum(len(chunk) for chunk in response.response)
+
+        legacy_bytes = measure('jsonify(get_readings)', legacy)
+        streamed_bytes = measure('streamed /api/readings', streamed)
+        print(f"response size: {legacy_bytes / 2 ** 20:.1f} MiB legacy, {streamed_bytes / 2 ** 20:.1f} MiB streamed")
+
+        full = json.loads(client.get(f'/api/readings?hours={hours}&fields=id').get_data())
+        paged, cursor, pages = [], '', 0
+        while True:
+            response = client.get(f'/api/readings?hours={hours}&fields=id&limit={args.page}&cursor={cursor}')
+            paged.extend(json.loads(response.get_data()))
+            pages += 1
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert paged == full, 'paging did not reproduce the full window'
+        print(f"{pages} pages of {args.page} reproduce all {len(full)} rows")
+
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Compare DataProcessor.process_batch with process_reading called per reading.
+
+First checks that the column path gives exactly the per-reading result
+(compared by repr, so int/float and -0.0 differences count) on a mix of
+awkward inputs: rounding ties, strings, None, NaN/inf, out-of-range
+values, missing fields, bad area ids and per-area calibration. Then
+times both on a large batch of ordinary readings.
+
+    python -m benchmarks.bench_processing --readings 100000
+"""
+import argparse
+import contextlib
+import copy
+import io
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+from ingestion.data_processor import DataProcessor, SENSOR_FIELDS
+
+AWKWARD_VALUES = [1.005, 2.675, 0.125, 0.375, -0.005, 1e-9, -1e-9, 12, '42.5', ' 7 ', 'abc', None,
+                  True, float('nan'), float('inf'), -float('inf'), 1e7, -50.0, 123456.785, 10 ** 400]
+
+
+def make_readings(count, awkward, seed=7):
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(seconds=5 * count)
+    readings = []
+    for i in range(count):
+        reading = {
+            'area_id': rng.randint(1, 4),
+            'methane': rng.uniform(0, 1200),
+            'co': rng.uniform(0, 60),
+            'temperature': rng.uniform(10, 40),
+            'humidity': rng.uniform(20, 90),
+            'water_level': rng.uniform(0, 100),
+            'timestamp': (start + timedelta(seconds=5 * i)).isoformat()
+        }
+        if awkward:
+            for field in SENSOR_FIELDS:
+                if rng.random() < 0.3:
+                    reading[field] = rng.choice(AWKWARD_VALUES)
+            roll = rng.random()
+            if roll < 0.02:
+                del reading[rng.choice(SENSOR_FIELDS)]
+            elif roll < 0.04:
+                reading['area_id'] = rng.choice(['x', None, '2', 3.7])
+            elif roll < 0.05:
+                reading = ['not', 'a', 'dict']
+            elif roll < 0.1:
+                del reading['timestamp']
+        readings.append(reading)
+    return readings
+
+
+def make_processor():
+    processor = DataProcessor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.update_calibration('methane', 1.1)
+        processor.update_calibration('co', 0.97, area_id=2)
+        processor.update_calibration('temperature', 1.003, area_id=3)
+    return processor
+
+
+def per_reading(processor, readings):
+    results = []
+    for raw_data in readings:
+        try:
+            results.append((processor.process_reading(raw_data), None))
+        except ValueError as e:
+            results.append((None, str(e)))
+    return results
+
+
+def check_identical(count):
+    readings = make_readings(count, awkward=True)
+    processor = make_processor()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = per_reading(processor, copy.deepcopy(readings))
+        actual = processor.process_batch(copy.deepcopy(readings))
+
+    for index, ((expected_data, expected_error), (actual_data, actual_error)) in enumerate(zip(expected, actual)):
+        if isinstance(readings[index], dict) and 'timestamp' not in readings[index]:
+            # Filled in with datetime.now() on each side
+            if expected_data:
+                expected_data.pop('timestamp')
+            if actual_data:
+                actual_data.pop('timestamp')
+        assert repr(expected_data) == repr(actual_data) and expected_error == actual_error, \
+            f"reading {index}: {readings[index]!r}\n  process_reading {expected_data!r} {expected_error!r}" \
+            f"\n  process_batch   {actual_data!r} {actual_error!r}"
+
+    errors = sum(1 for _, error in actual if error)
+    print(f"{count} awkward readings ({errors} rejected): process_batch identical to process_reading")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readings', type=int, default=100000)
+    args = parser.parse_args()
+
+    check_identical(20000)
+
+    readings = make_readings(args.readings, awkward=False)
+    for reading in readings[::100]:
+        reading['methane'] = 12000.0  # a few clamped values, as real batches have
+    processor = make_processor()
+    processor_logger = logging.getLogger(DataProcessor.__module__)
+    processor_logger.setLevel(logging.DEBUG)
+    processor_logger.propagate = False
+
+    timings = {}
+    for label, run in (('process_reading loop', lambda batch: per_reading(processor, batch)),
+                       ('process_batch', processor.process_batch)):
+        batch = copy.deepcopy(readings)
+        output = io.StringIO()
+        handler = logging.StreamHandler(output)
+        processor_logger.addHandler(handler)
+        start = time.perf_counter()
+        run(batch)
+        timings[label] = time.perf_counter() - start
+        processor_logger.removeHandler(handler)
+        lines = output.getvalue().count('\n')
+        print(f"{label:<22} {args.readings / timings[label]:>12,.0f} readings/s  {lines} log lines")
+
+    print(f"speedup: {timings['process_reading loop'] / timings['process_batch']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Compare ingest latency during a one-shot cleanup and chunked retention.
+
+Fills a database with readings, then expires the oldest days twice on
+identical copies: once with a single DELETE transaction like the old
+``cleanup_old_data``, once with RetentionManager archiving to gzipped
+NDJSON. A second connection keeps writing readings throughout, and its
+per-write latency is reported for both runs. The archive is read back
+and checked against the rows that were deleted.
+
+    python -m benchmarks.bench_retention --days 40 --keep 30
+"""
+import argparse
+import contextlib
+import glob
+import gzip
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from services.database import DatabaseManager
+from services.retention import RetentionManager
+
+
+def fill(db_manager, days, areas):
+    now = datetime.now()
+    steps = days * 24 * 60  # one reading per minute per area
+    for start in range(0, steps, 20000):
+        db_manager.store_readings([
+            {
+                'area_id': area_id,
+                'methane': float(i % 900),
+                'co': float(i % 40),
+                'temperature': 24.0,
+                'humidity': 55.0,
+                'water_level': 40.0,
+                'timestamp': (now - timedelta(minutes=steps - i)).isoformat()
+            }
+            for i in range(start, min(start + 20000, steps)) for area_id in range(1, areas + 1)
+        ])
+
+
+def ingest_latencies(db_path, work):
+    """Run ``work`` while another connection stores a reading every 5 ms"""
+    writer = DatabaseManager(db_path, pool_size=1)
+    latencies, done = [], threading.Event()
+
+    def ingest():
+        while not done.is_set():
+            start = time.perf_counter()
+            writer.store_reading({'area_id': 1, 'methane': 1.0, 'co': 1.0, 'temperature': 24.0,
+                                  'humidity': 55.0, 'water_level': 40.0,
+                                  'timestamp': datetime.now().isoformat()})
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        thread = threading.Thread(target=ingest)
+        thread.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        result = work()
+        elapsed = time.perf_counter() - start
+        time.sleep(0.2)
+        done.set()
+        thread.join()
+    writer.close()
+    return result, elapsed, latencies
+
+
+def report(label, elapsed, latencies, db_path):
+    latencies = sorted(latencies)
+    print(f"{label:<22} {elapsed:6.2f} s  ingest p50 {statistics.median(latencies):6.2f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:7.2f} ms  max {latencies[-1]:7.2f} ms  "
+          f"file {os.path.getsize(db_path) / 2 ** 20:6.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=40)
+    parser.add_argument('--keep', type=int, default=30)
+    parser.add_argument('--areas', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_path = os.path.join(tmp, 'seed.db')
+        seed = DatabaseManager(seed_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed.init_database()
+        fill(seed, args.days, args.areas)
+        with seed.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        seed.close()
+        print(f"seeded {os.path.getsize(seed_path) / 2 ** 20:.1f} MiB, expiring the oldest "
+              f"{args.days - args.keep} of {args.days} days")
+
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        shutil.copy(seed_path, legacy_path)
+        legacy = DatabaseManager(legacy_path)
+        threshold = (datetime.now() - timedelta(days=args.keep)).isoformat()
+
+        def one_shot():
+            with legacy.connection() as conn, conn:
+                conn.execute('DELETE FROM readings WHERE timestamp < ?', (threshold,))
+                conn.execute('DELETE FROM alerts WHERE timestamp < ?', (threshold,))
+
+        _, elapsed, latencies = ingest_latencies(legacy_path, one_shot)
+        report('single DELETE', elapsed, latencies, legacy_path)
+        legacy.close()
+
+        chunked_path = os.path.join(tmp, 'chunked.db')
+        shutil.copy(seed_path, chunked_path)
+        chunked = DatabaseManager(chunked_path)
+        archive_dir = os.path.join(tmp, 'archive')
+        retention = RetentionManager(chunked, lock_path=os.path.join(tmp, 'retention.lock'),
+                                     days=args.keep, archive_dir=archive_dir)
+
+        stats, elapsed, latencies = ingest_latencies(chunked_path, retention.run_pass)
+        with chunked.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        report('RetentionManager', elapsed, latencies, chunked_path)
+        chunked.close()
+
+        archived = []
+        for path in sorted(glob.glob(os.path.join(archive_dir, 'readings', '*.ndjson.gz'))):
+            with gzip.open(path, 'rt') as archive:
+                archived.extend(json.loads(line) for line in archive)
+        assert len(archived) == stats['readings'] == len({row['id'] for row in archived}), \
+            'archive does not match the deleted readings'
+        assert all(row['timestamp'] < threshold for row in archived)
+        print(f"archived {len(archived)} readings into "
+              f"{len(glob.glob(os.path.join(archive_dir, 'readings', '*')))} daily files, "
+              f"freed {stats['freed_pages']} pages")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Fan out live readings to many /api/stream subscribers.
+
+Opens N subscriber streams on one EventBroadcaster while a second
+DatabaseManager plays the part of another worker that writes readings.
+Checks every subscriber receives every reading exactly once and in
+order, that a Last-Event-ID resume picks up where a client left off,
+and reports delivery latency and the number of database queries made.
+
+    python -m benchmarks.bench_stream --subscribers 200 --readings 300
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from services.database import DatabaseManager
+from services.event_stream import EventBroadcaster
+
+
+class CountingDatabaseManager(DatabaseManager):
+    """Counts the tail queries the broadcaster issues"""
+
+    queries = 0
+
+    def get_rows_after(self, *args, **kwargs):
+        self.queries += 1
+        return super().get_rows_after(*args, **kwargs)
+
+
+def make_reading(i, area_id):
+    return {
+        'area_id': area_id,
+        'methane': float(i),
+        'co': 10.0,
+        'temperature': 24.0,
+        'humidity': 55.0,
+        'water_level': 40.0,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def consume(stream, expected, received, stop_after=None):
+    """Collect reading events from a subscription until ``expected`` have arrived"""
+    last_id = None
+    for frame in stream:
+        if not frame.startswith('id:'):
+            continue
+        lines = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+        if lines['event'] == 'reading':
+            received.append((time.perf_counter(), json.loads(lines['data'])['methane']))
+            last_id = lines['id']
+        if len(received) >= (stop_after or expected):
+            stream.close()
+            return last_id
+    return last_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--readings', type=int, default=300)
+    parser.add_argument('--interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        db_manager = CountingDatabaseManager(db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.init_database()
+        other_worker = DatabaseManager(db_path)
+
+        broadcaster = EventBroadcaster(db_manager, replay_size=args.readings // 2, poll_interval=0.05)
+
+        results = [[] for _ in range(args.subscribers)]
+        threads = [
+            threading.Thread(target=consume, args=(broadcaster.subscribe(), args.readings, results[i]))
+            for i in range(args.subscribers)
+        ]
+        for thread in threads:
+            thread.start()
+        while broadcaster.subscribers < args.subscribers:
+            time.sleep(0.01)
+
+        # A client that disconnects early and resumes once the replay buffer has moved on
+        early = []
+        early_last_id = []
+        early_stream = broadcaster.subscribe()
+        early_thread = threading.Thread(target=lambda: early_last_id.append(
+            consume(early_stream, args.readings, early, stop_after=args.readings // 4)))
+        early_thread.start()
+        while broadcaster.subscribers < args.subscribers + 1:
+            time.sleep(0.01)
+
+        sent_at = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            queries_before = db_manager.queries
+            start = time.perf_counter()
+            for i in range(args.readings):
+                sent_at[float(i)] = time.perf_counter()
+                other_worker.store_reading(make_reading(i, i % 3 + 1))
+                time.sleep(args.interval)
+
+        for thread in threads + [early_thread]:
+            thread.join(timeout=30)
+        elapsed = time.perf_counter() - start
+        queries = db_manager.queries - queries_before
+
+        resumed = []
+        consume(broadcaster.subscribe(early_last_id[0]), args.readings, resumed,
+                stop_after=args.readings - len(early))
+
+        db_manager.close()
+        other_worker.close()
+
+    expected = [float(i) for i in range(args.readings)]
+    assert all([value for _, value in received] == expected for received in results), \
+        'a subscriber missed or reordered readings'
+    assert [value for _, value in early + resumed] == expected, 'resume lost or repeated readings'
+
+    latencies = [(at - sent_at[value]) * 1000 for received in results for at, value in received]
+    print(f"{args.subscribers} subscribers x {args.readings} readings delivered in order")
+    print(f"latency: median {statistics.median(latencies):.1f} ms, "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)]:.1f} ms")
+    print(f"database queries: {queries} over {elapsed:.1f}s "
+          f"(independent of subscriber count)")
+    print(f"Last-Event-ID resume after {len(early)} readings replayed the other {len(resumed)} exactly")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compare text ISO timestamps with integer epoch milliseconds for range scans.
+
+Fills a database with readings whose timestamps carry mixed UTC offsets,
+as devices in different timezones send them, and compares the old
+(area_id, timestamp) text index with the (area_id, ts) integer one:
+on-disk index size, time per range query, and how many rows each gets
+right. It then clears ts and the schema version and times the migration
+that backfills them.
+
+    python -m benchmarks.bench_timestamps --days 30 --areas 3
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.database import DatabaseManager, SELECT_AREA_READINGS_SQL, to_epoch_ms
+
+LEGACY_AREA_READINGS_SQL = '''
+    SELECT * FROM readings
+    WHERE area_id = ? AND timestamp >= ?
+    ORDER BY timestamp DESC
+'''
+
+OFFSETS = [None, timezone.utc, timezone(timedelta(hours=5, minutes=30)), timezone(timedelta(hours=-4))]
+
+
+def fill(db_manager, days, areas):
+    now = datetime.now().astimezone()
+    steps = days * 24 * 60  # one reading per minute per area
+    for start in range(0, steps, 20000):
+        readings = []
+        for i in range(start, min(start + 20000, steps)):
+            moment = now - timedelta(minutes=steps - i)
+            offset = OFFSETS[i % len(OFFSETS)]
+            timestamp = moment.replace(tzinfo=None) if offset is None else moment.astimezone(offset)
+            readings.extend({
+                'area_id': area_id,
+                'methane': float(i % 900),
+                'co': float(i % 40),
+                'temperature': 24.0,
+                'humidity': 55.0,
+                'water_level': 40.0,
+                'timestamp': timestamp.isoformat()
+            } for area_id in range(1, areas + 1))
+        db_manager.store_readings(readings)
+
+
+def index_size(conn, name):
+    return conn.execute('SELECT SUM(pgsize) FROM dbstat WHERE name = ?', (name,)).fetchone()[0] or 0
+
+
+def time_query(conn, sql, params, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        rows = conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / calls * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--calls', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.init_database()
+        fill(db_manager, args.days, args.areas)
+
+        with db_manager.connection() as conn:
+            conn.execute('CREATE INDEX idx_readings_area_time ON readings(area_id, timestamp)')
+            total = conn.execute('SELECT COUNT(*) FROM readings').fetchone()[0]
+            print(f"{total} readings; index size: text {index_size(conn, 'idx_readings_area_time') / 2 ** 20:.1f} MiB, "
+                  f"integer {index_size(conn, 'idx_readings_area_ts') / 2 ** 20:.1f} MiB")
+
+            for hours in (1, 24, 24 * 7):
+                since = datetime.now() - timedelta(hours=hours)
+                expected = sum(1 for (ts,) in conn.execute('SELECT ts FROM readings WHERE area_id = 1')
+                               if ts >= to_epoch_ms(since))
+                text_ms, text_rows = time_query(conn, LEGACY_AREA_READINGS_SQL,
+                                                (1, since.isoformat()), args.calls)
+                int_ms, int_rows = time_query(conn, SELECT_AREA_READINGS_SQL,
+                                              (1, to_epoch_ms(since)), args.calls)
+                assert len(int_rows) == expected
+                print(f"last {hours:>3}h  text {text_ms:7.2f} ms ({len(text_rows)} rows)  "
+                      f"integer {int_ms:7.2f} ms ({len(int_rows)} rows, expected {expected})")
+
+            # Put the database back at schema version 0 to time the backfill
+            conn.execute('DROP INDEX idx_readings_area_time')
+            conn.execute('UPDATE readings SET ts = NULL')
+            conn.execute('PRAGMA user_version = 0')
+            conn.commit()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.migrate()
+        elapsed = time.perf_counter() - start
+        print(f"migration backfilled {total} rows in {elapsed:.2f} s ({total / elapsed:,.0f} rows/s)")
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
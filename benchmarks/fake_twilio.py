@@ -0,0 +1,105 @@
+"""Local stand-in for the Twilio Messages API.
+
+Accepts the same POST /2010-04-01/Accounts/<sid>/Messages.json the twilio
+client sends, records each message and answers like Twilio would after a
+configurable delay. Point SMSService at it with TWILIO_API_BASE:
+
+    python -m benchmarks.fake_twilio --port 8765 --latency 0.3
+    TWILIO_API_BASE=http://127.0.0.1:8765 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeTwilioServer:
+    """Threaded fake Twilio API; every ``fail_every``-th request returns a 503"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_every=0):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.messages = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+                status, payload = server.handle_message(self.path, form)
+
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def handle_message(self, path, form):
+        time.sleep(self.latency)
+
+        with self._lock:
+            self.requests += 1
+            if self.fail_every and self.requests % self.fail_every == 0:
+                return 503, {'code': 20503, 'message': 'Service unavailable', 'status': 503}
+
+            sid = 'SM' + uuid.uuid4().hex
+            self.messages.append({'sid': sid, 'to': form.get('To'), 'body': form.get('Body'),
+                                  'received_at': time.time()})
+
+        return 201, {
+            'sid': sid,
+            'to': form.get('To'),
+            'from': form.get('From'),
+            'body': form.get('Body'),
+            'status': 'queued',
+            'account_sid': path.split('/')[3] if path.count('/') >= 4 else None,
+            'uri': path
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--fail-every', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeTwilioServer(args.host, args.port, args.latency, args.fail_every)
+    print(f"Fake Twilio API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Replay multi-zone ESP32 payloads from many virtual devices to find where ingest saturates.
+
+Each virtual device POSTs the payload lemos_esp32_multi_zone.ino sends
+(area_1..area_3 plus the shared sensors, so three readings per request)
+every --interval seconds, opening a new connection per request as the
+firmware's HTTPClient does unless --keep-alive is given. The firmware
+sends every 30 s, so a device posting every 1 s stands for 30 real ones.
+
+Each step of --devices runs for --duration seconds and reports offered
+and achieved requests/s, readings/s, latency percentiles and errors.
+The first step whose achieved rate falls below 95% of the offered rate,
+or whose error rate passes 1%, is the saturation point.
+
+Start a server first, the way Procfile does, for example:
+
+    gunicorn app:app --bind 127.0.0.1:5000 --worker-class gthread --threads 100
+    python -m benchmarks.load_simulator --devices 10 25 50 100 200 --duration 20
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+
+def make_payload(rng, device, area_ids):
+    """The JSON document sendDataToServer() builds"""
+    payload = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'device_id': f'ESP32_MultiZone_{device + 1:03d}'
+    }
+    for index, area_id in enumerate(area_ids, start=1):
+        methane = rng.gauss(400, 50) * (2.5 if rng.random() < 0.01 else 1)
+        payload[f'area_{index}'] = {
+            'area_id': area_id,
+            'methane': round(methane, 2),
+            'co': round(max(5.0, rng.gauss(10, 2)), 2),
+            'temperature': round(rng.gauss(25, 3), 2),
+            'humidity': round(min(90.0, max(20.0, rng.gauss(50, 10))), 2),
+            'alert_active': methane > 1000
+        }
+    payload['water_level'] = round(rng.gauss(100, 10), 2)
+    payload['soil_moisture'] = round(rng.gauss(500, 50), 2)
+    payload['vibration'] = int(rng.random() < 0.05)
+    payload['ir_detection'] = int(rng.random() < 0.1)
+    return payload
+
+
+class VirtualDevice(threading.Thread):
+    def __init__(self, device, url, interval, deadline, keep_alive, distinct_areas, timeout):
+        super().__init__(daemon=True)
+        self.device = device
+        self.url = urlsplit(url)
+        self.interval = interval
+        self.deadline = deadline
+        self.keep_alive = keep_alive
+        self.area_ids = [3 * device + i for i in (1, 2, 3)] if distinct_areas else [1, 2, 3]
+        self.timeout = timeout
+        self.rng = random.Random(device)
+        self.latencies = []
+        self.statuses = {}
+        self.scheduled = 0
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.url.hostname, self.url.port, timeout=self.timeout)
+
+    def run(self):
+        connection = None
+        # A random phase, so devices do not all send in step
+        next_send = time.monotonic() + self.rng.uniform(0, self.interval)
+        # Sends the schedule called for; ones a slow server made the device miss still count
+        self.scheduled = max(0, int((self.deadline - next_send) // self.interval) + 1)
+        while True:
+            now = time.monotonic()
+            if next_send > now:
+                time.sleep(next_send - now)
+            if time.monotonic() >= self.deadline:
+                break
+            # A late device sends once and carries on, without a burst to catch up
+            next_send = max(time.monotonic(), next_send + self.interval)
+
+            body = json.dumps(make_payload(self.rng, self.device, self.area_ids))
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = self.connect()
+                connection.request('POST', self.url.path or '/', body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                status = type(e).__name__
+                if connection is not None:
+                    connection.close()
+                    connection = None
+            elapsed = time.perf_counter() - start
+
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(elapsed)
+            if not self.keep_alive and connection is not None:
+                connection.close()
+                connection = None
+
+        if connection is not None:
+            connection.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_step(args, devices):
+    deadline = time.monotonic() + args.duration
+    threads = [VirtualDevice(device, args.url, args.interval, deadline, args.keep_alive,
+                             args.distinct_areas, args.timeout) for device in range(devices)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(latency for thread in threads for latency in thread.latencies)
+    statuses = {}
+    for thread in threads:
+        for status, count in thread.statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    requests = sum(statuses.values())
+    errors = requests - statuses.get('200', 0)
+
+    return {
+        'devices': devices,
+        'offered_rps': sum(thread.scheduled for thread in threads) / elapsed,
+        'achieved_rps': len(latencies) / elapsed,
+        'readings_per_sec': 3 * len(latencies) / elapsed,
+        'requests': requests,
+        'error_rate': errors / requests if requests else 0.0,
+        'statuses': statuses,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else float('nan')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000/api/readings')
+    parser.add_argument('--devices', type=int, nargs='+', default=[10, 25, 50, 100, 200])
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between posts from one device')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds per step')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--keep-alive', action='store_true', help='reuse one connection per device')
+    parser.add_argument('--distinct-areas', action='store_true',
+                        help='give each device its own three area ids instead of 1-3 as the firmware does')
+    parser.add_argument('--out', help='write the results of every step here as JSON')
+    args = parser.parse_args()
+
+    results = []
+    saturation = None
+    for devices in args.devices:
+        result = run_step(args, devices)
+        results.append(result)
+        errors = ', '.join(f'{status} x{count}' for status, count in sorted(result['statuses'].items())
+                           if status != '200')
+        print(f"{devices:>5} devices  offered {result['offered_rps']:8.1f} req/s  "
+              f"achieved {result['achieved_rps']:8.1f} req/s ({result['readings_per_sec']:8.1f} readings/s)  "
+              f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  p99 {result['p99_ms']:7.1f} ms"
+              f"{'  errors: ' + errors if errors else ''}", flush=True)
+        if saturation is None and (result['achieved_rps'] < 0.95 * result['offered_rps']
+                                   or result['error_rate'] > 0.01):
+            saturation = result
+
+    if saturation is None:
+        print(f"not saturated up to {args.devices[-1]} devices")
+    else:
+        print(f"saturated at {saturation['devices']} devices: {saturation['offered_rps']:.1f} req/s offered, "
+              f"{saturation['achieved_rps']:.1f} achieved, {saturation['error_rate']:.1%} errors")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'url': args.url, 'interval': args.interval, 'keep_alive': args.keep_alive,
+                       'steps': results, 'saturated_at': saturation and saturation['devices']}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
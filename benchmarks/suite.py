@@ -0,0 +1,282 @@
+"""Run the hot-path benchmarks and compare the results with a baseline.
+
+Drives the real code paths on fixed, seeded data: POST /api/readings
+through the Flask test client, DatabaseManager.get_readings on tables of
+several sizes, ForecastingModel.prepare_features/train/predict and
+DataProcessor.process_reading. Each case reports throughput and
+p50/p95/p99 latency per operation; run writes them as JSON along with
+the environment they were measured in.
+
+compare flags any case whose p50 latency rose, or whose throughput fell,
+by more than --threshold against the baseline, and exits with status 1
+if there are any, so it can gate a change before it is deployed.
+
+    python -m benchmarks.suite run --out baseline.json
+    python -m benchmarks.suite run --out current.json
+    python -m benchmarks.suite compare baseline.json current.json --threshold 0.1
+
+--quick runs fewer iterations and leaves out the 1M-row table. Results
+are only comparable from the same machine; on a shared one, run-to-run
+noise of 10-15% is normal, so widen --threshold there.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from importlib import metadata
+
+import numpy as np
+
+DB_SIZES = [1000, 100000, 1000000]
+QUICK_DB_SIZES = [1000, 100000]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(fn, iterations, warmup=3, ops=1):
+    """Time fn() iterations times after warmup calls; each call does ops operations.
+
+    Returns latency per operation and throughput in operations per second.
+    Cheap operations are timed ops at a time so timer overhead stays out.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / ops)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'ops': iterations * ops,
+        'throughput': 1 / statistics.fmean(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000
+    }
+
+
+def make_reading(rng, area_id, timestamp):
+    return {
+        'area_id': area_id,
+        'methane': round(rng.uniform(300, 1200), 2),
+        'co': round(rng.uniform(0, 60), 2),
+        'temperature': round(rng.uniform(15, 40), 2),
+        'humidity': round(rng.uniform(20, 90), 2),
+        'water_level': round(rng.uniform(0, 100), 2),
+        'timestamp': timestamp.isoformat()
+    }
+
+
+def bench_ingest(tmp, quick):
+    """POST /api/readings with one reading, in the default sync ingest mode"""
+    os.environ['LEMOS_BACKGROUND'] = '0'
+    os.environ['LEMOS_DB_PATH'] = os.path.join(tmp, 'ingest.db')
+    os.environ.setdefault('LEMOS_LOG_LEVEL', 'WARNING')
+    import app as lemos_app
+
+    db_manager = lemos_app.db_manager
+
+    client = lemos_app.app.test_client()
+    rng = random.Random(1)
+    now = datetime.now()
+    readings = iter([make_reading(rng, i % 3 + 1, now + timedelta(seconds=i)) for i in range(10000)])
+
+    def post():
+        response = client.post('/api/readings', json=next(readings))
+        assert response.status_code == 200, response.get_data()
+
+    result = measure(post, 300 if quick else 2000, warmup=100)
+    db_manager.close()
+    return {'ingest.receive_readings': result}
+
+
+def bench_database(tmp, quick):
+    """DatabaseManager.get_readings for the whole window of each table size"""
+    from services.database import DatabaseManager
+
+    results = {}
+    for size in QUICK_DB_SIZES if quick else DB_SIZES:
+        db_manager = DatabaseManager(os.path.join(tmp, f'readings_{size}.db'))
+        db_manager.init_database()
+
+        rng = random.Random(size)
+        start = datetime.now() - timedelta(seconds=5 * size)
+        for offset in range(0, size, 20000):
+            db_manager.store_readings([
+                make_reading(rng, i % 3 + 1, start + timedelta(seconds=5 * i))
+                for i in range(offset, min(offset + 20000, size))
+            ])
+
+        hours = 5 * size / 3600 + 1
+        iterations = max(3, min(50, 2000000 // size)) // (2 if quick else 1)
+
+        def query():
+            assert len(db_manager.get_readings(hours=hours)) == size
+
+        result = measure(query, max(3, iterations), warmup=1)
+        result['rows_per_sec'] = result['throughput'] * size
+        results[f'database.get_readings[{size}]'] = result
+        db_manager.close()
+    return results
+
+
+def bench_forecast(tmp, quick):
+    """ForecastingModel.prepare_features, train and a 48 hour predict"""
+    from ml.forecasting import ForecastingModel
+    from benchmarks.bench_features import make_history
+
+    model = ForecastingModel(model_path=os.path.join(tmp, 'models'), autoload=False)
+    history = make_history(10000)
+    training = make_history(2000, seed=7)
+    recent = make_history(500, seed=9)
+
+    results = {
+        'forecast.prepare_features[10000]': measure(lambda: model.prepare_features(history), 10 if quick else 30),
+        'forecast.train[2000]': measure(lambda: model.train(training), 2 if quick else 5, warmup=1),
+    }
+    assert model.is_trained
+    results['forecast.predict[48h]'] = measure(lambda: model.predict(recent, hours=48), 10 if quick else 30)
+    return results
+
+
+def bench_processing(tmp, quick):
+    """DataProcessor.process_reading on single readings, timed 1000 at a time"""
+    from ingestion.data_processor import DataProcessor
+
+    processor = DataProcessor()
+    rng = random.Random(3)
+    now = datetime.now()
+    readings = [make_reading(rng, i % 3 + 1, now + timedelta(seconds=i)) for i in range(1000)]
+
+    def process():
+        # Readings with a timestamp are not modified, so they can be reused
+        for reading in readings:
+            processor.process_reading(reading)
+
+    return {'processing.process_reading': measure(process, 20 if quick else 100, ops=len(readings))}
+
+
+GROUPS = {
+    'ingest': bench_ingest,
+    'database': bench_database,
+    'forecast': bench_forecast,
+    'processing': bench_processing
+}
+
+
+def package_version(name):
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'time': datetime.now().astimezone().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'packages': {name: package_version(name) for name in ('numpy', 'pandas', 'scikit-learn', 'flask', 'orjson')}
+    }
+
+
+def run(args):
+    random.seed(0)
+    np.random.seed(0)
+    groups = args.only or list(GROUPS)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for group in groups:
+            print(f"running {group}...", file=sys.stderr)
+            for name, result in GROUPS[group](tmp, args.quick).items():
+                results[name] = result
+                print(f"  {name:<34} {result['throughput']:>12,.1f} ops/s  p50 {result['p50_ms']:9.3f} ms  "
+                      f"p95 {result['p95_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms", file=sys.stderr)
+
+    document = {'environment': environment(), 'quick': args.quick, 'results': results}
+    output = json.dumps(document, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = []
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        before = baseline['results'].get(name)
+        after = current['results'].get(name)
+        if before is None or after is None:
+            print(f"{name:<34} only in {'current' if before is None else 'baseline'}")
+            continue
+
+        latency_change = after['p50_ms'] / before['p50_ms'] - 1 if before['p50_ms'] else 0.0
+        throughput_change = after['throughput'] / before['throughput'] - 1
+        regressed = latency_change > args.threshold or throughput_change < -args.threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<34} p50 {before['p50_ms']:9.3f} -> {after['p50_ms']:9.3f} ms ({latency_change:+7.1%})  "
+              f"throughput {throughput_change:+7.1%}  p99 {before['p99_ms']:9.3f} -> {after['p99_ms']:9.3f} ms"
+              f"{'  REGRESSION' if regressed else ''}")
+
+    if baseline.get('environment', {}).get('platform') != current.get('environment', {}).get('platform'):
+        print('warning: baseline was measured on a different platform')
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and write JSON results')
+    run_parser.add_argument('--out', help='write results here instead of stdout')
+    run_parser.add_argument('--only', nargs='+', choices=list(GROUPS), help='run only these groups')
+    run_parser.add_argument('--quick', action='store_true', help='fewer iterations, no 1M-row table')
+
+    compare_parser = commands.add_parser('compare', help='flag regressions against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='allowed fractional change, 0.1 for 10%%')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
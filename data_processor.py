@@ -1,6 +1,39 @@
 from datetime import datetime
 import json
-from typing import Dict, Any
+import logging
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENSOR_FIELDS = ['methane', 'co', 'temperature', 'humidity', 'water_level']
+_SENSOR_KEYS = frozenset(SENSOR_FIELDS)
+
+# Reasonable range for each sensor
+SENSOR_RANGES = {
+    'methane': (0, 10000),      # ppm
+    'co': (0, 1000),            # ppm
+    'temperature': (-40, 85),    # celsius
+    'humidity': (0, 100),        # percentage
+    'water_level': (0, 100)      # percentage
+}
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """Element-wise round(value, 2), bit for bit.
+
+    np.round scales by 100 and rounds, which can land on the other side of
+    a tie than Python's correctly rounded round(); those few values, and
+    ones too large to scale exactly, are redone with round().
+    """
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    with np.errstate(invalid='ignore'):
+        redo = ~(np.abs(values) < 1e6) | (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in np.flatnonzero(redo):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
 
 class DataProcessor:
     def __init__(self):
@@ -11,6 +44,8 @@ class DataProcessor:
             'humidity': 1.0,
             'water_level': 1.0
         }
+        # area_id -> {sensor_type: factor}, overriding the defaults above
+        self.area_calibration_factors = {}
     
     def process_reading(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process and validate sensor reading"""
@@ -19,58 +54,188 @@ class DataProcessor:
             if 'timestamp' not in raw_data:
                 raw_data['timestamp'] = datetime.now().isoformat()
             
+            area_id = int(raw_data['area_id'])
+            
             # Apply calibration factors
             processed_data = {
-                'area_id': int(raw_data['area_id']),
-                'methane': self.calibrate_value(raw_data['methane'], 'methane'),
-                'co': self.calibrate_value(raw_data['co'], 'co'),
-                'temperature': self.calibrate_value(raw_data['temperature'], 'temperature'),
-                'humidity': self.calibrate_value(raw_data['humidity'], 'humidity'),
-                'water_level': self.calibrate_value(raw_data['water_level'], 'water_level'),
+                'area_id': area_id,
+                'methane': self.calibrate_value(raw_data['methane'], 'methane', area_id),
+                'co': self.calibrate_value(raw_data['co'], 'co', area_id),
+                'temperature': self.calibrate_value(raw_data['temperature'], 'temperature', area_id),
+                'humidity': self.calibrate_value(raw_data['humidity'], 'humidity', area_id),
+                'water_level': self.calibrate_value(raw_data['water_level'], 'water_level', area_id),
                 'timestamp': raw_data['timestamp']
             }
             
+            # NaN cannot be stored and infinity is no measurement; reject
+            # the reading rather than let it fail a whole write later
+            for field in SENSOR_FIELDS:
+                if not math.isfinite(processed_data[field]):
+                    raise ValueError(f"{field} must be a finite number")
+            
             # Validate ranges
             processed_data = self.validate_ranges(processed_data)
             
             return processed_data
-            
+        
         except Exception as e:
             raise ValueError(f"Data processing failed: {e}")
     
-    def calibrate_value(self, value: float, sensor_type: str) -> float:
+    def process_batch(self, raw_readings: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """Process many readings, returning (processed, error) for each in input order.
+        
+        Gives exactly what process_reading would for each reading, but
+        calibrates, rounds and clamps a whole column at a time with NumPy
+        and reports out-of-range values as one summary line per batch.
+        Readings the column path cannot take as-is go through
+        process_reading one by one.
+        """
+        results = [None] * len(raw_readings)
+        
+        rows = []
+        area_ids = []
+        for index, raw_data in enumerate(raw_readings):
+            try:
+                if not isinstance(raw_data, dict) or not raw_data.keys() >= _SENSOR_KEYS:
+                    raise ValueError
+                area_ids.append(int(raw_data['area_id']))
+            except Exception:
+                results[index] = self._process_one(raw_data)
+                continue
+            if 'timestamp' not in raw_data:
+                raw_data['timestamp'] = datetime.now().isoformat()
+            rows.append(index)
+        
+        columns = {}
+        unconvertible = set()
+        for field in SENSOR_FIELDS:
+            columns[field], failed = self._float_column([raw_readings[index][field] for index in rows])
+            unconvertible.update(failed)
+        
+        if unconvertible:
+            # Let process_reading raise the same error it always has
+            for position in sorted(unconvertible):
+                results[rows[position]] = self._process_one(raw_readings[rows[position]])
+            keep = np.setdiff1d(np.arange(len(rows)), sorted(unconvertible))
+            rows = [rows[position] for position in keep]
+            area_ids = [area_ids[position] for position in keep]
+            columns = {field: values[keep] for field, values in columns.items()}
+        
+        areas = {}
+        area_index = np.array([areas.setdefault(area_id, len(areas)) for area_id in area_ids], dtype=np.intp)
+        calibrated = {}
+        finite = np.ones(len(rows), dtype=bool)
+        for field in SENSOR_FIELDS:
+            factors = np.array([self.calibration_factor(field, area_id) for area_id in areas], dtype=np.float64)
+            calibrated[field] = round2(columns[field] * factors[area_index])
+            finite &= np.isfinite(calibrated[field])
+        
+        if not finite.all():
+            # process_reading rejects NaN and infinity with its own error
+            for position in np.flatnonzero(~finite):
+                results[rows[position]] = self._process_one(raw_readings[rows[position]])
+            keep = np.flatnonzero(finite)
+            rows = [rows[position] for position in keep]
+            area_ids = [area_ids[position] for position in keep]
+            calibrated = {field: values[keep] for field, values in calibrated.items()}
+        
+        out_of_range = {}
+        output = {}
+        for field in SENSOR_FIELDS:
+            values = calibrated[field]
+            min_val, max_val = SENSOR_RANGES[field]
+            low = values < min_val
+            high = values > max_val
+            field_output = values.tolist()
+            # Clamped values are the range bounds themselves, as in validate_ranges
+            for position in np.flatnonzero(low):
+                field_output[position] = min_val
+            for position in np.flatnonzero(high):
+                field_output[position] = max_val
+            
+            count = int(np.count_nonzero(low) + np.count_nonzero(high))
+            if count:
+                out_of_range[field] = count
+            output[field] = field_output
+        
+        timestamps = [raw_readings[index]['timestamp'] for index in rows]
+        processed = [
+            {'area_id': area_id, 'methane': methane, 'co': co, 'temperature': temperature,
+             'humidity': humidity, 'water_level': water_level, 'timestamp': timestamp}
+            for area_id, methane, co, temperature, humidity, water_level, timestamp
+            in zip(area_ids, *(output[field] for field in SENSOR_FIELDS), timestamps)
+        ]
+        for index, processed_data in zip(rows, processed):
+            results[index] = (processed_data, None)
+        
+        if out_of_range:
+            summary = ', '.join(f"{field} {count}" for field, count in out_of_range.items())
+            logger.warning("Clamped values outside normal range in a batch of %d: %s", len(raw_readings), summary,
+                           extra={'out_of_range': out_of_range})
+        
+        return results
+    
+    def _process_one(self, raw_data) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        try:
+            return self.process_reading(raw_data), None
+        except ValueError as e:
+            return None, str(e)
+    
+    @staticmethod
+    def _float_column(values: List[Any]) -> Tuple[np.ndarray, List[int]]:
+        """float() of every value, or 0.0 where calibrate_value would fall back;
+        also returns the positions float() raised anything else for"""
+        if set(map(type, values)) <= {float, int}:
+            try:
+                return np.array(values, dtype=np.float64), []
+            except OverflowError:
+                pass
+        
+        column = np.zeros(len(values))
+        failed = []
+        for position, value in enumerate(values):
+            try:
+                column[position] = float(value)
+            except (ValueError, TypeError):
+                pass
+            except Exception:
+                failed.append(position)
+        return column, failed
+    
+    def calibration_factor(self, sensor_type: str, area_id: Optional[int] = None) -> float:
+        """The area's own factor for a sensor if it has one, else the default"""
+        area_factors = self.area_calibration_factors.get(area_id)
+        if area_factors and sensor_type in area_factors:
+            return area_factors[sensor_type]
+        return self.calibration_factors.get(sensor_type, 1.0)
+    
+    def calibrate_value(self, value: float, sensor_type: str, area_id: Optional[int] = None) -> float:
         """Apply calibration factor to sensor value"""
         try:
-            calibrated = float(value) * self.calibration_factors.get(sensor_type, 1.0)
+            calibrated = float(value) * self.calibration_factor(sensor_type, area_id)
             return round(calibrated, 2)
         except (ValueError, TypeError):
             return 0.0
     
     def validate_ranges(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate sensor values are within reasonable ranges"""
-        # Define reasonable ranges for each sensor
-        ranges = {
-            'methane': (0, 10000),      # ppm
-            'co': (0, 1000),            # ppm
-            'temperature': (-40, 85),    # celsius
-            'humidity': (0, 100),        # percentage
-            'water_level': (0, 100)      # percentage
-        }
-        
-        for key, (min_val, max_val) in ranges.items():
+        for key, (min_val, max_val) in SENSOR_RANGES.items():
             if key in data:
                 value = data[key]
                 if value < min_val or value > max_val:
-                    print(f"Warning: {key} value {value} outside normal range ({min_val}-{max_val})")
+                    logger.debug("%s value %s outside normal range (%s-%s)", key, value, min_val, max_val)
                     # Clamp to valid range
                     data[key] = max(min_val, min(max_val, value))
         
         return data
     
-    def update_calibration(self, sensor_type: str, factor: float):
-        """Update calibration factor for a sensor type"""
-        if sensor_type in self.calibration_factors:
+    def update_calibration(self, sensor_type: str, factor: float, area_id: Optional[int] = None):
+        """Update calibration factor for a sensor type, for one area or as the default"""
+        if sensor_type not in self.calibration_factors:
+            logger.warning("Unknown sensor type: %s", sensor_type)
+        elif area_id is None:
             self.calibration_factors[sensor_type] = factor
-            print(f"Updated {sensor_type} calibration factor to {factor}")
+            logger.info("Updated %s calibration factor to %s", sensor_type, factor)
         else:
-            print(f"Unknown sensor type: {sensor_type}")
+            self.area_calibration_factors.setdefault(area_id, {})[sensor_type] = factor
+            logger.info("Updated %s calibration factor for area %s to %s", sensor_type, area_id, factor)
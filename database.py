@@ -1,153 +1,965 @@
 import sqlite3
+import fcntl
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple, Union
 
-class DatabaseManager:
-    def __init__(self, db_path='lemos.db'):
-        self.db_path = db_path
-    
-    def init_database(self):
-        """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Sensor readings table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS readings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                area_id INTEGER NOT NULL,
-                methane REAL NOT NULL,
-                co REAL NOT NULL,
-                temperature REAL NOT NULL,
-                humidity REAL NOT NULL,
-                water_level REAL NOT NULL,
-                timestamp TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+import numpy as np
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# SQL is kept in module-level constants so every call passes the identical
+# string and hits the connection's prepared statement cache.
+INSERT_READING_SQL = '''
+    INSERT INTO readings (area_id, methane, co, temperature, humidity, water_level, timestamp, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Range filters and ordering use ts, integer UTC epoch milliseconds; the
+# timestamp column keeps the text the device sent
+SELECT_AREA_READINGS_SQL = '''
+    SELECT * FROM readings
+    WHERE area_id = ? AND ts >= ?
+    ORDER BY ts DESC, id DESC
+'''
+
+SELECT_READINGS_SQL = '''
+    SELECT * FROM readings
+    WHERE ts >= ?
+    ORDER BY ts DESC, id DESC
+'''
+
+SELECT_LAST_READING_MARKER_SQL = '''
+    SELECT id, ts FROM readings
+    WHERE area_id = ?
+    ORDER BY ts DESC, id DESC
+    LIMIT 1
+'''
+
+# Loose index scan: hop from one area_id to the next through the
+# (area_id, ts) index, keeping areas with a reading since the cutoff
+SELECT_ACTIVE_AREAS_SQL = '''
+    WITH RECURSIVE areas(area_id) AS (
+        SELECT MIN(area_id) FROM readings
+        UNION ALL
+        SELECT (SELECT MIN(area_id) FROM readings WHERE area_id > areas.area_id)
+        FROM areas WHERE areas.area_id IS NOT NULL
+    )
+    SELECT area_id FROM areas
+    WHERE area_id IS NOT NULL
+      AND EXISTS (SELECT 1 FROM readings r WHERE r.area_id = areas.area_id AND r.ts >= ?)
+'''
+
+SELECT_LATEST_READINGS_SQL = '''
+    SELECT * FROM latest_readings ORDER BY area_id
+'''
+
+SELECT_LATEST_READING_SQL = '''
+    SELECT * FROM latest_readings WHERE area_id = ?
+'''
+
+SELECT_RECENT_AREA_READINGS_SQL = '''
+    SELECT * FROM readings
+    WHERE area_id = ?
+    ORDER BY ts DESC, id DESC
+    LIMIT ?
+'''
+
+SELECT_AREA_READINGS_AFTER_ID_SQL = '''
+    SELECT * FROM readings
+    WHERE area_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+SELECT_READINGS_AFTER_ID_SQL = '''
+    SELECT * FROM readings
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+SELECT_ALERTS_AFTER_ID_SQL = '''
+    SELECT * FROM alerts
+    WHERE id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+# Column name -> NumPy dtype for the columnar query path
+READING_COLUMN_DTYPES = {
+    'id': np.int64,
+    'area_id': np.int64,
+    'methane': np.float64,
+    'co': np.float64,
+    'temperature': np.float64,
+    'humidity': np.float64,
+    'water_level': np.float64,
+    'timestamp': object,
+    'created_at': object,
+    'ts': np.int64
+}
+
+# Rollup resolution name -> bucket width in seconds. Buckets start on
+# multiples of the width in epoch seconds.
+ROLLUP_RESOLUTIONS = {
+    '1m': 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60
+}
+
+ROLLUP_METRICS = ['methane', 'co', 'temperature', 'humidity', 'water_level']
+
+def _rollup_table(resolution: str) -> str:
+    return f'readings_rollup_{resolution}'
+
+def _rollup_columns() -> List[str]:
+    return [f'{metric}_{stat}' for metric in ROLLUP_METRICS for stat in ('min', 'max', 'sum')]
+
+def _upsert_rollup_sql(resolution: str) -> str:
+    """Merge a pre-aggregated bucket into the stored one; min/max/sum/count all
+    combine associatively, so buckets can be updated in any order."""
+    columns = ['area_id', 'bucket', 'count'] + _rollup_columns()
+    updates = ['count = count + excluded.count']
+    for metric in ROLLUP_METRICS:
+        updates += [
+            f'{metric}_min = MIN({metric}_min, excluded.{metric}_min)',
+            f'{metric}_max = MAX({metric}_max, excluded.{metric}_max)',
+            f'{metric}_sum = {metric}_sum + excluded.{metric}_sum'
+        ]
+    return f'''
+    INSERT INTO {_rollup_table(resolution)} ({', '.join(columns)})
+    VALUES ({', '.join('?' * len(columns))})
+    ON CONFLICT (area_id, bucket) DO UPDATE SET {', '.join(updates)}
+'''
+
+def _select_rollups_sql(resolution: str, by_area: bool) -> str:
+    condition = 'area_id = ? AND bucket >= ?' if by_area else 'bucket >= ?'
+    return f'''
+    SELECT area_id, bucket, count, {', '.join(_rollup_columns())}
+    FROM {_rollup_table(resolution)}
+    WHERE {condition}
+    ORDER BY bucket DESC, area_id
+'''
+
+UPSERT_ROLLUP_SQL = {resolution: _upsert_rollup_sql(resolution) for resolution in ROLLUP_RESOLUTIONS}
+SELECT_AREA_ROLLUPS_SQL = {resolution: _select_rollups_sql(resolution, True) for resolution in ROLLUP_RESOLUTIONS}
+SELECT_ROLLUPS_SQL = {resolution: _select_rollups_sql(resolution, False) for resolution in ROLLUP_RESOLUTIONS}
+
+def to_epoch(timestamp) -> float:
+    """Epoch seconds for a reading timestamp; naive ISO strings are server local time, as datetime.now()"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return timestamp.timestamp()
+
+def to_epoch_ms(timestamp, default: Optional[float] = None) -> int:
+    """UTC epoch milliseconds for a timestamp; one that cannot be parsed is
+    placed at ``default`` epoch seconds, or the time it was received"""
+    try:
+        epoch = to_epoch(timestamp)
+    except (TypeError, ValueError, OverflowError):
+        epoch = time.time() if default is None else default
+    return int(round(epoch * 1000))
+
+def _since_ms(hours: float) -> int:
+    return int((time.time() - hours * 3600) * 1000)
+
+def _aggregate_rollups(readings) -> Dict[str, List[tuple]]:
+    """Collapse readings into one upsert row per (area, bucket) for every resolution"""
+    buckets = {resolution: {} for resolution in ROLLUP_RESOLUTIONS}
+
+    for reading in readings:
+        epoch = reading['ts'] / 1000
+        values = [float(reading[metric]) for metric in ROLLUP_METRICS]
+
+        for resolution, width in ROLLUP_RESOLUTIONS.items():
+            key = (reading['area_id'], int(epoch // width) * width)
+            bucket = buckets[resolution].get(key)
+            if bucket is None:
+                buckets[resolution][key] = [1, list(values), list(values), list(values)]
+                continue
+            bucket[0] += 1
+            for i, value in enumerate(values):
+                bucket[1][i] = min(bucket[1][i], value)
+                bucket[2][i] = max(bucket[2][i], value)
+                bucket[3][i] += value
+
+    rows = {}
+    for resolution, resolution_buckets in buckets.items():
+        rows[resolution] = [
+            (area_id, bucket_start, count,
+             *[stat for i in range(len(ROLLUP_METRICS)) for stat in (mins[i], maxs[i], sums[i])])
+            for (area_id, bucket_start), (count, mins, maxs, sums) in resolution_buckets.items()
+        ]
+    return rows
+
+# Columns the keyset-paginated queries can project
+READING_FIELDS = list(READING_COLUMN_DTYPES)
+ALERT_FIELDS = ['id', 'type', 'area_id', 'severity', 'message', 'data', 'timestamp',
+                'acknowledged', 'created_at', 'ts']
+
+INSERT_ALERT_SQL = '''
+    INSERT INTO alerts (type, area_id, severity, message, data, timestamp, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_ALERTS_SQL = '''
+    SELECT * FROM alerts
+    WHERE ts >= ?
+    ORDER BY ts DESC, id DESC
+'''
+
+# Succeeds (one row changed) only if no process claimed the key in the last
+# window seconds; a claim older than the stored one never wins
+CLAIM_ALERT_SQL = '''
+    INSERT INTO alert_claims (key, claimed_at) VALUES (?, ?)
+    ON CONFLICT (key) DO UPDATE SET claimed_at = excluded.claimed_at
+    WHERE excluded.claimed_at >= alert_claims.claimed_at + ?
+'''
+
+# Retention works oldest first through the ts indexes, one chunk at a time
+SELECT_EXPIRED_SQL = {
+    table: f'SELECT * FROM {table} WHERE ts < ? ORDER BY ts, id LIMIT ?'
+    for table in ('readings', 'alerts')
+}
+
+DELETE_BY_ID_SQL = {table: f'DELETE FROM {table} WHERE id = ?' for table in ('readings', 'alerts')}
+
+# Delivered and abandoned SMS expire oldest first; pending ones are kept
+DELETE_EXPIRED_SMS_SQL = '''
+    DELETE FROM sms_outbox
+    WHERE id IN (
+        SELECT id FROM sms_outbox
+        WHERE status IN ('sent', 'failed') AND created_at < ?
+        ORDER BY id LIMIT ?
+    )
+'''
+
+# Rollups expire by bucket start (epoch seconds), a chunk at a time through the bucket index
+DELETE_EXPIRED_ROLLUPS_SQL = {
+    resolution: f'''
+        DELETE FROM {_rollup_table(resolution)}
+        WHERE (area_id, bucket) IN (
+            SELECT area_id, bucket FROM {_rollup_table(resolution)}
+            WHERE bucket < ? ORDER BY bucket LIMIT ?
+        )
+    '''
+    for resolution in ROLLUP_RESOLUTIONS
+}
+
+def _created_at_epoch(created_at) -> Optional[float]:
+    """Epoch seconds of a CURRENT_TIMESTAMP value, which SQLite writes in UTC"""
+    try:
+        return datetime.fromisoformat(created_at).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _backfill_epoch_ms(conn: sqlite3.Connection, table: str, batch_size: int):
+    """Fill ts from the text timestamp by id range, one short transaction per batch"""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f'SELECT id, timestamp, created_at FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+
+        with conn:
+            conn.executemany(f'UPDATE {table} SET ts = ? WHERE id = ? AND ts IS NULL', [
+                (to_epoch_ms(timestamp, _created_at_epoch(created_at)), row_id)
+                for row_id, timestamp, created_at in rows
+            ])
+        last_id = rows[-1][0]
+
+def _migrate_epoch_timestamps(conn: sqlite3.Connection, batch_size: int):
+    """Store integer UTC epoch milliseconds in ts and index on it instead of the text timestamp"""
+    with conn:
+        for table in ('readings', 'alerts', 'latest_readings'):
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            if 'ts' not in columns:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN ts INTEGER')
+
+    # Resumable: a restart picks up the rows that still have no ts
+    _backfill_epoch_ms(conn, 'readings', batch_size)
+    _backfill_epoch_ms(conn, 'alerts', batch_size)
+
+    with conn:
+        # Integer keys make these a fraction of the size of the text ones
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_readings_area_ts ON readings(area_id, ts)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_readings_ts ON readings(ts)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(ts)')
+        conn.execute('DROP INDEX IF EXISTS idx_readings_area_time')
+        conn.execute('DROP INDEX IF EXISTS idx_readings_time')
+        conn.execute('DROP INDEX IF EXISTS idx_alerts_time')
+
+        # The newest reading per area is now decided by ts; MAX() makes
+        # SQLite take the other columns from each area's newest row
+        conn.execute('DROP TRIGGER IF EXISTS trg_readings_latest')
+        conn.execute('DELETE FROM latest_readings')
+        conn.execute('''
+            INSERT INTO latest_readings
+                (area_id, id, methane, co, temperature, humidity, water_level, timestamp, created_at, ts)
+            SELECT area_id, id, methane, co, temperature, humidity, water_level,
+                   timestamp, created_at, MAX(ts)
+            FROM readings GROUP BY area_id
         ''')
-        
-        # Alerts table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                type TEXT NOT NULL,
-                area_id INTEGER NOT NULL,
-                severity TEXT NOT NULL,
-                message TEXT NOT NULL,
-                data TEXT,
-                timestamp TEXT NOT NULL,
-                acknowledged BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+        conn.execute('''
+            CREATE TRIGGER trg_readings_latest AFTER INSERT ON readings
+            BEGIN
+                INSERT INTO latest_readings
+                    (area_id, id, methane, co, temperature, humidity, water_level, timestamp, created_at, ts)
+                VALUES (NEW.area_id, NEW.id, NEW.methane, NEW.co, NEW.temperature,
+                        NEW.humidity, NEW.water_level, NEW.timestamp, NEW.created_at, NEW.ts)
+                ON CONFLICT (area_id) DO UPDATE SET
+                    id = excluded.id, methane = excluded.methane, co = excluded.co,
+                    temperature = excluded.temperature, humidity = excluded.humidity,
+                    water_level = excluded.water_level, timestamp = excluded.timestamp,
+                    created_at = excluded.created_at, ts = excluded.ts
+                WHERE excluded.ts >= latest_readings.ts;
+            END
+        ''')
+
+def _migrate_alert_claims(conn: sqlite3.Connection, batch_size: int):
+    """Track when each alert was last sent, shared by every worker process"""
+    with conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS alert_claims (
+                key TEXT PRIMARY KEY,
+                claimed_at REAL NOT NULL
+            ) WITHOUT ROWID
         ''')
-        
-        # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_readings_area_time ON readings(area_id, timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_time ON alerts(timestamp)')
-        
-        conn.commit()
+
+class DatabaseBusy(sqlite3.OperationalError):
+    """Raised when every pooled connection stayed in use for the whole pool timeout"""
+
+# Schema migrations in order. PRAGMA user_version counts how many have been
+# applied; each one must be safe to re-run if it was interrupted.
+MIGRATIONS = [
+    _migrate_epoch_timestamps,
+    _migrate_alert_claims,
+]
+
+class DatabaseManager:
+    def __init__(self, db_path='lemos.db', pool_size: int = 8,
+                 cache_size_kb: int = 16384, busy_timeout: float = 5.0,
+                 pool_timeout: float = 5.0):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.cache_size_kb = cache_size_kb
+        self.busy_timeout = busy_timeout
+        self.pool_timeout = pool_timeout
+
+        self._pool_lock = threading.Lock()
+        self._reset_pool()
+
+    def _reset_pool(self):
+        """Start an empty pool owned by the current process"""
+        self._pool = queue.LifoQueue(maxsize=self.pool_size)
+        self._open_connections = 0
+        self._pool_pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection tuned for concurrent ingest and dashboard reads"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=256,
+            check_same_thread=False
+        )
+        # Must come before WAL mode writes the header of a new file; lets
+        # retention hand freed pages back a few at a time. Existing files
+        # keep their mode until a one-off VACUUM.
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        # WAL lets readers proceed while a writer commits; NORMAL sync is
+        # durable across application crashes and only fsyncs on checkpoint.
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        with self._pool_lock:
+            # Connections must not cross a fork (e.g. gunicorn --preload)
+            if self._pool_pid != os.getpid():
+                self._reset_pool()
+
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+
+            if self._open_connections < self.pool_size:
+                self._open_connections += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._pool_lock:
+                    self._open_connections -= 1
+                raise
+
+        # Every connection is in use: wait for one, and record how long
+        started = time.perf_counter()
+        try:
+            conn = self._pool.get(timeout=self.pool_timeout)
+        except queue.Empty:
+            metrics.inc('lemos_db_pool_timeouts_total')
+            raise DatabaseBusy(f'All {self.pool_size} database connections stayed busy '
+                               f'for {self.pool_timeout:g} s')
+        metrics.observe('lemos_db_pool_wait_seconds', time.perf_counter() - started)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._pool_lock:
+            if self._pool_pid == os.getpid():
+                self._pool.put_nowait(conn)
+                return
         conn.close()
-    
-    def store_reading(self, reading: Dict):
-        """Store sensor reading in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        print(f"Storing reading in database: {reading}")
-        
-        cursor.execute('''
-            INSERT INTO readings (area_id, methane, co, temperature, humidity, water_level, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with-block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close every idle pooled connection"""
+        with self._pool_lock:
+            while True:
+                try:
+                    conn = self._pool.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._open_connections -= 1
+
+    @contextmanager
+    def schema_lock(self):
+        """Serialize schema changes across processes; workers starting
+        together wait for the first one to finish migrating"""
+        with open(f'{self.db_path}.schema.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def init_database(self):
+        """Initialize database tables and apply pending migrations"""
+        with self.schema_lock():
+            self._create_tables()
+            self.migrate()
+
+        # Databases created before the rollup tables existed get them filled once
+        self.rebuild_rollups(only_if_empty=True)
+
+    def migrate(self, batch_size: int = 5000) -> int:
+        """Apply pending MIGRATIONS in order; returns the schema version"""
+        with self.connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                logger.info("Applying database migration %d: %s", number, migration.__doc__)
+                migration(conn, batch_size)
+                with conn:
+                    conn.execute(f'PRAGMA user_version = {number}')
+                version = number
+
+        return version
+
+    def _create_tables(self):
+        """Every table that predates versioned migrations, i.e. schema version 0; later changes are MIGRATIONS"""
+        with self.connection() as conn, conn:
+            cursor = conn.cursor()
+
+            # Sensor readings table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS readings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    area_id INTEGER NOT NULL,
+                    methane REAL NOT NULL,
+                    co REAL NOT NULL,
+                    temperature REAL NOT NULL,
+                    humidity REAL NOT NULL,
+                    water_level REAL NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Alerts table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    type TEXT NOT NULL,
+                    area_id INTEGER NOT NULL,
+                    severity TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    data TEXT,
+                    timestamp TEXT NOT NULL,
+                    acknowledged BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Newest reading per area, shared by every worker process. A
+            # trigger (see _migrate_epoch_timestamps) keeps it current for
+            # every insert path in O(1), and a late-arriving older reading
+            # never replaces a newer one.
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS latest_readings (
+                    area_id INTEGER PRIMARY KEY,
+                    id INTEGER NOT NULL,
+                    methane REAL NOT NULL,
+                    co REAL NOT NULL,
+                    temperature REAL NOT NULL,
+                    humidity REAL NOT NULL,
+                    water_level REAL NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    created_at TIMESTAMP
+                )
+            ''')
+
+            # Outbound SMS queue, drained by the notification workers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sms_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    number TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    area_id INTEGER,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_attempt_at REAL,
+                    last_error TEXT,
+                    sid TEXT,
+                    created_at REAL NOT NULL
+                )
+            ''')
+
+            # Create indexes for better performance; the readings and alerts
+            # time indexes come with the ts migration
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sms_outbox_due ON sms_outbox(status, next_attempt_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sms_outbox_number ON sms_outbox(number, created_at)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_sms_outbox_sends ON sms_outbox(number, last_attempt_at)')
+
+            # Per-area rollups, one row per bucket; avg is sum / count
+            metric_columns = ', '.join(f'{column} REAL NOT NULL' for column in _rollup_columns())
+            for resolution in ROLLUP_RESOLUTIONS:
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {_rollup_table(resolution)} (
+                        area_id INTEGER NOT NULL,
+                        bucket INTEGER NOT NULL,
+                        count INTEGER NOT NULL,
+                        {metric_columns},
+                        PRIMARY KEY (area_id, bucket)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{_rollup_table(resolution)}_bucket '
+                               f'ON {_rollup_table(resolution)}(bucket)')
+
+    @staticmethod
+    def _reading_row(reading: Dict) -> tuple:
+        """INSERT_READING_SQL parameters; the stored ts is also set on the reading"""
+        reading['ts'] = to_epoch_ms(reading['timestamp'])
+        return (
             reading['area_id'],
             reading['methane'],
             reading['co'],
             reading['temperature'],
             reading['humidity'],
             reading['water_level'],
-            reading['timestamp']
-        ))
-        
-        conn.commit()
-        print(f"Successfully stored reading for area {reading['area_id']}")
-        conn.close()
-    
+            reading['timestamp'],
+            reading['ts']
+        )
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='store_reading')
+    def store_reading(self, reading: Dict) -> int:
+        """Store sensor reading in database; returns its id"""
+
+        with self.connection() as conn, conn:
+            cursor = conn.execute(INSERT_READING_SQL, self._reading_row(reading))
+            self._update_rollups(conn, [reading])
+
+        logger.debug("Stored reading %d for area %s", cursor.lastrowid, reading['area_id'])
+        return cursor.lastrowid
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='store_readings')
+    def store_readings(self, readings: List[Dict]) -> List[int]:
+        """Store a batch of sensor readings in a single transaction; returns their ids in order"""
+        if not readings:
+            return []
+
+        with self.connection() as conn, conn:
+            conn.executemany(INSERT_READING_SQL, [self._reading_row(reading) for reading in readings])
+            # The transaction holds the write lock, so AUTOINCREMENT handed
+            # out consecutive ids ending at the last one inserted
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            self._update_rollups(conn, readings)
+
+        return list(range(last_id - len(readings) + 1, last_id + 1))
+
+    def _update_rollups(self, conn: sqlite3.Connection, readings):
+        """Fold readings into the rollup tables inside the caller's transaction"""
+        for resolution, rows in _aggregate_rollups(readings).items():
+            conn.executemany(UPSERT_ROLLUP_SQL[resolution], rows)
+
+    def rebuild_rollups(self, only_if_empty: bool = False, chunk_size: int = 10000):
+        """Recompute every rollup table from the raw readings"""
+        with self.connection() as conn:
+            # IMMEDIATE takes the write lock up front, so workers starting
+            # together cannot both see empty tables and double count
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if only_if_empty:
+                    has_rollups = conn.execute(
+                        f'SELECT 1 FROM {_rollup_table("1h")} LIMIT 1').fetchone()
+                    has_readings = conn.execute('SELECT 1 FROM readings LIMIT 1').fetchone()
+                    if has_rollups or not has_readings:
+                        conn.rollback()
+                        return
+
+                for resolution in ROLLUP_RESOLUTIONS:
+                    conn.execute(f'DELETE FROM {_rollup_table(resolution)}')
+
+                cursor = conn.execute(
+                    f"SELECT area_id, ts, {', '.join(ROLLUP_METRICS)} FROM readings")
+                columns = [desc[0] for desc in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    self._update_rollups(conn, [dict(zip(columns, row)) for row in rows])
+
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+        logger.info("Rebuilt reading rollups from raw readings")
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_readings')
     def get_readings(self, hours: int = 24, area_id: Optional[int] = None) -> List[Dict]:
         """Get sensor readings from the last N hours"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         # Calculate time threshold
-        time_threshold = (datetime.now() - timedelta(hours=hours)).isoformat()
-        
-        if area_id:
-            cursor.execute('''
-                SELECT * FROM readings 
-                WHERE area_id = ? AND timestamp >= ?
-                ORDER BY timestamp DESC
-            ''', (area_id, time_threshold))
-        else:
-            cursor.execute('''
-                SELECT * FROM readings 
-                WHERE timestamp >= ?
-                ORDER BY timestamp DESC
-            ''', (time_threshold,))
-        
-        columns = [desc[0] for desc in cursor.description]
-        readings = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        conn.close()
+        time_threshold = _since_ms(hours)
+
+        with self.connection() as conn:
+            if area_id:
+                cursor = conn.execute(SELECT_AREA_READINGS_SQL, (area_id, time_threshold))
+            else:
+                cursor = conn.execute(SELECT_READINGS_SQL, (time_threshold,))
+
+            columns = [desc[0] for desc in cursor.description]
+            readings = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
         return readings
-    
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_rollups')
+    def get_rollups(self, resolution: str, hours: int = 24,
+                    area_id: Optional[int] = None) -> List[Dict]:
+        """Get per-area min/max/avg/count buckets from the last N hours, newest first"""
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+        width = ROLLUP_RESOLUTIONS[resolution]
+        since = int(to_epoch(datetime.now() - timedelta(hours=hours)) // width) * width
+
+        with self.connection() as conn:
+            if area_id:
+                rows = conn.execute(SELECT_AREA_ROLLUPS_SQL[resolution], (area_id, since)).fetchall()
+            else:
+                rows = conn.execute(SELECT_ROLLUPS_SQL[resolution], (since,)).fetchall()
+
+        rollups = []
+        for area_id, bucket_start, count, *stats in rows:
+            rollup = {
+                'area_id': area_id,
+                'timestamp': datetime.fromtimestamp(bucket_start).isoformat(),
+                'resolution': resolution,
+                'count': count
+            }
+            for i, metric in enumerate(ROLLUP_METRICS):
+                metric_min, metric_max, metric_sum = stats[3 * i:3 * i + 3]
+                # The plain metric key is the bucket average, so charts can
+                # plot rollups exactly like raw readings
+                rollup[metric] = metric_sum / count
+                rollup[f'{metric}_min'] = metric_min
+                rollup[f'{metric}_max'] = metric_max
+            rollups.append(rollup)
+
+        return rollups
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_recent_area_readings')
+    def get_recent_area_readings(self, area_id: int, limit: int) -> List[Dict]:
+        """An area's newest readings by timestamp, newest first"""
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_RECENT_AREA_READINGS_SQL, (area_id, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_area_readings_after')
+    def get_area_readings_after(self, area_id: int, after_id: int, limit: int) -> List[Dict]:
+        """Up to ``limit`` of an area's readings inserted after the given id, in insertion order"""
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_AREA_READINGS_AFTER_ID_SQL, (area_id, after_id, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_latest_readings')
+    def get_latest_readings(self) -> Dict[int, Dict]:
+        """Newest reading of every area, keyed by area_id"""
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_LATEST_READINGS_SQL)
+            columns = [desc[0] for desc in cursor.description]
+            return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_latest_reading')
+    def get_latest_reading(self, area_id: int) -> Optional[Dict]:
+        """Newest reading of one area, a primary key lookup"""
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_LATEST_READING_SQL, (area_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([desc[0] for desc in cursor.description], row))
+
+    def iter_readings(self, hours: float = 24, area_id: Optional[int] = None,
+                      fields: Optional[Sequence[str]] = None, after: Optional[tuple] = None,
+                      limit: Optional[int] = None, page_size: int = 1000,
+                      as_tuples: bool = False) -> Iterator[Tuple[Union[Dict, tuple], tuple]]:
+        """Yield (reading, (ts, id)) newest first from the last N hours, a page at a time"""
+        conditions = {'area_id = ?': area_id} if area_id else {}
+        return self._iter_keyset('readings', READING_FIELDS, fields, hours, conditions,
+                                 after, limit, page_size, as_tuples)
+
+    def iter_alerts(self, hours: float = 24, fields: Optional[Sequence[str]] = None,
+                    after: Optional[tuple] = None, limit: Optional[int] = None,
+                    page_size: int = 1000, as_tuples: bool = False) -> Iterator[Tuple[Union[Dict, tuple], tuple]]:
+        """Yield (alert, (ts, id)) newest first from the last N hours, a page at a time"""
+        return self._iter_keyset('alerts', ALERT_FIELDS, fields, hours, {},
+                                 after, limit, page_size, as_tuples)
+
+    def _iter_keyset(self, table: str, allowed: List[str], fields: Optional[Sequence[str]],
+                     hours: float, conditions: Dict[str, object], after: Optional[tuple],
+                     limit: Optional[int], page_size: int,
+                     as_tuples: bool = False) -> Iterator[Tuple[Union[Dict, tuple], tuple]]:
+        """Keyset pagination on (ts, id): each page is a short indexed query on
+        a briefly borrowed connection, so a slow consumer never pins a read snapshot.
+        With as_tuples, rows are value tuples in fields order rather than dicts."""
+        fields = list(fields or allowed)
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown {table} fields: {unknown}")
+
+        # The keyset columns are always selected, after the projected ones
+        columns = fields + ['ts', 'id']
+        time_threshold = _since_ms(hours)
+        remaining = limit
+
+        while remaining is None or remaining > 0:
+            where = ['ts >= ?', *conditions]
+            params = [time_threshold, *conditions.values()]
+            if after is not None:
+                where.append('(ts, id) < (?, ?)')
+                params.extend(after)
+
+            page_limit = page_size if remaining is None else min(page_size, remaining)
+            query = (f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} "
+                     f"ORDER BY ts DESC, id DESC LIMIT ?")
+
+            with metrics.timer('lemos_db_query_duration_seconds', operation=f'iter_{table}'), \
+                    self.connection() as conn:
+                rows = conn.execute(query, [*params, page_limit]).fetchall()
+
+            if as_tuples:
+                width = len(fields)
+                for row in rows:
+                    yield row[:width], row[-2:]
+            else:
+                for row in rows:
+                    yield dict(zip(fields, row)), row[-2:]
+
+            if len(rows) < page_limit:
+                return
+            after = tuple(rows[-1][-2:])
+            if remaining is not None:
+                remaining -= len(rows)
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_readings_columns')
+    def get_readings_columns(self, area_id: Optional[int] = None,
+                             since: Optional[Union[datetime, str]] = None,
+                             columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Get readings in time order as one contiguous NumPy array per column"""
+        columns = list(columns or READING_COLUMN_DTYPES)
+        unknown = [column for column in columns if column not in READING_COLUMN_DTYPES]
+        if unknown:
+            raise ValueError(f"Unknown reading columns: {unknown}")
+
+        conditions = []
+        params = []
+        if area_id is not None:
+            conditions.append('area_id = ?')
+            params.append(area_id)
+        if since is not None:
+            conditions.append('ts >= ?')
+            params.append(int(to_epoch(since) * 1000))
+
+        query = f"SELECT {', '.join(columns)} FROM readings"
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY ts, id'
+
+        with self.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        # Transpose the row tuples straight into typed column arrays
+        column_values = zip(*rows) if rows else [()] * len(columns)
+        return {
+            column: np.array(values, dtype=READING_COLUMN_DTYPES[column])
+            for column, values in zip(columns, column_values)
+        }
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_active_areas')
+    def get_active_areas(self, hours: int = 168) -> List[int]:
+        """Areas that reported at least one reading in the last N hours"""
+        time_threshold = _since_ms(hours)
+
+        with self.connection() as conn:
+            rows = conn.execute(SELECT_ACTIVE_AREAS_SQL, (time_threshold,)).fetchall()
+        return [row[0] for row in rows]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_last_reading_marker')
+    def get_last_reading_marker(self, area_id: int) -> Optional[tuple]:
+        """(id, ts) of an area's newest reading, an index-only lookup"""
+        with self.connection() as conn:
+            row = conn.execute(SELECT_LAST_READING_MARKER_SQL, (area_id,)).fetchone()
+        return tuple(row) if row else None
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='store_alert')
     def store_alert(self, alert: Dict):
         """Store alert in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO alerts (type, area_id, severity, message, data, timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            alert['type'],
-            alert.get('area_id', 0),
-            alert.get('severity', 'medium'),
-            json.dumps(alert),
-            json.dumps(alert),
-            alert['timestamp']
-        ))
-        
-        conn.commit()
-        conn.close()
-    
+        with self.connection() as conn, conn:
+            conn.execute(INSERT_ALERT_SQL, (
+                alert['type'],
+                alert.get('area_id', 0),
+                alert.get('severity', 'medium'),
+                json.dumps(alert),
+                json.dumps(alert),
+                alert['timestamp'],
+                to_epoch_ms(alert['timestamp'])
+            ))
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='claim_alert')
+    def claim_alert(self, key: str, at: float, window: float) -> bool:
+        """Claim an alert for sending at epoch ``at``; False if any process claimed it within ``window`` seconds"""
+        with self.connection() as conn, conn:
+            return conn.execute(CLAIM_ALERT_SQL, (key, at, window)).rowcount == 1
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_alerts')
     def get_alerts(self, hours: int = 24) -> List[Dict]:
         """Get alerts from the last N hours"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        time_threshold = (datetime.now() - timedelta(hours=hours)).isoformat()
-        
-        cursor.execute('''
-            SELECT * FROM alerts 
-            WHERE timestamp >= ?
-            ORDER BY timestamp DESC
-        ''', (time_threshold,))
-        
-        columns = [desc[0] for desc in cursor.description]
-        alerts = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        conn.close()
+        time_threshold = _since_ms(hours)
+
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_ALERTS_SQL, (time_threshold,))
+
+            columns = [desc[0] for desc in cursor.description]
+            alerts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
         return alerts
-    
-    def cleanup_old_data(self, days: int = 30):
-        """Clean up old data to prevent database bloat"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        time_threshold = (datetime.now() - timedelta(days=days)).isoformat()
-        
-        cursor.execute('DELETE FROM readings WHERE timestamp < ?', (time_threshold,))
-        cursor.execute('DELETE FROM alerts WHERE timestamp < ?', (time_threshold,))
-        
-        conn.commit()
-        conn.close()
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_rows_after')
+    def get_rows_after(self, table: str, after_id: int, limit: int = 1000) -> List[Dict]:
+        """Readings or alerts inserted after the given id, in insertion order"""
+        sql = {'readings': SELECT_READINGS_AFTER_ID_SQL, 'alerts': SELECT_ALERTS_AFTER_ID_SQL}[table]
+
+        with self.connection() as conn:
+            cursor = conn.execute(sql, (after_id, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_max_ids')
+    def get_max_ids(self) -> tuple:
+        """(newest reading id, newest alert id), 0 for an empty table"""
+        with self.connection() as conn:
+            return conn.execute(
+                'SELECT (SELECT COALESCE(MAX(id), 0) FROM readings), (SELECT COALESCE(MAX(id), 0) FROM alerts)'
+            ).fetchone()
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='get_expired_rows')
+    def get_expired_rows(self, table: str, before: int, limit: int = 1000) -> List[Dict]:
+        """The oldest readings or alerts with ts before ``before`` epoch milliseconds"""
+        with self.connection() as conn:
+            cursor = conn.execute(SELECT_EXPIRED_SQL[table], (before, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='delete_rows')
+    def delete_rows(self, table: str, ids: Sequence[int]) -> int:
+        """Delete readings or alerts by id in one short write transaction"""
+        with self.connection() as conn, conn:
+            return conn.executemany(DELETE_BY_ID_SQL[table], ((row_id,) for row_id in ids)).rowcount
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='delete_expired_rollups')
+    def delete_expired_rollups(self, resolution: str, before: float, limit: int = 1000) -> int:
+        """Delete up to ``limit`` of the oldest rollup buckets starting before ``before`` epoch seconds"""
+        with self.connection() as conn, conn:
+            return conn.execute(DELETE_EXPIRED_ROLLUPS_SQL[resolution], (before, limit)).rowcount
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='delete_expired_sms')
+    def delete_expired_sms(self, before: float, limit: int = 1000) -> int:
+        """Delete up to ``limit`` sent or failed outbox messages queued before ``before`` epoch seconds"""
+        with self.connection() as conn, conn:
+            return conn.execute(DELETE_EXPIRED_SMS_SQL, (before, limit)).rowcount
+
+    def free_pages(self) -> Optional[int]:
+        """Pages on the freelist, or None when the database was not created
+        with incremental auto_vacuum and cannot release them"""
+        with self.connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                return None
+            return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """Release up to ``pages`` free pages; returns how many remain free"""
+        with self.connection() as conn:
+            # execute() steps a pragma only once, which frees a single page;
+            # executescript() runs it to completion
+            conn.executescript(f'PRAGMA incremental_vacuum({max(1, int(pages))})')
+            return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    @metrics.timed('lemos_db_query_duration_seconds', operation='cleanup_old_data')
+    def cleanup_old_data(self, days: int = 30, chunk_size: int = 1000) -> int:
+        """Delete readings and alerts older than N days, a chunk per transaction"""
+        time_threshold = _since_ms(days * 24)
+        deleted = 0
+
+        for table in ('readings', 'alerts'):
+            while True:
+                rows = self.get_expired_rows(table, time_threshold, chunk_size)
+                if not rows:
+                    break
+                deleted += self.delete_rows(table, [row['id'] for row in rows])
+
+        return deleted
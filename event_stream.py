@@ -0,0 +1,256 @@
+import json
+import logging
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TooManySubscribers(Exception):
+    """Raised when a process already has ``max_subscribers`` open streams"""
+
+class Subscription:
+    """An open stream: iterating yields its SSE frames, and closing it, as
+    WSGI servers do when the client goes away, frees its subscriber slot"""
+
+    def __init__(self, frames: Iterator[str], release):
+        self._frames = frames
+        self._release = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self._frames)
+
+    def close(self):
+        self._frames.close()
+        if self._release:
+            self._release()
+            self._release = None
+
+class StreamEvent:
+    """One published event with its Server-Sent Events frame rendered once for every subscriber"""
+
+    __slots__ = ('seq', 'kind', 'area_id', 'cursor', 'frame')
+
+    def __init__(self, seq: int, kind: str, area_id, cursor: Tuple[int, int], data: Dict):
+        self.seq = seq
+        self.kind = kind
+        self.area_id = area_id
+        self.cursor = cursor
+        self.frame = f"id: {cursor[0]}-{cursor[1]}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+    def is_after(self, cursor: Tuple[int, int]) -> bool:
+        if self.kind == 'reading':
+            return self.cursor[0] > cursor[0]
+        return self.cursor[1] > cursor[1]
+
+def parse_event_id(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Parse a '<reading id>-<alert id>' Last-Event-ID"""
+    try:
+        reading_id, alert_id = (int(part) for part in value.split('-'))
+        return reading_id, alert_id
+    except (AttributeError, ValueError):
+        return None
+
+class EventBroadcaster:
+    """Fan-out of new readings and alerts to Server-Sent Events subscribers.
+
+    One tailer thread per process follows the readings and alerts tables
+    by id, so readings committed by any worker reach every subscriber in
+    commit order. It polls every ``poll_interval`` seconds while anyone
+    is subscribed, and immediately when the ingest path calls ``notify``.
+    Each event is serialized once and kept in a bounded replay buffer that
+    all subscribers read from, so the database load does not grow with
+    the number of open streams.
+
+    Event ids are '<reading id>-<alert id>' cursors. A client resuming with
+    Last-Event-ID gets what it missed from the replay buffer, or from the
+    database for anything older.
+
+    Every open stream holds a server thread, so at most ``max_subscribers``
+    are served per process; past that ``subscribe`` raises
+    TooManySubscribers and the rest of the thread pool stays free for
+    ordinary requests.
+    """
+
+    def __init__(self, db_manager, replay_size: int = 2000, poll_interval: float = 1.0,
+                 keepalive: float = 15.0, max_backfill: int = 5000,
+                 max_subscribers: Optional[int] = None):
+        self.db_manager = db_manager
+        self.max_subscribers = max_subscribers
+        self.replay_size = replay_size
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.max_backfill = max_backfill
+
+        self._cond = threading.Condition()
+        self._events = deque()
+        self._seq = 0
+        self._cursor = None   # (reading id, alert id) of the newest published event
+        self._floor = None    # cursor just before the oldest buffered event
+        self._subscribers = 0
+
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def subscribers(self) -> int:
+        with self._cond:
+            return self._subscribers
+
+    def notify(self):
+        """Tell the tailer there are new rows to publish"""
+        self._wakeup.set()
+
+    def subscribe(self, last_event_id: Optional[str] = None,
+                  area_ids: Optional[Set[int]] = None) -> Subscription:
+        """Open a stream of SSE frames for new events, starting after ``last_event_id`` if given"""
+        self._start()
+
+        with self._cond:
+            if self.max_subscribers is not None and self._subscribers >= self.max_subscribers:
+                raise TooManySubscribers(f'{self._subscribers} event streams are already open')
+            if not self._subscribers:
+                # The tailer stops polling while no one listens, so skip whatever
+                # was committed meanwhile; new subscribers only see what comes next
+                self._cursor = self._floor = tuple(self.db_manager.get_max_ids())
+                self._events.clear()
+            self._subscribers += 1
+            position = self._seq
+            cursor = self._cursor
+        self._wakeup.set()
+
+        return Subscription(self._frames(position, cursor, last_event_id, area_ids), self._unsubscribe)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def _frames(self, position: int, cursor: Tuple[int, int], last_event_id: Optional[str],
+                area_ids: Optional[Set[int]]) -> Iterator[str]:
+        """The frames of one subscription; its slot is released by Subscription.close"""
+        resume_from = parse_event_id(last_event_id)
+        if resume_from is not None:
+            # Replay the buffer from its start, skipping events already seen
+            cursor = resume_from
+            position = 0
+
+        yield f"retry: {int(self.poll_interval * 3000)}\n\n"
+
+        while True:
+            with self._cond:
+                if self._seq == position:
+                    self._cond.wait(self.keepalive)
+
+                first_seq = self._events[0].seq if self._events else self._seq + 1
+                backfill_to = None
+                if position < first_seq and (self._floor[0] > cursor[0] or self._floor[1] > cursor[1]):
+                    # What this subscriber still needs was evicted or predates the buffer
+                    backfill_to = self._floor
+                events = list(islice(self._events, max(0, position - first_seq + 1), None))
+                position = self._seq
+
+            if backfill_to is not None:
+                for event in self._backfill(cursor, backfill_to):
+                    if area_ids is None or event.area_id in area_ids:
+                        yield event.frame
+                cursor = (max(cursor[0], backfill_to[0]), max(cursor[1], backfill_to[1]))
+
+            elif not events:
+                yield ": keepalive\n\n"
+                continue
+
+            for event in events:
+                if not event.is_after(cursor):
+                    continue
+                cursor = event.cursor
+                if area_ids is None or event.area_id in area_ids:
+                    yield event.frame
+
+    def _backfill(self, cursor: Tuple[int, int], until: Tuple[int, int]) -> List[StreamEvent]:
+        """Events after ``cursor`` up to ``until`` read back from the database"""
+        reading_id, alert_id = cursor
+        events = []
+
+        for row in self.db_manager.get_rows_after('readings', reading_id, self.max_backfill):
+            if row['id'] > until[0]:
+                break
+            events.append(StreamEvent(0, 'reading', row['area_id'], (row['id'], alert_id), row))
+
+        for row in self.db_manager.get_rows_after('alerts', alert_id, self.max_backfill):
+            if row['id'] > until[1]:
+                break
+            events.append(StreamEvent(0, 'alert', row['area_id'], (until[0], row['id']), self._alert_data(row)))
+
+        return events
+
+    @staticmethod
+    def _alert_data(row: Dict) -> Dict:
+        try:
+            data = json.loads(row['data'])
+        except (TypeError, ValueError):
+            data = {}
+        data.update({'id': row['id'], 'type': row['type'], 'area_id': row['area_id'],
+                     'severity': row['severity'], 'timestamp': row['timestamp']})
+        return data
+
+    def _start(self):
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._run, name='event-stream', daemon=True)
+            self._thread.start()
+
+    def _poll(self) -> int:
+        """Publish rows committed since the last poll; returns how many"""
+        start = reading_id, alert_id = self._cursor
+        readings = self.db_manager.get_rows_after('readings', reading_id, self.replay_size)
+        alerts = self.db_manager.get_rows_after('alerts', alert_id, self.replay_size)
+        if not readings and not alerts:
+            return 0
+
+        with self._cond:
+            if self._cursor != start:
+                # A subscriber arriving after an idle spell moved the cursor past these rows
+                return 0
+            for row in readings:
+                reading_id = row['id']
+                self._append('reading', row['area_id'], (reading_id, alert_id), row)
+            for row in alerts:
+                alert_id = row['id']
+                self._append('alert', row['area_id'], (reading_id, alert_id), self._alert_data(row))
+
+            self._cursor = (reading_id, alert_id)
+            self._cond.notify_all()
+
+        return len(readings) + len(alerts)
+
+    def _append(self, kind: str, area_id, cursor: Tuple[int, int], data: Dict):
+        self._seq += 1
+        self._events.append(StreamEvent(self._seq, kind, area_id, cursor, data))
+
+        while len(self._events) > self.replay_size:
+            self._floor = self._events.popleft().cursor
+
+    def _run(self):
+        while True:
+            # Nothing to do while no one is listening
+            if not self.subscribers:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                published = self._poll()
+            except Exception:
+                logger.exception("Event stream poll failed")
+                published = 0
+
+            # A full page means more rows are waiting
+            if published < self.replay_size:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+class ForecastCache:
+    """Bounded, TTL-limited cache of forecast results.
+
+    Entries are keyed by (area_id, horizon, model version, last reading
+    marker), so a new reading or a new model version naturally misses.
+    The ingest path also calls ``invalidate`` for an area it has just
+    written to, which drops that area's entries right away.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, forecast), least recently used first
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(area_id, hours: int, model_version: Optional[int], marker: Hashable) -> tuple:
+        return (area_id, hours, model_version, marker)
+
+    def get(self, key: tuple) -> Optional[List[Dict]]:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, forecast: List[Dict]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, forecast)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, area_id):
+        """Drop every cached forecast for an area"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == area_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
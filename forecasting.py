@@ -1,95 +1,329 @@
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import joblib
+import json
+import logging
 import os
-from typing import List, Dict
+import sklearn
+import threading
+from typing import List, Dict, Mapping, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Columns the forecaster reads; callers can project queries down to these.
+# ts (UTC epoch milliseconds) orders readings whatever offsets their timestamps carry
+FORECAST_COLUMNS = ['timestamp', 'ts', 'methane', 'co', 'temperature', 'humidity', 'water_level']
+
+# Number of preceding readings summarised in each feature row
+FEATURE_WINDOW = 4
+
+# Names of the columns prepare_features builds, in order; saved models
+# record them so a model trained on another feature layout is not loaded
+FEATURE_NAMES = [
+    'hour', 'day_of_week',
+    'methane_mean', 'methane_std', 'methane_trend',
+    'co_mean', 'co_std', 'co_trend',
+    'temperature_mean', 'humidity_mean',
+    'temperature', 'humidity', 'water_level'
+]
+
+# Saved model layout; bumped whenever the files or their contents change
+ARTIFACT_FORMAT = 1
+MANIFEST_FILE = 'manifest.json'
+ARTIFACT_FILES = {
+    'methane_model': 'methane_model.pkl',
+    'co_model': 'co_model.pkl',
+    'scaler': 'scaler.pkl',
+    'compiled_forest': 'compiled_forest.pkl'
+}
+
+# Methods joblib can compress artifacts with; 'none' keeps them memory-mappable
+COMPRESSION_METHODS = ('zlib', 'gzip', 'bz2', 'lzma', 'xz', 'lz4')
+
+# Historical readings as row dicts, a column mapping (e.g. NumPy arrays) or a DataFrame
+ReadingData = Union[List[Dict], Mapping[str, np.ndarray], pd.DataFrame]
+
+def joblib_compress(compression: str):
+    """joblib's compress argument for 'none', a method such as 'zlib', or 'method:level'"""
+    if not compression or compression == 'none':
+        return 0
+    method, _, level = compression.partition(':')
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Unknown model compression {compression!r}; use 'none' or one of {COMPRESSION_METHODS}")
+    return (method, int(level)) if level else method
+
+def _replace_atomically(path: str, write):
+    """Call write(tmp_path), then rename the result over path so readers never see a partial file"""
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        write(tmp_path)
+        # On disk before the rename, so a crash cannot publish an empty file
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _new_forest() -> RandomForestRegressor:
+    return RandomForestRegressor(n_estimators=100, random_state=42)
+
+def parse_timestamps(timestamps: pd.Series) -> pd.Series:
+    """datetime64 values when the timestamps share one UTC offset, else datetime objects in their own offsets"""
+    try:
+        return pd.to_datetime(timestamps, format='ISO8601')
+    except (TypeError, ValueError):
+        return timestamps.map(lambda t: datetime.fromisoformat(t) if isinstance(t, str) else t)
+
+def time_order(df: pd.DataFrame) -> np.ndarray:
+    """Row positions in time order: by ts when present, else by the parsed timestamps.
+    Naive timestamps are server local time, as everywhere else."""
+    if 'ts' in df:
+        key = df['ts'].to_numpy()
+    else:
+        times = parse_timestamps(df['timestamp'])
+        if pd.api.types.is_datetime64_any_dtype(times):
+            key = pd.DatetimeIndex(times).asi8
+        else:
+            key = np.array([t.timestamp() for t in times])
+    return np.argsort(key, kind='stable')
+
+class RollingFeatureWindow:
+    """Feature state for recursive forecasting of one area.
+
+    Holds the last FEATURE_WINDOW + 1 readings so the feature row that
+    prepare_features would build for the newest reading can be produced,
+    and the window advanced by one predicted step, in constant time.
+    """
+    
+    # Column order of the rolling value buffer
+    METRICS = ['methane', 'co', 'temperature', 'humidity']
+    
+    def __init__(self, history: pd.DataFrame):
+        tail = history.tail(FEATURE_WINDOW + 1)
+        
+        self.values = tail[self.METRICS].to_numpy(dtype=np.float64).copy()
+        self.water_level = float(tail['water_level'].iloc[-1])
+        self.start_time = datetime.fromisoformat(tail['timestamp'].iloc[-1])
+        self.current_time = pd.Timestamp(tail['timestamp'].iloc[-1])
+    
+    def features(self) -> np.ndarray:
+        """Feature row for the newest reading in the window"""
+        history = self.values[:-1]
+        means = history.mean(axis=0)
+        stds = history[:, :2].std(axis=0)
+        trends = history[-1, :2] - history[0, :2]
+        current = self.values[-1]
+        
+        return np.array([
+            self.current_time.hour, self.current_time.weekday(),
+            means[0], stds[0], trends[0],
+            means[1], stds[1], trends[1],
+            means[2], means[3],
+            current[2], current[3], self.water_level
+        ])
+    
+    def advance(self, timestamp: datetime, methane: float, co: float):
+        """Append a predicted reading, assuming stable environmental conditions"""
+        self.values[:-1] = self.values[1:]
+        self.values[-1, 0] = methane
+        self.values[-1, 1] = co
+        self.current_time = timestamp
+
+class CompiledForest:
+    """Flattened node arrays of one or more fitted random forests.
+
+    RandomForestRegressor.predict pays a fixed validation and dispatch cost
+    per call, which dominates when recursive forecasting asks for a handful
+    of rows at a time. Here every tree of every forest is walked at once
+    with NumPy indexing, and each forest's tree outputs are accumulated in
+    estimator order, so results match RandomForestRegressor.predict exactly.
+    """
+    
+    # Node arrays saved with the model and memory-mapped back in
+    ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+    
+    def __init__(self, forests: List[RandomForestRegressor]):
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        self.roots = []
+        self.forest_sizes = []
+        self.max_depth = 0
+        offset = 0
+        
+        for forest in forests:
+            self.forest_sizes.append(len(forest.estimators_))
+            for estimator in forest.estimators_:
+                tree = estimator.tree_
+                is_leaf = tree.children_left < 0
+                nodes = np.arange(tree.node_count)
+                
+                # Leaves point at themselves so extra traversal steps are no-ops
+                features.append(np.where(is_leaf, 0, tree.feature))
+                thresholds.append(tree.threshold)
+                lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+                rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+                values.append(tree.value[:, 0, 0])
+                
+                self.roots.append(offset)
+                self.max_depth = max(self.max_depth, tree.max_depth)
+                offset += tree.node_count
+        
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.value = np.concatenate(values)
+        self.roots = np.array(self.roots)
+    
+    def to_arrays(self) -> Dict:
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays['forest_sizes'] = list(self.forest_sizes)
+        arrays['max_depth'] = int(self.max_depth)
+        return arrays
+    
+    @classmethod
+    def from_arrays(cls, arrays: Dict) -> 'CompiledForest':
+        """Rebuild from to_arrays() output; memory-mapped arrays are used in place"""
+        compiled = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(compiled, name, np.asarray(arrays[name]))
+        compiled.forest_sizes = list(arrays['forest_sizes'])
+        compiled.max_depth = int(arrays['max_depth'])
+        return compiled
+    
+    def predict(self, X: np.ndarray) -> List[np.ndarray]:
+        """Predict every row of X with every forest, one array per forest"""
+        # Trees split on float32 inputs, as in sklearn
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        
+        leaf_values = self.value[nodes]
+        predictions = []
+        start = 0
+        
+        for size in self.forest_sizes:
+            # cumsum adds trees one after another, the same order sklearn uses
+            total = np.cumsum(leaf_values[:, start:start + size], axis=1)[:, -1]
+            predictions.append(total / size)
+            start += size
+        
+        return predictions
 
 class ForecastingModel:
-    def __init__(self):
-        self.methane_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.co_model = RandomForestRegressor(n_estimators=100, random_state=42)
+    def __init__(self, model_path: str = 'models/', autoload: bool = True, compression: str = 'none'):
+        self._methane_model = _new_forest()
+        self._co_model = _new_forest()
         self.scaler = StandardScaler()
         self.is_trained = False
-        self.model_path = 'models/'
+        self.metrics = {}
+        self.manifest = None
+        self.model_path = model_path
+        self.compression = compression
+        self._compress = joblib_compress(compression)
+        self._training_window = None
+        self._compiled = None
         
         # Create models directory if it doesn't exist
         os.makedirs(self.model_path, exist_ok=True)
         
         # Try to load existing models
-        self.load_models()
+        if autoload:
+            self.load_models()
+    
+    @property
+    def methane_model(self) -> RandomForestRegressor:
+        # Loaded models only read their forests from disk when something asks for them
+        if self._methane_model is None:
+            self._methane_model = joblib.load(self._artifact_path('methane_model'))
+        return self._methane_model
     
-    def prepare_features(self, data: List[Dict]) -> np.ndarray:
+    @property
+    def co_model(self) -> RandomForestRegressor:
+        if self._co_model is None:
+            self._co_model = joblib.load(self._artifact_path('co_model'))
+        return self._co_model
+    
+    def compiled_forests(self) -> CompiledForest:
+        """Flattened methane and CO forests, rebuilt whenever the models change"""
+        if self._compiled is None:
+            self._compiled = CompiledForest([self.methane_model, self.co_model])
+        return self._compiled
+    
+    @staticmethod
+    def to_frame(data: ReadingData) -> pd.DataFrame:
+        """Build a time-ordered DataFrame from rows or columns; see time_order"""
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        return df.iloc[time_order(df)].reset_index(drop=True)
+    
+    def prepare_features(self, data: ReadingData) -> np.ndarray:
         """Prepare features for ML model"""
-        if len(data) < 5:
+        df = self.to_frame(data)
+        if len(df) < 5:
             raise ValueError("Insufficient data for feature preparation")
         
-        df = pd.DataFrame(data)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
+        # Each feature row describes reading i using the FEATURE_WINDOW readings before it
+        current = df.iloc[FEATURE_WINDOW:]
         
-        features = []
+        # Time-based features, in each reading's own wall-clock time
+        timestamps = parse_timestamps(current['timestamp'])
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            hour = timestamps.dt.hour.to_numpy()
+            day_of_week = timestamps.dt.dayofweek.to_numpy()
+        else:
+            # Mixed UTC offsets leave plain datetime objects behind
+            hour = np.array([t.hour for t in timestamps])
+            day_of_week = np.array([t.weekday() for t in timestamps])
         
-        for i in range(4, len(df)):
-            # Time-based features
-            current_time = df.iloc[i]['timestamp']
-            hour = current_time.hour
-            day_of_week = current_time.weekday()
-            
-            # Historical values (last 4 readings)
-            methane_history = df.iloc[i-4:i]['methane'].values
-            co_history = df.iloc[i-4:i]['co'].values
-            temp_history = df.iloc[i-4:i]['temperature'].values
-            humidity_history = df.iloc[i-4:i]['humidity'].values
-            
-            # Statistical features
-            methane_mean = np.mean(methane_history)
-            methane_std = np.std(methane_history)
-            methane_trend = methane_history[-1] - methane_history[0]
-            
-            co_mean = np.mean(co_history)
-            co_std = np.std(co_history)
-            co_trend = co_history[-1] - co_history[0]
-            
-            temp_mean = np.mean(temp_history)
-            humidity_mean = np.mean(humidity_history)
-            
+        # Historical values (last 4 readings), one window per feature row
+        methane_history = self._history_windows(df['methane'])
+        co_history = self._history_windows(df['co'])
+        temp_history = self._history_windows(df['temperature'])
+        humidity_history = self._history_windows(df['humidity'])
+        
+        return np.column_stack([
+            hour, day_of_week,
+            methane_history.mean(axis=1), methane_history.std(axis=1),
+            methane_history[:, -1] - methane_history[:, 0],
+            co_history.mean(axis=1), co_history.std(axis=1),
+            co_history[:, -1] - co_history[:, 0],
+            temp_history.mean(axis=1), humidity_history.mean(axis=1),
             # Current environmental conditions
-            current_temp = df.iloc[i]['temperature']
-            current_humidity = df.iloc[i]['humidity']
-            current_water_level = df.iloc[i]['water_level']
-            
-            feature_row = [
-                hour, day_of_week,
-                methane_mean, methane_std, methane_trend,
-                co_mean, co_std, co_trend,
-                temp_mean, humidity_mean,
-                current_temp, current_humidity, current_water_level
-            ]
-            
-            features.append(feature_row)
-        
-        return np.array(features)
-    
-    def train(self, data: List[Dict]):
-        """Train the forecasting models"""
-        if len(data) < 20:
-            print("Insufficient data for training. Need at least 20 readings.")
-            return
+            current['temperature'].to_numpy(dtype=np.float64),
+            current['humidity'].to_numpy(dtype=np.float64),
+            current['water_level'].to_numpy(dtype=np.float64)
+        ]).astype(np.float64)
+    
+    @staticmethod
+    def _history_windows(column: pd.Series) -> np.ndarray:
+        """Stride-tricks view of the FEATURE_WINDOW values preceding each feature row"""
+        values = column.to_numpy(dtype=np.float64)
+        return sliding_window_view(values, FEATURE_WINDOW)[:-1]
+    
+    def train(self, data: ReadingData) -> Optional[Dict]:
+        """Train the forecasting models, returning their evaluation metrics"""
+        df = self.to_frame(data)
+        if len(df) < 20:
+            logger.warning("Insufficient data for training. Need at least 20 readings.")
+            return None
         
         try:
             # Prepare features and targets
-            features = self.prepare_features(data)
-            
-            df = pd.DataFrame(data)
-            df = df.sort_values('timestamp')
+            features = self.prepare_features(df)
             
             # Targets are the next values after the feature window
-            methane_targets = df.iloc[4:]['methane'].values
-            co_targets = df.iloc[4:]['co'].values
+            methane_targets = df.iloc[FEATURE_WINDOW:]['methane'].values
+            co_targets = df.iloc[FEATURE_WINDOW:]['co'].values
             
             # Scale features
             features_scaled = self.scaler.fit_transform(features)
@@ -103,98 +337,106 @@ class ForecastingModel:
                 features_scaled, co_targets, test_size=0.2, random_state=42
             )
             
-            # Train models
-            self.methane_model.fit(X_train, y_methane_train)
-            self.co_model.fit(X_train, y_co_train)
+            # Train fresh forests, so retraining a loaded model never reads the old ones
+            self._methane_model = _new_forest().fit(X_train, y_methane_train)
+            self._co_model = _new_forest().fit(X_train, y_co_train)
+            self._compiled = None
             
             # Evaluate models
             methane_score = self.methane_model.score(X_test, y_methane_test)
             co_score = self.co_model.score(X_test, y_co_test)
             
-            print(f"Model training completed. Methane R²: {methane_score:.3f}, CO R²: {co_score:.3f}")
+            logger.info("Model training completed. Methane R²: %.3f, CO R²: %.3f", methane_score, co_score)
             
+            self.metrics = {'methane_r2': methane_score, 'co_r2': co_score, 'rows': len(df)}
+            self._training_window = {
+                'start': str(df['timestamp'].iloc[0]),
+                'end': str(df['timestamp'].iloc[-1]),
+                'rows': len(df)
+            }
             self.is_trained = True
             self.save_models()
+            return self.metrics
             
-        except Exception as e:
-            print(f"Training failed: {e}")
+        except Exception:
+            logger.exception("Training failed")
+            return None
     
-    def predict(self, historical_data: List[Dict], hours: int = 48) -> List[Dict]:
+    def predict(self, historical_data: ReadingData, hours: int = 48) -> List[Dict]:
         """Generate forecast for the next N hours"""
-        if not self.is_trained:
-            # Try to train with available data
-            self.train(historical_data)
-            
-            if not self.is_trained:
+        return self.predict_many({None: historical_data}, hours)[None]
+    
+    def predict_many(self, histories: Dict[object, ReadingData], hours: int = 48) -> Dict[object, List[Dict]]:
+        """Forecast several areas at once, batching each step into one model call"""
+        frames = {key: self.to_frame(data) for key, data in histories.items()}
+        
+        forecasts = {}
+        windows = {}
+        
+        for key, history in frames.items():
+            if self.is_trained and len(history) > FEATURE_WINDOW:
+                windows[key] = RollingFeatureWindow(history)
+                forecasts[key] = []
+            else:
                 # Return simple trend-based forecast as fallback
-                return self.simple_forecast(historical_data, hours)
+                forecasts[key] = self.simple_forecast(history, hours)
+        
+        if not windows:
+            return forecasts
         
         try:
-            # Use the last few readings as starting point
-            recent_data = historical_data[-10:] if len(historical_data) >= 10 else historical_data
-            
-            forecast = []
-            current_time = datetime.fromisoformat(recent_data[-1]['timestamp'])
+            keys = list(windows)
             
-            # Generate predictions for each hour
+            # Generate predictions for each hour, all areas in one call per model
             for hour in range(1, hours + 1):
-                future_time = current_time + timedelta(hours=hour)
+                features = np.vstack([windows[key].features() for key in keys])
                 
-                # Prepare features for prediction
-                if len(recent_data) >= 4:
-                    features = self.prepare_features(recent_data)
-                    if len(features) > 0:
-                        features_scaled = self.scaler.transform([features[-1]])
-                        
-                        # Predict values
-                        methane_pred = self.methane_model.predict(features_scaled)[0]
-                        co_pred = self.co_model.predict(features_scaled)[0]
-                        
-                        # Ensure predictions are non-negative
-                        methane_pred = max(0, methane_pred)
-                        co_pred = max(0, co_pred)
-                        
-                        prediction = {
-                            'timestamp': future_time.isoformat(),
-                            'methane': round(methane_pred, 2),
-                            'co': round(co_pred, 2),
-                            'confidence': 0.8 - (hour * 0.01)  # Decreasing confidence over time
-                        }
-                        
-                        forecast.append(prediction)
-                        
-                        # Add prediction to recent_data for next iteration
-                        recent_data.append({
-                            'timestamp': future_time.isoformat(),
-                            'methane': methane_pred,
-                            'co': co_pred,
-                            'temperature': recent_data[-1]['temperature'],  # Assume stable
-                            'humidity': recent_data[-1]['humidity'],
-                            'water_level': recent_data[-1]['water_level']
-                        })
-            
-            return forecast
+                # Same arithmetic as StandardScaler.transform, minus its per-call validation
+                features_scaled = (features - self.scaler.mean_) / self.scaler.scale_
+                
+                # Predict values, ensuring they are non-negative
+                methane_preds, co_preds = self.compiled_forests().predict(features_scaled)
+                methane_preds = np.maximum(methane_preds, 0)
+                co_preds = np.maximum(co_preds, 0)
+                
+                for key, methane_pred, co_pred in zip(keys, methane_preds, co_preds):
+                    window = windows[key]
+                    future_time = window.start_time + timedelta(hours=hour)
+                    
+                    forecasts[key].append({
+                        'timestamp': future_time.isoformat(),
+                        'methane': float(round(methane_pred, 2)),
+                        'co': float(round(co_pred, 2)),
+                        'confidence': 0.8 - (hour * 0.01)  # Decreasing confidence over time
+                    })
+                    
+                    # Feed the prediction back in for the next step
+                    window.advance(future_time, methane_pred, co_pred)
             
-        except Exception as e:
-            print(f"Prediction failed: {e}")
-            return self.simple_forecast(historical_data, hours)
+        except Exception:
+            logger.exception("Prediction failed")
+            for key in windows:
+                forecasts[key] = self.simple_forecast(frames[key], hours)
+        
+        return forecasts
     
-    def simple_forecast(self, data: List[Dict], hours: int) -> List[Dict]:
+    def simple_forecast(self, data: ReadingData, hours: int) -> List[Dict]:
         """Simple trend-based forecast as fallback"""
-        if len(data) < 2:
+        df = self.to_frame(data)
+        if len(df) < 2:
             return []
         
         # Calculate simple trends
-        recent = data[-5:] if len(data) >= 5 else data
+        recent = df.tail(5)
         
-        methane_values = [r['methane'] for r in recent]
-        co_values = [r['co'] for r in recent]
+        methane_values = recent['methane'].to_numpy()
+        co_values = recent['co'].to_numpy()
         
         methane_trend = (methane_values[-1] - methane_values[0]) / len(methane_values)
         co_trend = (co_values[-1] - co_values[0]) / len(co_values)
         
         forecast = []
-        current_time = datetime.fromisoformat(data[-1]['timestamp'])
+        current_time = datetime.fromisoformat(df['timestamp'].iloc[-1])
         
         for hour in range(1, hours + 1):
             future_time = current_time + timedelta(hours=hour)
@@ -214,30 +456,120 @@ class ForecastingModel:
         
         return forecast
     
+    def _artifact_path(self, name: str) -> str:
+        return os.path.join(self.model_path, ARTIFACT_FILES[name])
+    
     def save_models(self):
-        """Save trained models to disk"""
+        """Save trained models to disk, each file atomically and the manifest last.
+
+        The manifest records the feature schema, training window, metrics,
+        compression and the size of every file, so a reader can tell a
+        complete set of files from a mix of two saves.
+        """
         try:
-            joblib.dump(self.methane_model, os.path.join(self.model_path, 'methane_model.pkl'))
-            joblib.dump(self.co_model, os.path.join(self.model_path, 'co_model.pkl'))
-            joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.pkl'))
-            print("Models saved successfully")
+            artifacts = {
+                'methane_model': self.methane_model,
+                'co_model': self.co_model,
+                'scaler': self.scaler,
+                'compiled_forest': self.compiled_forests().to_arrays()
+            }
+            
+            files = {}
+            for name, obj in artifacts.items():
+                path = self._artifact_path(name)
+                _replace_atomically(path, lambda tmp_path: joblib.dump(obj, tmp_path, compress=self._compress))
+                files[name] = {'file': ARTIFACT_FILES[name], 'bytes': os.path.getsize(path)}
+            
+            manifest = {
+                'format': ARTIFACT_FORMAT,
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'features': FEATURE_NAMES,
+                'feature_window': FEATURE_WINDOW,
+                'training_window': self._training_window,
+                'metrics': self.metrics,
+                'compression': self.compression,
+                'files': files,
+                'versions': {'numpy': np.__version__, 'scikit-learn': sklearn.__version__,
+                             'joblib': joblib.__version__}
+            }
+            
+            def write_manifest(tmp_path):
+                with open(tmp_path, 'w') as f:
+                    json.dump(manifest, f, indent=2)
+            
+            _replace_atomically(os.path.join(self.model_path, MANIFEST_FILE), write_manifest)
+            self.manifest = manifest
+            logger.info("Models saved successfully")
         except Exception as e:
-            print(f"Failed to save models: {e}")
+            logger.error("Failed to save models: %s", e)
+    
+    def _check_manifest(self, manifest: Dict) -> Optional[str]:
+        """Why the saved models cannot be served by this code, or None if they can"""
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            return f"artifact format {manifest.get('format')}, expected {ARTIFACT_FORMAT}"
+        if manifest.get('features') != FEATURE_NAMES or manifest.get('feature_window') != FEATURE_WINDOW:
+            return "trained on a different feature schema"
+        for name, entry in manifest['files'].items():
+            path = os.path.join(self.model_path, entry['file'])
+            if not os.path.exists(path) or os.path.getsize(path) != entry['bytes']:
+                return f"{entry['file']} is missing or does not match the manifest"
+        return None
     
     def load_models(self):
-        """Load trained models from disk"""
+        """Load trained models from disk.
+
+        Only the manifest, the scaler and the compiled forest arrays that
+        predict uses are read. Uncompressed arrays are memory-mapped, so
+        every worker serving the model shares one copy through the page
+        cache; the sklearn forests are unpickled only on first access.
+        """
+        manifest_path = os.path.join(self.model_path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            self._load_unversioned_models()
+            return
+        
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            
+            problem = self._check_manifest(manifest)
+            if problem:
+                logger.warning("Not loading models from %s: %s", self.model_path, problem)
+                return
+            
+            # joblib cannot memory-map compressed files, and warns if asked to
+            mmap_mode = 'r' if manifest.get('compression', 'none') == 'none' else None
+            self.scaler = joblib.load(self._artifact_path('scaler'))
+            self._compiled = CompiledForest.from_arrays(
+                joblib.load(self._artifact_path('compiled_forest'), mmap_mode=mmap_mode)
+            )
+            self._methane_model = None
+            self._co_model = None
+            self.metrics = manifest.get('metrics') or {}
+            self._training_window = manifest.get('training_window')
+            self.manifest = manifest
+            self.is_trained = True
+            logger.info("Models loaded successfully")
+            
+        except Exception as e:
+            logger.error("Failed to load models: %s", e)
+            self.is_trained = False
+    
+    def _load_unversioned_models(self):
+        """Load the three pickles saved before models had a manifest"""
         try:
-            methane_path = os.path.join(self.model_path, 'methane_model.pkl')
-            co_path = os.path.join(self.model_path, 'co_model.pkl')
-            scaler_path = os.path.join(self.model_path, 'scaler.pkl')
+            methane_path = self._artifact_path('methane_model')
+            co_path = self._artifact_path('co_model')
+            scaler_path = self._artifact_path('scaler')
             
             if all(os.path.exists(path) for path in [methane_path, co_path, scaler_path]):
-                self.methane_model = joblib.load(methane_path)
-                self.co_model = joblib.load(co_path)
+                self._methane_model = joblib.load(methane_path)
+                self._co_model = joblib.load(co_path)
                 self.scaler = joblib.load(scaler_path)
+                self._compiled = None
                 self.is_trained = True
-                print("Models loaded successfully")
+                logger.info("Models loaded from %s without a manifest; retrain to version them", self.model_path)
             
         except Exception as e:
-            print(f"Failed to load models: {e}")
+            logger.error("Failed to load models: %s", e)
             self.is_trained = False
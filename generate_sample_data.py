@@ -1,93 +1,109 @@
-import sqlite3
-import random
-from datetime import datetime, timedelta
-import json
-
-def generate_sample_data():
-    """Generate sample sensor data for testing"""
-    
-    # Connect to database
-    conn = sqlite3.connect('lemos.db')
-    cursor = conn.cursor()
-    
-    # Create tables if they don't exist
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sensor_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            area_id TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            mq4_1 REAL, mq4_2 REAL, mq4_3 REAL, mq4_avg REAL,
-            mq7_1 REAL, mq7_2 REAL, mq7_3 REAL, mq7_avg REAL,
-            temperature REAL, humidity REAL,
-            ultrasonic_distance REAL,
-            soil_moisture REAL,
-            vibration INTEGER,
-            ir_detection INTEGER
-        )
-    ''')
-    
-    # Generate data for last 7 days
-    start_time = datetime.now() - timedelta(days=7)
-    
-    for area_id in ['1', '2', '3']:
-        print(f"Generating data for Area {area_id}...")
-        
-        for i in range(7 * 24 * 2):  # Every 30 minutes for 7 days
-            timestamp = start_time + timedelta(minutes=30 * i)
-            
-            # Generate realistic sensor values with some variation
-            base_mq4 = 400 + random.gauss(0, 50)  # Base methane level
-            base_mq7 = 10 + random.gauss(0, 2)    # Base CO level
-            base_temp = 25 + random.gauss(0, 5)   # Base temperature
-            
-            # Add some daily patterns
-            hour = timestamp.hour
-            if 10 <= hour <= 16:  # Daytime heating
-                base_temp += 5
-                base_mq4 += 50
-            
-            # Occasional spikes for testing alerts
-            if random.random() < 0.02:  # 2% chance of spike
-                base_mq4 *= 2.5
-                base_mq7 *= 3
-            
-            # Generate individual sensor readings
-            mq4_1 = max(200, base_mq4 + random.gauss(0, 20))
-            mq4_2 = max(200, base_mq4 + random.gauss(0, 20))
-            mq4_3 = max(200, base_mq4 + random.gauss(0, 20))
-            mq4_avg = (mq4_1 + mq4_2 + mq4_3) / 3
-            
-            mq7_1 = max(5, base_mq7 + random.gauss(0, 2))
-            mq7_2 = max(5, base_mq7 + random.gauss(0, 2))
-            mq7_3 = max(5, base_mq7 + random.gauss(0, 2))
-            mq7_avg = (mq7_1 + mq7_2 + mq7_3) / 3
-            
-            temperature = base_temp + random.gauss(0, 2)
-            humidity = max(20, min(90, 50 + random.gauss(0, 10)))
-            ultrasonic_distance = 100 + random.gauss(0, 10)
-            soil_moisture = 500 + random.gauss(0, 50)
-            vibration = 1 if random.random() < 0.05 else 0
-            ir_detection = 1 if random.random() < 0.1 else 0
-            
-            # Insert data
-            cursor.execute('''
-                INSERT INTO sensor_data (
-                    area_id, timestamp, mq4_1, mq4_2, mq4_3, mq4_avg,
-                    mq7_1, mq7_2, mq7_3, mq7_avg,
-                    temperature, humidity, ultrasonic_distance,
-                    soil_moisture, vibration, ir_detection
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                area_id, timestamp.isoformat(),
-                mq4_1, mq4_2, mq4_3, mq4_avg,
-                mq7_1, mq7_2, mq7_3, mq7_avg,
-                temperature, humidity, ultrasonic_distance,
-                soil_moisture, vibration, ir_detection
-            ))
-    
-    conn.commit()
-    conn.close()
-    print("Sample data generation complete!")
+import argparse
+import time
+
+import numpy as np
+
+from services.database import DatabaseManager, INSERT_READING_SQL
+
+# Multipliers applied to each reading inside an injected excursion
+EXCURSION_FACTORS = {'methane': 2.5, 'co': 3.0}
+
+def generate_columns(rng, areas, start_ms, steps, interval_ms, active, excursion_rate, excursion_length):
+    """One chunk of readings for every area as NumPy columns, time-major.
+
+    ``active`` holds how many more steps each area's current excursion
+    lasts; it is updated in place so excursions carry across chunks.
+    """
+    ts = start_ms + np.arange(steps, dtype=np.int64) * interval_ms
+    shape = (steps, areas)
+
+    # Daytime heating, as the sites see between 10:00 and 16:59
+    hour = (ts // 3_600_000) % 24
+    daytime = ((hour >= 10) & (hour <= 16))[:, None]
+
+    methane = 400 + rng.normal(0, 50, shape) + 50 * daytime + rng.normal(0, 20, shape)
+    co = 10 + rng.normal(0, 2, shape) + rng.normal(0, 2, shape)
+    temperature = 25 + rng.normal(0, 5, shape) + 5 * daytime + rng.normal(0, 2, shape)
+    humidity = np.clip(50 + rng.normal(0, 10, shape), 20, 90)
+    water_level = np.clip(40 + rng.normal(0, 5, shape), 0, 100)
+
+    # Each excursion covers excursion_length steps from where it starts:
+    # +1 at the start and -1 just past the end, summed down the time axis
+    step = np.arange(steps)[:, None]
+    starts = rng.random(shape) < excursion_rate
+    delta = np.zeros((steps + excursion_length, areas), dtype=np.int32)
+    start_steps, start_areas = np.nonzero(starts)
+    np.add.at(delta, (start_steps, start_areas), 1)
+    np.add.at(delta, (start_steps + excursion_length, start_areas), -1)
+    excursion = (np.cumsum(delta, axis=0)[:steps] > 0) | (step < active)
+    ends = np.where(starts, step + excursion_length, 0).max(axis=0, initial=0)
+    active[:] = np.maximum(np.maximum(active - steps, ends - steps), 0)
+
+    methane = np.where(excursion, methane * EXCURSION_FACTORS['methane'], methane)
+    co = np.where(excursion, co * EXCURSION_FACTORS['co'], co)
+
+    stamps = np.datetime_as_string(ts.astype('datetime64[ms]'), unit='s')
+    return {
+        'area_id': np.broadcast_to(np.arange(1, areas + 1), shape).ravel(),
+        'methane': np.maximum(200, methane).round(2).ravel(),
+        'co': np.maximum(5, co).round(2).ravel(),
+        'temperature': temperature.round(2).ravel(),
+        'humidity': humidity.round(2).ravel(),
+        'water_level': water_level.round(2).ravel(),
+        # Explicit UTC offset, so the text and ts agree on any server
+        'timestamp': np.repeat(np.char.add(stamps, '+00:00'), areas),
+        'ts': np.repeat(ts, areas),
+        'excursion': excursion.ravel()
+    }
+
+def generate_sample_data(db_path='lemos.db', areas=3, days=7.0, interval=60.0,
+                         excursion_rate=0.002, excursion_length=10, seed=42, chunk_rows=100000):
+    """Generate sample sensor data for testing straight into the readings table"""
+    db_manager = DatabaseManager(db_path)
+    db_manager.init_database()
+
+    rng = np.random.default_rng(seed)
+    interval_ms = int(interval * 1000)
+    total_steps = int(days * 86400 / interval)
+    start_ms = (int(time.time() * 1000) - total_steps * interval_ms) // interval_ms * interval_ms
+    chunk_steps = max(1, chunk_rows // areas)
+    active = np.zeros(areas, dtype=np.int64)
+
+    print(f"Generating {total_steps * areas} readings for {areas} areas over {days:g} days, "
+          f"one every {interval:g} s per area...")
+    started = time.perf_counter()
+    excursion_rows = 0
+
+    for offset in range(0, total_steps, chunk_steps):
+        steps = min(chunk_steps, total_steps - offset)
+        columns = generate_columns(rng, areas, start_ms + offset * interval_ms, steps, interval_ms,
+                                   active, excursion_rate, excursion_length)
+        excursion_rows += int(columns['excursion'].sum())
+
+        rows = zip(*(columns[column].tolist() for column in
+                     ('area_id', 'methane', 'co', 'temperature', 'humidity', 'water_level', 'timestamp', 'ts')))
+        with db_manager.connection() as conn, conn:
+            conn.executemany(INSERT_READING_SQL, rows)
+
+    # The rows went in with plain INSERTs, so fold them into the rollups in one pass
+    db_manager.rebuild_rollups()
+    db_manager.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Sample data generation complete! {total_steps * areas} readings "
+          f"({excursion_rows} in excursions) in {elapsed:.1f} s")
 
 if __name__ == "__main__":
-    generate_sample_data()
+    parser = argparse.ArgumentParser(description='Fill the readings table with synthetic sensor data')
+    parser.add_argument('--db', default='lemos.db')
+    parser.add_argument('--areas', type=int, default=3)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--interval', type=float, default=60, help='seconds between readings of an area')
+    parser.add_argument('--excursion-rate', type=float, default=0.002,
+                        help='chance per reading that a methane/CO excursion starts')
+    parser.add_argument('--excursion-length', type=int, default=10, help='readings each excursion lasts')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate_sample_data(args.db, args.areas, args.days, args.interval,
+                         args.excursion_rate, args.excursion_length, args.seed)
@@ -0,0 +1,162 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+class IngestQueueFull(Exception):
+    """Raised when the ingest queue cannot accept more readings"""
+
+class IngestWriter:
+    """Background writer that group-commits queued readings.
+
+    Request handlers hand processed readings to ``submit`` and return
+    immediately; a single writer thread drains the queue and commits
+    everything it collected with one ``executemany`` per batch. If a batch
+    cannot be written, each request's readings are written on their own,
+    so only the requests that fail again are dropped.
+    """
+
+    def __init__(self, db_manager, max_pending: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.25, max_retries: int = 3,
+                 on_commit: Optional[Callable[[Sequence[Dict], Sequence[int]], None]] = None):
+        self.db_manager = db_manager
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        # Each queue entry is the list of readings from one request, so a
+        # multi-zone payload is accepted or rejected as a whole.
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.readings_written = 0
+        self.readings_dropped = 0
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, readings: List[Dict]):
+        """Queue processed readings for the next group commit"""
+        if not readings:
+            return
+
+        try:
+            self._queue.put_nowait(list(readings))
+        except queue.Full:
+            raise IngestQueueFull('Ingest queue is full')
+
+    def depth(self) -> int:
+        """Number of queued requests not yet picked up by the writer"""
+        return self._queue.qsize()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything queued so far has been committed"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 10.0):
+        """Flush pending readings and stop the writer thread"""
+        self._stop_event.set()
+
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _collect_batch(self) -> List[List[Dict]]:
+        """Wait for the first entry, then gather more until the batch is full or the flush interval expires"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+
+        entries = [first]
+        count = len(first)
+        deadline = time.monotonic() + self.flush_interval
+
+        while count < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stop_event.is_set():
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            entries.append(entry)
+            count += len(entry)
+
+        return entries
+
+    def _store(self, readings: List[Dict], attempts: int) -> Optional[List[int]]:
+        """store_readings, retrying transient errors; None if the readings could not be written"""
+        for attempt in range(1, attempts + 1):
+            try:
+                return self.db_manager.store_readings(readings)
+            except sqlite3.IntegrityError as e:
+                # The data itself is rejected; writing it again cannot succeed
+                logger.warning("Ingest write rejected: %s", e)
+                return None
+            except Exception as e:
+                logger.warning("Ingest batch write failed (attempt %d/%d): %s", attempt, attempts, e)
+                if attempt < attempts:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+        return None
+
+    def _write(self, entries: List[List[Dict]]):
+        readings = [reading for entry in entries for reading in entry]
+        ids = self._store(readings, self.max_retries)
+
+        if ids is None:
+            # Write one request at a time, so only the ones that fail again are lost
+            readings, ids = [], []
+            for entry in entries:
+                entry_ids = self._store(entry, 1) if len(entries) > 1 else None
+                if entry_ids is None:
+                    self.readings_dropped += len(entry)
+                    logger.error("Dropped %d readings that could not be written", len(entry))
+                    continue
+                readings.extend(entry)
+                ids.extend(entry_ids)
+
+        if not readings:
+            return
+        self.readings_written += len(readings)
+
+        if self.on_commit:
+            try:
+                self.on_commit(readings, ids)
+            except Exception:
+                logger.exception("Ingest commit callback failed")
+
+    def _run(self):
+        while True:
+            entries = self._collect_batch()
+
+            if entries:
+                try:
+                    self._write(entries)
+                finally:
+                    for _ in entries:
+                        self._queue.task_done()
+            elif self._stop_event.is_set():
+                # Queue drained after shutdown was requested
+                return
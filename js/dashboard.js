@@ -11,6 +11,7 @@ class LEMOSDashboard {
   init() {
     this.initCharts()
     this.startDataUpdates()
+    this.startEventStream()
     this.checkSystemStatus()
 
     // Update every 30 seconds
@@ -201,7 +202,7 @@ class LEMOSDashboard {
       }
 
       // Fallback to readings endpoint
-      response = await fetch(`/api/readings?area_id=${this.currentArea}&hours=1`)
+      response = await fetch(`/api/readings?area_id=${this.currentArea}&minutes=60`)
       console.log("[v0] Readings API response status:", response.status)
 
       if (!response.ok) {
@@ -369,7 +370,7 @@ class LEMOSDashboard {
   async updateHistoricalCharts() {
     try {
       console.log("[v0] Fetching historical data for area:", this.currentArea)
-      const response = await fetch(`/api/readings?area_id=${this.currentArea}&hours=24`)
+      const response = await fetch(`/api/readings?area_id=${this.currentArea}&hours=24&resolution=1h`)
 
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`)
@@ -379,7 +380,8 @@ class LEMOSDashboard {
       console.log("[v0] Historical data received:", data?.length || 0, "records")
 
       if (data && Array.isArray(data) && data.length > 0) {
-        const sortedData = data.slice(-20).reverse()
+        // Hourly buckets arrive newest first
+        const sortedData = data.slice(0, 24).reverse()
 
         // Prepare data for charts
         const labels = sortedData.map((d) => {
@@ -457,6 +459,31 @@ class LEMOSDashboard {
     document.getElementById("ml-status").textContent = "🟢 Active"
   }
 
+  startEventStream() {
+    if (!window.EventSource) {
+      return
+    }
+
+    // Live readings for the current area only, filtered by the server;
+    // the 30 second poll stays as a fallback
+    if (this.eventSource) {
+      this.eventSource.close()
+    }
+    this.eventSource = new EventSource(`/api/stream?area_id=${encodeURIComponent(this.currentArea)}`)
+
+    this.eventSource.addEventListener("reading", (event) => {
+      const reading = JSON.parse(event.data)
+      this.updateReadings(reading)
+      this.updateConnectionStatus(true)
+      this.lastUpdate = new Date()
+      document.getElementById("last-update").textContent = `Last Update: ${this.lastUpdate.toLocaleTimeString()}`
+    })
+
+    this.eventSource.addEventListener("alert", (event) => {
+      console.log("[v0] Alert received:", JSON.parse(event.data))
+    })
+  }
+
   startDataUpdates() {
     // Initial data load
     this.updateCurrentData()
@@ -475,6 +502,7 @@ function switchArea(areaId) {
   // Update dashboard
   if (window.dashboard) {
     window.dashboard.currentArea = areaId
+    window.dashboard.startEventStream()
     window.dashboard.updateCurrentData()
     window.dashboard.updateForecast()
   }
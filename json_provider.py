@@ -0,0 +1,67 @@
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o: Any) -> Any:
+    """NumPy arrays and scalars as plain lists and numbers, then Flask's own types"""
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    return DefaultJSONProvider.default(o)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with orjson when it is
+    installed, and with the stdlib json module otherwise.
+
+    Parsed output is the same either way: keys are sorted, dates use the
+    HTTP date format and NumPy arrays and scalars become plain lists and
+    numbers. orjson writes non-ASCII text as UTF-8 rather than escapes,
+    and NaN as null.
+    """
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self) -> int:
+        # Dates are passed to default so they keep Flask's format
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Compact UTF-8 JSON, without going through a str on the orjson path"""
+        if orjson is None:
+            return super().dumps(obj, separators=(',', ':')).encode()
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options())
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # orjson only writes compact output, so anything beyond separators,
+        # such as an indent, goes to the stdlib encoder
+        if orjson is None or kwargs.keys() - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+        # NaN, Infinity and integers past 64 bits were always accepted,
+        # and invalid JSON still raises the stdlib's error
+        return super().loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None or (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
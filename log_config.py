@@ -0,0 +1,105 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields alongside the message"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class SampleFilter(logging.Filter):
+    """Pass one in ``rate`` records at or below ``level`` per call site.
+
+    Per-reading debug lines can then stay on in production: each message
+    template still shows up regularly, and a passed record carries
+    ``sampled`` to say how many it stands for.
+    """
+
+    def __init__(self, rate: int, level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self.level = level
+        self._counters = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level or self.rate == 1:
+            return True
+        counter = self._counters.get((record.name, record.msg))
+        if counter is None:
+            counter = self._counters.setdefault((record.name, record.msg), itertools.count())
+        if next(counter) % self.rate:
+            return False
+        record.sampled = self.rate
+        return True
+
+def parse_module_levels(value: Optional[str]) -> Dict[str, str]:
+    """Parse per-module levels such as 'services.database=WARNING,ingestion=DEBUG'"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, level = item.split('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging(level: str = 'INFO', module_levels: Optional[Dict[str, str]] = None,
+                      json_format: bool = False, sample_rate: int = 100,
+                      stream=None) -> logging.handlers.QueueListener:
+    """Route every logger through a QueueHandler so request threads only
+    enqueue records; one listener thread formats and writes them.
+
+    Safe to call again: the previous listener is flushed and replaced.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+        for handler in list(root.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(SampleFilter(sample_rate))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    if _listener is None:
+        atexit.register(lambda: _listener and _listener.stop())
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
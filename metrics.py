@@ -0,0 +1,299 @@
+import bisect
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds, from sub-millisecond SQLite queries
+# to multi-minute model training
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class _Timer:
+    """Context manager that observes its elapsed time into a histogram"""
+
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name: str, labels: Dict[str, object]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+class MetricsRegistry:
+    """In-process counters, histograms and gauges, rendered in the Prometheus text format.
+
+    Updates only touch a dict under a lock. With a ``directory``, each
+    process writes its values to ``metrics-<pid>.json`` there at most
+    every ``flush_interval`` seconds, from whichever call comes due, and a
+    scrape in any worker adds up every file, so gunicorn workers report
+    as one. A scrape deletes the files of processes that have exited, so
+    the directory does not grow with every worker restart; to Prometheus
+    their counters drop out like any other process restart.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 5.0
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._gauges = {}
+        self._reset()
+
+    def _reset(self):
+        # Values belong to the process that recorded them; a forked child starts empty
+        self._pid = os.getpid()
+        self._flush_lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._next_flush = time.monotonic() + self.flush_interval
+
+    def configure(self, enabled: bool = True, directory: Optional[str] = None, flush_interval: float = 5.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+        if enabled and directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """Declare a metric's type ('counter', 'histogram' or 'gauge') and HELP text"""
+        self._descriptions[name] = (kind, help_text)
+
+    def register_gauge(self, name: str, fn: Callable[[], object], help_text: str, shared: bool = False):
+        """Sample fn() whenever values are flushed or scraped.
+
+        fn returns a number, or a dict of label tuples to numbers. Per-process
+        gauges are added up across workers; ``shared`` ones read state every
+        worker sees, such as a table, and come only from the scraping process.
+        """
+        self.describe(name, 'gauge', help_text)
+        self._gauges[name] = (fn, shared)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._maybe_flush()
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts plus the +Inf bucket, then sum
+                histogram = self._histograms[key] = [0] * (len(DEFAULT_BUCKETS) + 1) + [0.0]
+            histogram[bisect.bisect_left(DEFAULT_BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+        self._maybe_flush()
+
+    def timer(self, name: str, **labels):
+        """``with metrics.timer('lemos_..._seconds', stage='store'):`` times the block"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator form of timer()"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _sample_gauges(self, shared: bool) -> list:
+        samples = []
+        for name, (fn, is_shared) in list(self._gauges.items()):
+            if is_shared != shared:
+                continue
+            try:
+                value = fn()
+            except Exception:
+                logger.exception("Metrics gauge %s failed", name)
+                continue
+            if isinstance(value, dict):
+                samples.extend([name, list(labels), number] for labels, number in value.items())
+            elif value is not None:
+                samples.append([name, [], value])
+        return samples
+
+    def snapshot(self) -> Dict:
+        """This process's values in the form written to the metrics directory"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            counters = [[name, [list(label) for label in labels], value]
+                        for (name, labels), value in self._counters.items()]
+            histograms = [[name, [list(label) for label in labels], list(values)]
+                          for (name, labels), values in self._histograms.items()]
+        return {
+            'pid': self._pid,
+            'buckets': list(DEFAULT_BUCKETS),
+            'counters': counters,
+            'histograms': histograms,
+            'gauges': self._sample_gauges(shared=False)
+        }
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def _maybe_flush(self):
+        # One thread writes while the rest carry on
+        if self.directory and time.monotonic() >= self._next_flush and self._flush_lock.acquire(blocking=False):
+            try:
+                self._write()
+            finally:
+                self._flush_lock.release()
+
+    def flush(self):
+        """Write this process's values to the metrics directory"""
+        if self.directory:
+            with self._flush_lock:
+                self._write()
+
+    def _write(self):
+        self._next_flush = time.monotonic() + self.flush_interval
+        path = self._path(os.getpid())
+
+        try:
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+
+    def collect(self) -> Dict:
+        """Every worker's values added up: {(name, labels): value}, and histograms
+        as {(name, labels): {le: count, 'sum': total}}"""
+        if self.directory:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if snapshot['pid'] != os.getpid() and not _is_alive(snapshot['pid']):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                snapshots.append(snapshot)
+        else:
+            snapshots = [self.snapshot()]
+
+        counters, histograms, gauges = {}, {}, {}
+        for snapshot in snapshots:
+            bounds = [str(bound) for bound in snapshot['buckets']] + ['+Inf']
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                merged = histograms.setdefault((name, tuple(map(tuple, labels))), {'sum': 0.0})
+                for bound, count in zip(bounds, values):
+                    merged[bound] = merged.get(bound, 0) + count
+                merged['sum'] += values[-1]
+            for name, labels, value in snapshot['gauges']:
+                key = (name, tuple(map(tuple, labels)))
+                gauges[key] = gauges.get(key, 0) + value
+
+        for name, labels, value in self._sample_gauges(shared=True):
+            gauges[(name, tuple(map(tuple, labels)))] = value
+        return {'counter': counters, 'histogram': histograms, 'gauge': gauges}
+
+    def render(self) -> str:
+        """All workers' metrics in the Prometheus text exposition format"""
+        collected = self.collect()
+        families = {}
+        for kind, values in collected.items():
+            for (name, labels), value in values.items():
+                families.setdefault(name, (kind, []))[1].append((labels, value))
+
+        lines = []
+        for name in sorted(families):
+            kind, samples = families[name]
+            help_text = self._descriptions.get(name, (kind, ''))[1]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(samples, key=lambda sample: sample[0]):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                bounds = sorted((bound for bound in value if bound not in ('sum', '+Inf')), key=float)
+                for bound in bounds + ['+Inf']:
+                    cumulative += value.get(bound, 0)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value["sum"]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+# The registry every module records into; app.py configures it
+metrics = MetricsRegistry()
+
+metrics.describe('lemos_http_request_duration_seconds', 'histogram',
+                 'Time to build each response, by route, method and status')
+metrics.describe('lemos_ingest_stage_duration_seconds', 'histogram',
+                 'Time in each stage of POST /api/readings: parse, process, store, alerts')
+metrics.describe('lemos_readings_stored_total', 'counter', 'Readings committed to the database')
+metrics.describe('lemos_db_query_duration_seconds', 'histogram',
+                 'DatabaseManager calls by operation; _count is the number of queries')
+metrics.describe('lemos_db_pool_wait_seconds', 'histogram',
+                 'Time spent waiting for a pooled database connection when all were in use')
+metrics.describe('lemos_db_pool_timeouts_total', 'counter',
+                 'Requests that gave up waiting for a pooled database connection')
+metrics.describe('lemos_stream_rejected_total', 'counter',
+                 '/api/stream connections refused because the process had too many open')
+metrics.describe('lemos_forecast_duration_seconds', 'histogram',
+                 'Forecasts by where they ran and whether a trained model or the fallback made them')
+metrics.describe('lemos_model_training_duration_seconds', 'histogram', 'Model training runs by result')
+metrics.describe('lemos_sms_send_duration_seconds', 'histogram', 'Twilio send calls by result')
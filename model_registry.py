@@ -0,0 +1,204 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ml.forecasting import ForecastingModel, ReadingData
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """Per-area forecasting models with background training and an LRU of loaded models.
+
+    Each area's models live in ``<model_dir>/area_<id>/v<version>/`` and a
+    ``LATEST`` file names the version to serve. A version directory holds
+    the model files and the ``manifest.json`` describing them. ``forecast`` only ever queues
+    training on a worker thread; ``train`` is for callers that are already
+    off the request path. A finished model is published by renaming its
+    directory into place and swapped into memory under the lock, so a
+    reader sees either the old model or the new one.
+    """
+
+    def __init__(self, model_dir: str = 'models/', max_loaded: int = 16,
+                 retrain_interval: float = 24 * 3600, refresh_interval: float = 30,
+                 training_workers: int = 1, compression: str = 'none'):
+        self.model_dir = model_dir
+        self.compression = compression
+        self.max_loaded = max_loaded
+        self.retrain_interval = retrain_interval
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._models = OrderedDict()  # area_id -> (version, model, trained_at), least recently used first
+        self._checked_at = {}
+        self._training = set()
+        self._executor = ThreadPoolExecutor(max_workers=training_workers,
+                                            thread_name_prefix='model-training')
+
+        # Untrained model, used only for its trend-based fallback forecast
+        self._fallback = ForecastingModel(model_path=model_dir, autoload=False)
+
+        os.makedirs(self.model_dir, exist_ok=True)
+
+    def area_dir(self, area_id) -> str:
+        return os.path.join(self.model_dir, f'area_{area_id}')
+
+    def latest_version(self, area_id) -> Optional[int]:
+        """Version named by the area's LATEST file, if it has been trained"""
+        try:
+            with open(os.path.join(self.area_dir(area_id), 'LATEST')) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def version(self, area_id) -> Optional[int]:
+        """Version of the model currently served for an area"""
+        with self._lock:
+            entry = self._models.get(area_id)
+        return entry[0] if entry else self.latest_version(area_id)
+
+    def get(self, area_id) -> Optional[ForecastingModel]:
+        """Return the area's model, loading it from disk if it is not resident"""
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._models.get(area_id)
+            if entry:
+                self._models.move_to_end(area_id)
+                # Other workers may have published a newer version meanwhile
+                if now - self._checked_at.get(area_id, 0) < self.refresh_interval:
+                    return entry[1]
+            self._checked_at[area_id] = now
+
+        version = self.latest_version(area_id)
+        if version is None:
+            return entry[1] if entry else None
+        if entry and entry[0] >= version:
+            return entry[1]
+
+        model = self._load(area_id, version)
+        if model is None:
+            return entry[1] if entry else None
+
+        trained_at = os.path.getmtime(model.model_path)
+        self._install(area_id, version, model, trained_at)
+        return model
+
+    def forecast(self, area_id, historical_data: ReadingData, hours: int = 48) -> List[Dict]:
+        """Forecast with the area's model; never trains on the calling thread"""
+        model = self.get(area_id)
+
+        if model is None or self._is_stale(area_id):
+            self.schedule_training(area_id, historical_data)
+
+        if model is None:
+            with metrics.timer('lemos_forecast_duration_seconds', source='request', model='fallback'):
+                return self.fallback_forecast(historical_data, hours)
+
+        with metrics.timer('lemos_forecast_duration_seconds', source='request', model='trained'):
+            return model.predict(historical_data, hours)
+
+    def fallback_forecast(self, historical_data: ReadingData, hours: int = 48) -> List[Dict]:
+        """Trend-based forecast for areas without a trained model"""
+        return self._fallback.simple_forecast(historical_data, hours)
+
+    def needs_training(self, area_id) -> bool:
+        """Whether the area has no usable model or its model is past the retrain interval"""
+        return self.get(area_id) is None or self._is_stale(area_id)
+
+    def schedule_training(self, area_id, data: ReadingData) -> bool:
+        """Queue a background training job; False if one is already pending for the area"""
+        with self._lock:
+            if area_id in self._training:
+                return False
+            self._training.add(area_id)
+
+        # Snapshot the data so the caller can reuse its buffers
+        frame = ForecastingModel.to_frame(data).copy()
+        self._executor.submit(self._run_training, area_id, frame)
+        return True
+
+    def is_training(self, area_id) -> bool:
+        with self._lock:
+            return area_id in self._training
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _is_stale(self, area_id) -> bool:
+        with self._lock:
+            entry = self._models.get(area_id)
+        return bool(entry) and time.time() - entry[2] > self.retrain_interval
+
+    def _load(self, area_id, version: int) -> Optional[ForecastingModel]:
+        version_dir = os.path.join(self.area_dir(area_id), f'v{version}')
+        model = ForecastingModel(model_path=version_dir, autoload=False)
+        model.load_models()
+        return model if model.is_trained else None
+
+    def _install(self, area_id, version: int, model: ForecastingModel, trained_at: float):
+        """Atomically swap a model into the cache and evict the least recently used ones"""
+        with self._lock:
+            current = self._models.get(area_id)
+            if current and current[0] > version:
+                return
+            self._models[area_id] = (version, model, trained_at)
+            self._models.move_to_end(area_id)
+
+            while len(self._models) > self.max_loaded:
+                # Evicted models are reloaded from disk on their next use
+                self._models.popitem(last=False)
+
+    def train(self, area_id, data: ReadingData) -> Optional[ForecastingModel]:
+        """Train, publish and serve a new model version for an area on the calling thread"""
+        area_dir = self.area_dir(area_id)
+        os.makedirs(area_dir, exist_ok=True)
+
+        version = (self.latest_version(area_id) or 0) + 1
+        staging_dir = os.path.join(area_dir, f'.v{version}.{os.getpid()}.tmp')
+
+        started = time.perf_counter()
+        model = ForecastingModel(model_path=staging_dir, autoload=False, compression=self.compression)
+        model.train(data)
+        metrics.observe('lemos_model_training_duration_seconds', time.perf_counter() - started,
+                        result='ok' if model.is_trained else 'failed')
+        if not model.is_trained:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return None
+
+        version_dir = os.path.join(area_dir, f'v{version}')
+        try:
+            os.rename(staging_dir, version_dir)
+        except OSError:
+            # Another worker published this version first; serve theirs
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return self.get(area_id)
+
+        # Serve the published files, memory-mapped like every other worker's copy
+        model = self._load(area_id, version) or model
+        model.model_path = version_dir
+        self._write_latest(area_id, version)
+        self._install(area_id, version, model, time.time())
+        logger.info("Trained forecasting model v%d for area %s", version, area_id)
+        return model
+
+    def _run_training(self, area_id, data):
+        try:
+            self.train(area_id, data)
+        except Exception:
+            logger.exception("Background training failed for area %s", area_id)
+        finally:
+            with self._lock:
+                self._training.discard(area_id)
+
+    def _write_latest(self, area_id, version: int):
+        latest_path = os.path.join(self.area_dir(area_id), 'LATEST')
+        tmp_path = f'{latest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, latest_path)
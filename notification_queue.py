@@ -0,0 +1,217 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_SMS_SQL = '''
+    INSERT INTO sms_outbox (number, body, severity, area_id, next_attempt_at, created_at)
+    SELECT ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (
+        SELECT 1 FROM sms_outbox
+        WHERE number = ? AND body = ? AND created_at >= ? AND status != 'failed'
+    )
+'''
+
+# Claim the oldest due message in one statement, so workers in every
+# process can share the outbox. A 'sending' row whose claim is older than
+# the claim timeout belonged to a worker that died and is taken over.
+# Numbers that already had rate_limit sends in the window are skipped.
+CLAIM_SMS_SQL = '''
+    UPDATE sms_outbox
+    SET status = 'sending', attempts = attempts + 1, last_attempt_at = :now
+    WHERE id = (
+        SELECT o.id FROM sms_outbox o
+        WHERE ((o.status = 'pending' AND o.next_attempt_at <= :now)
+               OR (o.status = 'sending' AND o.last_attempt_at < :stale_before))
+          AND (SELECT COUNT(*) FROM sms_outbox s
+               WHERE s.number = o.number AND s.last_attempt_at >= :window_start
+                 AND s.status IN ('sending', 'sent')) < :rate_limit
+        ORDER BY o.next_attempt_at, o.id
+        LIMIT 1
+    )
+    RETURNING id, number, body, attempts
+'''
+
+MARK_SMS_SENT_SQL = '''
+    UPDATE sms_outbox SET status = 'sent', sid = ?, last_error = NULL WHERE id = ?
+'''
+
+MARK_SMS_RETRY_SQL = '''
+    UPDATE sms_outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?
+'''
+
+MARK_SMS_FAILED_SQL = '''
+    UPDATE sms_outbox SET status = 'failed', last_error = ? WHERE id = ?
+'''
+
+COUNT_SMS_BY_STATUS_SQL = '''
+    SELECT status, COUNT(*) FROM sms_outbox GROUP BY status
+'''
+
+class NotificationQueue:
+    """Durable outbound SMS queue backed by the ``sms_outbox`` table.
+
+    ``send_alert`` only inserts one row per recipient and returns, so the
+    request that raised the alert never waits on Twilio. A pool of worker
+    threads claims due rows, sends them concurrently and retries failures
+    with exponential backoff. The same message to the same number within
+    ``dedup_window`` seconds is queued once, and each number receives at
+    most ``rate_limit`` messages per ``rate_window`` seconds; anything over
+    the limit waits rather than being dropped.
+    """
+
+    def __init__(self, db_manager, sms_service, workers: int = 4, max_attempts: int = 5,
+                 backoff_base: float = 2.0, backoff_max: float = 300.0,
+                 rate_limit: int = 5, rate_window: float = 60.0, dedup_window: float = 300.0,
+                 poll_interval: float = 1.0, claim_timeout: float = 120.0):
+        self.db_manager = db_manager
+        self.sms_service = sms_service
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.dedup_window = dedup_window
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker threads"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'sms-worker-{i}', daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the workers; unsent messages stay queued for the next start"""
+        self._stop_event.set()
+        self._wakeup.set()
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def send_alert(self, message: str, severity: str = 'medium', area_id: int = None) -> int:
+        """Queue an alert for every recipient; returns how many messages were queued"""
+        if not self.sms_service.enabled:
+            logger.info("SMS disabled - would send: %s", message)
+            return 0
+
+        body = self.sms_service.format_message(message, severity)
+        queued = 0
+        for number in self.sms_service.recipients_for(severity, area_id):
+            queued += self.enqueue(number, body, severity, area_id)
+        return queued
+
+    def enqueue(self, number: str, body: str, severity: str = 'medium', area_id: int = None) -> bool:
+        """Queue one message; False if the same one was queued within the dedup window"""
+        now = time.time()
+
+        with self.db_manager.connection() as conn, conn:
+            cursor = conn.execute(ENQUEUE_SMS_SQL, (
+                number, body, severity, area_id, now, now,
+                number, body, now - self.dedup_window
+            ))
+            queued = cursor.rowcount > 0
+
+        if queued:
+            self._wakeup.set()
+        return queued
+
+    def counts(self) -> Dict[str, int]:
+        """Number of outbox messages in each status"""
+        with self.db_manager.connection() as conn:
+            return dict(conn.execute(COUNT_SMS_BY_STATUS_SQL).fetchall())
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until no message is pending or being sent"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            counts = self.counts()
+            if not counts.get('pending') and not counts.get('sending'):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _claim(self) -> Optional[tuple]:
+        now = time.time()
+
+        with self.db_manager.connection() as conn, conn:
+            return conn.execute(CLAIM_SMS_SQL, {
+                'now': now,
+                'stale_before': now - self.claim_timeout,
+                'window_start': now - self.rate_window,
+                'rate_limit': self.rate_limit
+            }).fetchone()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+        # Jitter keeps retries from many messages from arriving together
+        return delay * random.uniform(0.5, 1.0)
+
+    def _deliver(self, message_id: int, number: str, body: str, attempts: int):
+        started = time.perf_counter()
+        try:
+            sid = self.sms_service.send_sms(number, body)
+        except Exception as e:
+            status = getattr(e, 'status', None)
+            # Client errors other than throttling will not succeed on retry
+            permanent = isinstance(status, int) and 400 <= status < 500 and status != 429
+            metrics.observe('lemos_sms_send_duration_seconds', time.perf_counter() - started,
+                            result='failed' if permanent or attempts >= self.max_attempts else 'retry')
+
+            with self.db_manager.connection() as conn, conn:
+                if permanent or attempts >= self.max_attempts:
+                    conn.execute(MARK_SMS_FAILED_SQL, (str(e), message_id))
+                    self.failed += 1
+                    logger.error("Failed to send SMS to %s after %d attempts: %s", number, attempts, e)
+                else:
+                    conn.execute(MARK_SMS_RETRY_SQL, (time.time() + self._backoff(attempts), str(e), message_id))
+                    logger.warning("SMS to %s failed (attempt %d/%d), retrying: %s", number, attempts, self.max_attempts, e)
+            return
+
+        metrics.observe('lemos_sms_send_duration_seconds', time.perf_counter() - started, result='sent')
+        with self.db_manager.connection() as conn, conn:
+            conn.execute(MARK_SMS_SENT_SQL, (sid, message_id))
+        self.sent += 1
+        logger.info("SMS sent to %s: %s", number, sid)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                claimed = self._claim()
+            except Exception:
+                logger.exception("SMS queue error")
+                self._stop_event.wait(self.poll_interval)
+                continue
+
+            if claimed is None:
+                # Idle: wait for a local enqueue, or poll for retries and
+                # messages queued by other processes
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._deliver(*claimed)
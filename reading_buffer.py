@@ -0,0 +1,158 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from services.database import ROLLUP_METRICS
+
+class AreaRing:
+    """One area's newest readings in fixed-size parallel NumPy arrays.
+
+    Slots are reused in place: once the ring is full a new reading takes
+    the slot of the oldest one by timestamp, so a late backlog can never
+    push out fresher data.
+    """
+
+    __slots__ = ('ids', 'epochs', 'values', 'timestamps', 'created_at', 'size',
+                 'loaded', 'synced_id', 'evicted_until', 'checked_at')
+
+    def __init__(self, capacity: int):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.epochs = np.full(capacity, -np.inf)
+        self.values = np.zeros((capacity, len(ROLLUP_METRICS)))
+        self.timestamps = np.empty(capacity, dtype=object)
+        self.created_at = np.empty(capacity, dtype=object)
+        self.size = 0
+
+        self.loaded = False           # seeded from the database
+        self.synced_id = 0            # highest id read from the database
+        self.evicted_until = -np.inf  # newest epoch no longer held
+        self.checked_at = 0.0
+
+    def append(self, reading_id: int, reading: Dict):
+        if self.size and np.any(self.ids[:self.size] == reading_id):
+            return
+
+        epoch = reading['ts'] / 1000
+
+        if self.size < len(self.ids):
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(np.argmin(self.epochs))
+            if epoch <= self.epochs[slot]:
+                self.evicted_until = max(self.evicted_until, epoch)
+                return
+            self.evicted_until = max(self.evicted_until, self.epochs[slot])
+
+        self.ids[slot] = reading_id
+        self.epochs[slot] = epoch
+        self.values[slot] = [reading[metric] for metric in ROLLUP_METRICS]
+        self.timestamps[slot] = reading['timestamp']
+        self.created_at[slot] = reading.get('created_at') or \
+            datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    def rows(self, area_id, slots) -> List[Dict]:
+        """The readings in the given slots, shaped like readings table rows"""
+        columns = ['id', 'area_id', *ROLLUP_METRICS, 'timestamp', 'created_at', 'ts']
+        return [
+            dict(zip(columns, (reading_id, area_id, *values, timestamp, created_at, ts)))
+            for reading_id, values, timestamp, created_at, ts in zip(
+                self.ids[slots].tolist(), self.values[slots].tolist(),
+                self.timestamps[slots], self.created_at[slots],
+                np.rint(self.epochs[slots] * 1000).astype(np.int64).tolist())
+        ]
+
+class ReadingBuffer:
+    """Per-process cache of each area's newest readings for /api/current.
+
+    The ingest path adds every reading it commits, so this worker's own
+    readings are visible at once. An area's ring is seeded from the
+    database on first use, and readings committed by other workers are
+    picked up incrementally by id at most every ``refresh_interval``
+    seconds, a ring's worth at a time. Everything else is answered from
+    memory. Areas without any readings get no ring.
+    """
+
+    def __init__(self, db_manager, capacity: int = 512, refresh_interval: float = 1.0):
+        self.db_manager = db_manager
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._rings = {}  # area_id -> AreaRing
+
+    def add(self, readings: Sequence[Dict], ids: Sequence[int]):
+        """Record readings that have just been committed with the given ids"""
+        with self._lock:
+            for reading, reading_id in zip(readings, ids):
+                area_id = reading['area_id']
+                ring = self._rings.get(area_id)
+                if ring is None:
+                    ring = self._rings[area_id] = AreaRing(self.capacity)
+                ring.append(reading_id, reading)
+
+    def latest(self, area_id) -> Optional[Dict]:
+        """The area's newest reading by timestamp"""
+        with self._lock:
+            ring = self._sync(area_id)
+            if ring is None or not ring.size:
+                return None
+
+            slot = int(np.argmax(ring.epochs[:ring.size]))
+            return ring.rows(area_id, [slot])[0]
+
+    def recent(self, area_id, minutes: float) -> Optional[List[Dict]]:
+        """The area's readings from the last N minutes, newest first; None if the ring does not reach that far back"""
+        cutoff = time.time() - minutes * 60
+
+        with self._lock:
+            ring = self._sync(area_id)
+            if ring is None:
+                return []
+            if cutoff <= ring.evicted_until:
+                return None
+
+            epochs = ring.epochs[:ring.size]
+            slots = np.flatnonzero(epochs >= cutoff)
+            slots = slots[np.argsort(-epochs[slots], kind='stable')]
+            return ring.rows(area_id, slots)
+
+    def _sync(self, area_id) -> Optional[AreaRing]:
+        """Seed or top up an area's ring from the database; None for an area
+        that has never reported. Called with the lock held."""
+        now = time.monotonic()
+        ring = self._rings.get(area_id)
+        if ring is None:
+            # Only areas with readings get a ring, so unknown ids cost no memory
+            if self.db_manager.get_latest_reading(area_id) is None:
+                return None
+            ring = self._rings[area_id] = AreaRing(self.capacity)
+
+        if ring.loaded and now - ring.checked_at >= self.refresh_interval:
+            # Pick up what other workers committed since the last sync, at
+            # most a ring's worth; a longer backlog is reseeded instead
+            rows = self.db_manager.get_area_readings_after(area_id, ring.synced_id, self.capacity)
+            if len(rows) < self.capacity:
+                for row in rows:
+                    ring.append(row['id'], row)
+                if rows:
+                    ring.synced_id = rows[-1]['id']
+                ring.checked_at = now
+            else:
+                ring = self._rings[area_id] = AreaRing(self.capacity)
+
+        if not ring.loaded:
+            rows = self.db_manager.get_recent_area_readings(area_id, self.capacity)
+            for row in reversed(rows):
+                ring.append(row['id'], row)
+            if len(rows) == self.capacity:
+                # Older rows exist in the database but not here
+                ring.evicted_until = max(ring.evicted_until, float(np.min(ring.epochs[:ring.size])))
+            ring.synced_id = max((row['id'] for row in rows), default=0)
+            ring.loaded = True
+            ring.checked_at = now
+
+        return ring
@@ -0,0 +1,200 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional
+
+from services.database import ROLLUP_RESOLUTIONS, DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+class RetentionManager:
+    """Leader-elected background purge of expired readings and alerts.
+
+    Like the forecast scheduler, every worker may start one but only the
+    process holding an exclusive lock on ``lock_path`` does any work. Each
+    pass deletes rows older than the retention window oldest first, at
+    most ``chunk_size`` rows per write transaction with a ``pause`` between
+    chunks, so ingest never waits behind a long delete. Freed pages are
+    then returned to the filesystem with incremental vacuum.
+
+    The rollup tables are pruned in the same pass once their buckets are
+    older than ``rollup_days``, which is usually longer than the raw
+    retention so long-range charts outlive the readings behind them.
+    Rollups are derived data and are never archived. Sent and failed
+    messages in the SMS outbox are dropped after ``sms_days``; pending
+    ones are left for the notification workers.
+
+    With ``archive_dir`` set, each chunk is appended to gzipped NDJSON
+    files, one per table and day, and synced to disk before the rows are
+    deleted. A crash between the two can repeat rows in an archive but
+    never lose them.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, lock_path: str, days: float = 30,
+                 alert_days: Optional[float] = None, rollup_days: float = 365,
+                 sms_days: float = 30, archive_dir: Optional[str] = None,
+                 interval: float = 3600, chunk_size: int = 1000, pause: float = 0.05,
+                 vacuum_pages: int = 256, lock_retry_interval: float = 60):
+        self.db_manager = db_manager
+        self.lock_path = lock_path
+        self.retention_days = {'readings': days, 'alerts': days if alert_days is None else alert_days}
+        self.rollup_days = rollup_days
+        self.sms_days = sms_days
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.lock_retry_interval = lock_retry_interval
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._vacuum_warned = False
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._release_leadership()
+
+    def run_pass(self) -> Dict[str, int]:
+        """Purge (and archive) everything expired, then vacuum; returns counts"""
+        stats = {'readings': 0, 'alerts': 0, 'rollups': 0, 'sms': 0, 'archived': 0, 'freed_pages': 0}
+
+        for table, days in self.retention_days.items():
+            if days <= 0:
+                continue
+            before = int((time.time() - days * 86400) * 1000)
+
+            while not self._stop_event.is_set():
+                rows = self.db_manager.get_expired_rows(table, before, self.chunk_size)
+                if not rows:
+                    break
+                if self.archive_dir:
+                    stats['archived'] += self._archive(table, rows)
+                stats[table] += self.db_manager.delete_rows(table, [row['id'] for row in rows])
+                self._stop_event.wait(self.pause)
+
+        if self.rollup_days > 0:
+            stats['rollups'] = self._prune_rollups(time.time() - self.rollup_days * 86400)
+        if self.sms_days > 0:
+            stats['sms'] = self._prune_chunks(self.db_manager.delete_expired_sms,
+                                              time.time() - self.sms_days * 86400)
+
+        stats['freed_pages'] = self._vacuum()
+
+        if stats['readings'] or stats['alerts'] or stats['rollups'] or stats['sms']:
+            logger.info("Retention removed %d readings, %d alerts, %d rollup buckets and %d SMS, "
+                        "archived %d, freed %d pages", stats['readings'], stats['alerts'], stats['rollups'],
+                        stats['sms'], stats['archived'], stats['freed_pages'], extra=stats)
+        return stats
+
+    def _prune_rollups(self, before: float) -> int:
+        """Delete rollup buckets that start before ``before`` epoch seconds"""
+        return sum(self._prune_chunks(partial(self.db_manager.delete_expired_rollups, resolution), before)
+                   for resolution in ROLLUP_RESOLUTIONS)
+
+    def _prune_chunks(self, delete, before: float) -> int:
+        """Call ``delete(before, chunk_size)`` until it removes less than a full chunk"""
+        deleted = 0
+        while not self._stop_event.is_set():
+            count = delete(before, self.chunk_size)
+            deleted += count
+            if count < self.chunk_size:
+                break
+            self._stop_event.wait(self.pause)
+        return deleted
+
+    def archive_path(self, table: str, day: str) -> str:
+        return os.path.join(self.archive_dir, table, f'{day}.ndjson.gz')
+
+    def _archive(self, table: str, rows: List[Dict]) -> int:
+        """Append rows to their day's archive file and sync it to disk"""
+        by_day = {}
+        for row in rows:
+            try:
+                day = datetime.fromtimestamp(row['ts'] / 1000).strftime('%Y-%m-%d')
+            except (TypeError, ValueError, OverflowError):
+                day = 'undated'
+            by_day.setdefault(day, []).append(row)
+
+        os.makedirs(os.path.join(self.archive_dir, table), exist_ok=True)
+        for day, day_rows in by_day.items():
+            # Every chunk becomes its own gzip member; readers see one stream
+            with open(self.archive_path(table, day), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                    archive.write(''.join(json.dumps(row) + '\n' for row in day_rows).encode())
+                raw.flush()
+                os.fsync(raw.fileno())
+
+        return len(rows)
+
+    def _vacuum(self) -> int:
+        """Hand free pages back in small steps; returns how many were released"""
+        freed = 0
+        remaining = self.db_manager.free_pages()
+        if remaining is None:
+            if not self._vacuum_warned:
+                logger.warning("Database was created without auto_vacuum=INCREMENTAL; deleted space is reused "
+                               "but not released until a one-off VACUUM")
+                self._vacuum_warned = True
+            return 0
+
+        while remaining and not self._stop_event.is_set():
+            left = self.db_manager.incremental_vacuum(self.vacuum_pages)
+            if left >= remaining:
+                break
+            freed += remaining - left
+            remaining = left
+            self._stop_event.wait(self.pause)
+        return freed
+
+    def _acquire_leadership(self) -> bool:
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        logger.info("Retention leadership acquired by pid %d", os.getpid())
+        return True
+
+    def _release_leadership(self):
+        if self._lock_file:
+            # Closing the file releases the flock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.is_leader and not self._acquire_leadership():
+                self._stop_event.wait(self.lock_retry_interval)
+                continue
+
+            try:
+                self.run_pass()
+            except Exception:
+                logger.exception("Retention pass failed")
+            self._stop_event.wait(self.interval)
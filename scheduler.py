@@ -0,0 +1,240 @@
+import fcntl
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from services.database import DatabaseManager
+from ml.forecasting import FORECAST_COLUMNS
+from ml.model_registry import ModelRegistry
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-process database and model registry for pool workers, created on first job
+_worker_services = {}
+
+def _init_pool_process(metrics_enabled: bool, metrics_directory: Optional[str], flush_interval: float):
+    """Spawned children start with a blank registry; record into the parent's metrics directory"""
+    metrics.configure(enabled=metrics_enabled, directory=metrics_directory, flush_interval=flush_interval)
+
+def forecast_area_job(db_path: str, model_dir: str, area_id: int, hours: int,
+                      history_hours: int, retrain_interval: float, compression: str = 'none') -> Dict:
+    """Run in a pool process: refresh an area's model if due and forecast it"""
+    services = _worker_services.get((db_path, model_dir))
+    if services is None:
+        services = (
+            DatabaseManager(db_path, pool_size=1),
+            ModelRegistry(model_dir, max_loaded=4, retrain_interval=retrain_interval,
+                          compression=compression)
+        )
+        _worker_services[(db_path, model_dir)] = services
+    db_manager, registry = services
+
+    marker = db_manager.get_last_reading_marker(area_id)
+    history = db_manager.get_readings_columns(
+        area_id,
+        since=datetime.now() - timedelta(hours=history_hours),
+        columns=FORECAST_COLUMNS
+    )
+
+    result = {'area_id': area_id, 'marker': marker, 'version': None, 'forecast': None}
+    if len(history['timestamp']) < 10:
+        return result
+
+    # Already off the request path, so train inline rather than queueing
+    if registry.needs_training(area_id):
+        registry.train(area_id, history)
+
+    model = registry.get(area_id)
+    with metrics.timer('lemos_forecast_duration_seconds', source='scheduler',
+                       model='fallback' if model is None else 'trained'):
+        if model is None:
+            result['forecast'] = registry.fallback_forecast(history, hours)
+        else:
+            result['version'] = registry.version(area_id)
+            result['forecast'] = model.predict(history, hours)
+
+    # Pool processes may be shut down at any time; write their timings now
+    metrics.flush()
+    return result
+
+class ForecastScheduler:
+    """Leader-elected scheduler that forecasts every active area on its own cadence.
+
+    Every gunicorn worker may start one, but only the process holding an
+    exclusive lock on ``lock_path`` runs passes; the others keep retrying
+    the lock so a new leader takes over if that process exits. Active areas
+    are rediscovered from the readings table, and due areas are forecast in
+    parallel on a process pool. Results go to ``on_forecast(result)``.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, model_dir: str,
+                 on_forecast: Callable[[Dict], None], lock_path: str,
+                 interval: float = 3600, area_intervals: Optional[Dict[int, float]] = None,
+                 hours: int = 48, history_hours: int = 168, retrain_interval: float = 24 * 3600,
+                 workers: Optional[int] = None, discovery_interval: float = 300,
+                 lock_retry_interval: float = 60, compression: str = 'none'):
+        self.db_manager = db_manager
+        self.model_dir = model_dir
+        self.on_forecast = on_forecast
+        self.lock_path = lock_path
+        self.interval = interval
+        self.area_intervals = area_intervals or {}
+        self.hours = hours
+        self.history_hours = history_hours
+        self.retrain_interval = retrain_interval
+        self.workers = workers or os.cpu_count() or 1
+        self.discovery_interval = discovery_interval
+        self.lock_retry_interval = lock_retry_interval
+        self.compression = compression
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self._pool = None
+
+        self._due = []          # heap of (due_at, area_id)
+        self._scheduled = set()
+        self._discovered_at = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='forecast-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._release_leadership()
+
+    def interval_for(self, area_id: int) -> float:
+        return self.area_intervals.get(area_id, self.interval)
+
+    def run_pass(self) -> List[Dict]:
+        """Forecast every area that is due now; returns the results handled"""
+        now = time.time()
+
+        if now - self._discovered_at >= self.discovery_interval:
+            self._discover(now)
+
+        due = []
+        while self._due and self._due[0][0] <= now:
+            _, area_id = heapq.heappop(self._due)
+            self._scheduled.discard(area_id)
+            due.append(area_id)
+
+        if not due:
+            return []
+
+        pool = self._get_pool()
+        futures = {
+            pool.submit(forecast_area_job, self.db_manager.db_path, self.model_dir, area_id,
+                        self.hours, self.history_hours, self.retrain_interval, self.compression): area_id
+            for area_id in due
+        }
+
+        results = []
+        for future in as_completed(futures):
+            area_id = futures[future]
+            try:
+                result = future.result()
+                results.append(result)
+                if result['forecast'] is not None:
+                    self.on_forecast(result)
+            except BrokenProcessPool as e:
+                logger.error("Scheduled forecast failed for area %s: %s", area_id, e)
+                if self._pool is pool:
+                    # Reap the dead pool's manager thread and start a fresh pool next pass
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+            except Exception:
+                logger.exception("Scheduled forecast failed for area %s", area_id)
+
+            self._schedule(area_id, time.time() + self.interval_for(area_id))
+
+        return results
+
+    def _discover(self, now: float):
+        """Pick up areas that started reporting; idle areas drop out when next due"""
+        self._discovered_at = now
+        active = set(self.db_manager.get_active_areas(hours=self.history_hours))
+
+        for area_id in active - self._scheduled:
+            self._schedule(area_id, now)
+
+        # Areas with no recent readings are not rescheduled
+        self._due = [(due_at, area_id) for due_at, area_id in self._due if area_id in active]
+        heapq.heapify(self._due)
+        self._scheduled &= active
+
+    def _schedule(self, area_id: int, due_at: float):
+        if area_id not in self._scheduled:
+            heapq.heappush(self._due, (due_at, area_id))
+            self._scheduled.add(area_id)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a threaded web worker can copy held locks into the child
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_process,
+                initargs=(metrics.enabled, metrics.directory, metrics.flush_interval)
+            )
+        return self._pool
+
+    def _acquire_leadership(self) -> bool:
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        logger.info("Forecast scheduler leadership acquired by pid %d", os.getpid())
+        return True
+
+    def _release_leadership(self):
+        if self._lock_file:
+            # Closing the file releases the flock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _next_wakeup(self) -> float:
+        next_discovery = self._discovered_at + self.discovery_interval
+        next_due = self._due[0][0] if self._due else next_discovery
+        return max(0.0, min(next_due, next_discovery) - time.time())
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if not self.is_leader and not self._acquire_leadership():
+                self._stop_event.wait(self.lock_retry_interval)
+                continue
+
+            try:
+                self.run_pass()
+                self._stop_event.wait(self._next_wakeup())
+            except Exception:
+                logger.exception("Forecast scheduler error")
+                self._stop_event.wait(300)  # Wait 5 minutes before retrying
@@ -1,7 +1,10 @@
+import logging
 import os
 from twilio.rest import Client
 from typing import List
 
+logger = logging.getLogger(__name__)
+
 class SMSService:
     def __init__(self):
         # Twilio credentials (set these as environment variables)
@@ -24,47 +27,63 @@ class SMSService:
         # Initialize Twilio client
         try:
             self.client = Client(self.account_sid, self.auth_token)
+            # Point the client at another API host, e.g. a local fake Twilio server
+            api_base = os.getenv('TWILIO_API_BASE')
+            if api_base:
+                self.client.api.base_url = api_base.rstrip('/')
             self.enabled = True
         except Exception as e:
-            print(f"SMS Service initialization failed: {e}")
+            logger.error("SMS Service initialization failed: %s", e)
             self.enabled = False
     
-    def send_alert(self, message: str, severity: str = 'medium', area_id: int = None):
-        """Send SMS alert to emergency contacts"""
-        if not self.enabled:
-            print(f"SMS disabled - would send: {message}")
-            return
-        
+    def recipients_for(self, severity: str = 'medium', area_id: int = None) -> List[str]:
+        """Numbers an alert of this severity for this area goes to"""
         if area_id and area_id in self.area_contacts:
-            recipients = self.area_contacts[area_id]
+            # Copy so adding emergency contacts never grows area_contacts
+            recipients = list(self.area_contacts[area_id])
             if severity == 'high':
                 # For high severity, also notify general emergency contacts
-                recipients.extend(self.emergency_contacts)
+                recipients += [number for number in self.emergency_contacts if number not in recipients]
         else:
             # Use general emergency contacts for system-wide alerts
-            recipients = self.emergency_contacts
-        
-        # Add severity prefix to message
+            recipients = list(self.emergency_contacts)
+        return recipients
+    
+    def format_message(self, message: str, severity: str = 'medium') -> str:
+        """Add severity prefix to message"""
         severity_prefix = {
             'high': '🚨 URGENT',
             'medium': '⚠️ WARNING',
             'low': 'ℹ️ INFO'
         }
         
-        full_message = f"{severity_prefix.get(severity, '⚠️')} {message}"
+        return f"{severity_prefix.get(severity, '⚠️')} {message}"
+    
+    def send_sms(self, number: str, body: str) -> str:
+        """Send one SMS and return its Twilio SID; raises on failure"""
+        message_obj = self.client.messages.create(
+            body=body,
+            from_=self.from_number,
+            to=number
+        )
+        return message_obj.sid
+    
+    def send_alert(self, message: str, severity: str = 'medium', area_id: int = None):
+        """Send SMS alert to emergency contacts"""
+        if not self.enabled:
+            logger.info("SMS disabled - would send: %s", message)
+            return
+        
+        full_message = self.format_message(message, severity)
         
         # Send SMS to each recipient
-        for number in recipients:
+        for number in self.recipients_for(severity, area_id):
             try:
-                message_obj = self.client.messages.create(
-                    body=full_message,
-                    from_=self.from_number,
-                    to=number
-                )
-                print(f"SMS sent to {number}: {message_obj.sid}")
+                sid = self.send_sms(number, full_message)
+                logger.info("SMS sent to %s: %s", number, sid)
             
             except Exception as e:
-                print(f"Failed to send SMS to {number}: {e}")
+                logger.error("Failed to send SMS to %s: %s", number, e)
     
     def send_test_message(self):
         """Send test message to verify SMS functionality"""
@@ -0,0 +1,59 @@
+import importlib
+import os
+import sqlite3
+
+import pytest
+
+from services.database import DatabaseManager
+
+# Rows written the way the original schema stored them: text timestamps only
+LEGACY_READINGS = [
+    (1, 410.0, 12.0, 24.0, 55.0, 40.0, '2024-01-01T10:00:00+02:00'),
+    (1, 420.0, 13.0, 24.5, 56.0, 41.0, '2024-01-01T08:30:00+00:00'),
+    (2, 430.0, 14.0, 25.0, 57.0, 42.0, '2024-01-01T09:15:00'),
+]
+
+
+@pytest.fixture(scope='session')
+def legacy_readings():
+    return list(LEGACY_READINGS)
+
+
+@pytest.fixture(scope='session')
+def legacy_database(tmp_path_factory):
+    """Creates databases in the original schema, before any migration, with a few readings"""
+    def create():
+        path = str(tmp_path_factory.mktemp('db') / 'lemos.db')
+        db_manager = DatabaseManager(path)
+        db_manager._create_tables()
+        db_manager.close()
+
+        conn = sqlite3.connect(path)
+        with conn:
+            conn.executemany(
+                'INSERT INTO readings (area_id, methane, co, temperature, humidity, water_level, timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', LEGACY_READINGS
+            )
+        conn.close()
+        return path
+    return create
+
+
+@pytest.fixture(scope='session')
+def legacy_db_path(legacy_database):
+    return legacy_database()
+
+
+@pytest.fixture(scope='session')
+def lemos_app(legacy_db_path):
+    """app.py imported against a legacy database with the background services off"""
+    os.environ.update(LEMOS_BACKGROUND='0', LEMOS_DB_PATH=legacy_db_path, LEMOS_INGEST_MODE='sync',
+                      LEMOS_LOG_LEVEL='WARNING')
+    module = importlib.import_module('app')
+    yield module
+    module.db_manager.close()
+
+
+@pytest.fixture
+def client(lemos_app):
+    return lemos_app.app.test_client()
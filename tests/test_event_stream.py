@@ -0,0 +1,49 @@
+"""EventBroadcaster delivery to subscribers that come and go."""
+import json
+import time
+from datetime import datetime
+
+from services.database import DatabaseManager
+from services.event_stream import EventBroadcaster
+
+
+def store(db_manager, area_id, count=1):
+    reading = {'area_id': area_id, 'methane': 400.0, 'co': 10.0, 'temperature': 24.0,
+               'humidity': 55.0, 'water_level': 40.0, 'timestamp': datetime.now().isoformat()}
+    db_manager.store_readings([dict(reading) for _ in range(count)])
+
+
+def received_areas(subscription):
+    """Area ids of the readings delivered before the stream falls quiet"""
+    areas = []
+    for frame in subscription:
+        if frame.startswith(': keepalive'):
+            return areas
+        if frame.startswith('id:'):
+            areas.append(json.loads(frame.split('data: ', 1)[1])['area_id'])
+
+
+def test_subscriber_after_an_idle_spell_skips_rows_committed_meanwhile(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / 'lemos.db'))
+    db_manager.init_database()
+    broadcaster = EventBroadcaster(db_manager, poll_interval=0.05, keepalive=0.5)
+
+    first = broadcaster.subscribe()
+    assert next(first).startswith('retry:')
+    store(db_manager, 1)
+    broadcaster.notify()
+    assert received_areas(first) == [1]
+    first.close()
+
+    # Nobody is listening, so the tailer does not follow these
+    store(db_manager, 2, count=50)
+    broadcaster.notify()
+    time.sleep(0.2)
+
+    second = broadcaster.subscribe()
+    assert next(second).startswith('retry:')
+    store(db_manager, 3)
+    broadcaster.notify()
+    assert received_areas(second) == [3]
+    second.close()
+    db_manager.close()
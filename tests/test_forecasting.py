@@ -0,0 +1,85 @@
+"""prepare_features and to_frame against a row-by-row reference on awkward input."""
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from ml.forecasting import ForecastingModel
+
+
+def reference_features(rows):
+    """The original row-by-row builder, ordering readings by their real (UTC) time"""
+    rows = sorted(rows, key=lambda row: datetime.fromisoformat(row['timestamp']).timestamp())
+    features = []
+    for i in range(4, len(rows)):
+        current_time = datetime.fromisoformat(rows[i]['timestamp'])
+        history = rows[i - 4:i]
+        methane = np.array([row['methane'] for row in history])
+        co = np.array([row['co'] for row in history])
+        features.append([
+            current_time.hour, current_time.weekday(),
+            np.mean(methane), np.std(methane), methane[-1] - methane[0],
+            np.mean(co), np.std(co), co[-1] - co[0],
+            np.mean([row['temperature'] for row in history]), np.mean([row['humidity'] for row in history]),
+            rows[i]['temperature'], rows[i]['humidity'], rows[i]['water_level']
+        ])
+    return np.array(features)
+
+
+def make_rows(times, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {'timestamp': t.isoformat(), 'methane': round(400 + rng.normal(0, 50), 2),
+         'co': round(10 + rng.normal(0, 2), 2), 'temperature': round(25 + rng.normal(0, 3), 2),
+         'humidity': round(50 + rng.normal(0, 10), 2), 'water_level': round(40 + rng.normal(0, 5), 2)}
+        for t in times
+    ]
+
+
+def shuffled(rows, seed=1):
+    rows = list(rows)
+    random.Random(seed).shuffle(rows)
+    return rows
+
+
+@pytest.fixture
+def model(tmp_path):
+    return ForecastingModel(model_path=str(tmp_path), autoload=False)
+
+
+def test_unsorted_input_matches_reference(model):
+    start = datetime(2024, 1, 1)
+    rows = shuffled(make_rows([start + timedelta(seconds=5 * i) for i in range(200)]))
+
+    np.testing.assert_allclose(model.prepare_features(rows), reference_features(rows), rtol=1e-12)
+
+
+def test_gappy_input_matches_reference(model):
+    # Irregular spacing with hour-long and day-long holes, across midnight
+    start = datetime(2024, 1, 6, 22)
+    offsets = np.cumsum(np.random.default_rng(3).choice([5, 60, 3600, 86400], size=120, p=[.7, .2, .08, .02]))
+    rows = shuffled(make_rows([start + timedelta(seconds=int(s)) for s in offsets]))
+
+    np.testing.assert_allclose(model.prepare_features(rows), reference_features(rows), rtol=1e-12)
+
+
+def test_mixed_offsets_are_ordered_by_utc(model):
+    start = datetime(2024, 1, 1, 8, tzinfo=timezone.utc)
+    zones = [timezone(timedelta(hours=hours)) for hours in (-5, 0, 1, 2, 5.5)]
+    times = [(start + timedelta(minutes=7 * i)).astimezone(zones[i % len(zones)]) for i in range(60)]
+    rows = shuffled(make_rows(times))
+
+    np.testing.assert_allclose(model.prepare_features(rows), reference_features(rows))
+
+
+
+def test_to_frame_orders_by_ts_over_timestamp_text():
+    rows = make_rows([datetime(2024, 1, 1, 10, tzinfo=timezone(timedelta(hours=2))),
+                      datetime(2024, 1, 1, 9, tzinfo=timezone.utc)])
+    for row in rows:
+        row['ts'] = int(datetime.fromisoformat(row['timestamp']).timestamp() * 1000)
+
+    # '...10:00:00+02:00' sorts after '...09:00:00+00:00' as text but is an hour earlier
+    frame = ForecastingModel.to_frame(list(reversed(rows)))
+    assert frame['timestamp'].tolist() == [rows[0]['timestamp'], rows[1]['timestamp']]
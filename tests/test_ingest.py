@@ -0,0 +1,177 @@
+"""Reading validation, the group-commit writer and the ingest endpoints."""
+import copy
+import json
+import math
+from datetime import datetime
+
+import pytest
+
+from ingestion.data_processor import DataProcessor
+from ingestion.ingest_writer import IngestWriter
+from services.database import DatabaseManager
+
+NAN_READING = '{"area_id": %d, "methane": NaN, "co": 1, "temperature": 1, "humidity": 1, "water_level": 1}'
+
+
+def make_reading(area_id=1, **values):
+    reading = {'area_id': area_id, 'methane': 400.0, 'co': 10.0, 'temperature': 24.0,
+               'humidity': 55.0, 'water_level': 40.0}
+    reading.update(values)
+    return reading
+
+
+def stored(lemos_app, area_id):
+    return lemos_app.db_manager.get_readings(hours=1, area_id=area_id)
+
+
+@pytest.mark.parametrize('value', [math.nan, math.inf, -math.inf])
+def test_process_reading_rejects_non_finite_values(value):
+    with pytest.raises(ValueError, match='methane must be a finite number'):
+        DataProcessor().process_reading(make_reading(methane=value))
+
+
+def test_process_batch_matches_process_reading():
+    processor = DataProcessor()
+    raw = [make_reading(1), make_reading(2, co=math.nan), make_reading(3, methane='x'),
+           make_reading(1, temperature=999.0), {'area_id': 1}]
+    for reading in raw:
+        reading['timestamp'] = '2024-01-01T10:00:00'
+
+    expected = []
+    for reading in copy.deepcopy(raw):
+        try:
+            expected.append((processor.process_reading(reading), None))
+        except ValueError as e:
+            expected.append((None, str(e)))
+
+    assert processor.process_batch(copy.deepcopy(raw)) == expected
+    # Unparseable text falls back to 0.0 as calibrate_value always has; NaN and missing fields do not
+    assert [error is None for _, error in expected] == [True, False, True, True, False]
+
+
+def test_writer_drops_only_the_entry_that_cannot_be_written(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / 'writer.db'))
+    db_manager.init_database()
+    committed = []
+    writer = IngestWriter(db_manager, flush_interval=0.5, on_commit=lambda readings, ids: committed.extend(ids))
+
+    good = make_reading(timestamp='2024-01-01T10:00:00')
+    # Queued before the writer starts, so all three land in one group commit
+    writer.submit([dict(good)])
+    writer.submit([dict(good, methane=math.nan)])  # NOT NULL violation that skipped validation
+    writer.submit([dict(good, area_id=2)])
+    writer.start()
+    assert writer.flush(timeout=10)
+    writer.stop()
+
+    assert (writer.readings_written, writer.readings_dropped) == (2, 1)
+    assert len(committed) == 2
+    db_manager.close()
+
+
+def test_single_reading_with_nan_is_a_client_error(client, lemos_app):
+    response = client.post('/api/readings', data=NAN_READING % 11, content_type='application/json')
+
+    assert response.status_code == 400
+    assert 'finite' in response.get_json()['error']
+    assert client.post('/api/readings', json=make_reading(11)).status_code == 200
+    assert len(stored(lemos_app, 11)) == 1
+
+
+def test_non_object_body_is_a_client_error(client):
+    assert client.post('/api/readings', json=[make_reading()]).status_code == 400
+
+
+@pytest.mark.parametrize('body, content_type', [
+    ('{"area_id": 1, "methane": ', 'application/json'),
+    ('not json at all', 'application/json'),
+    (json.dumps(make_reading()), 'text/plain'),
+])
+def test_undecodable_body_is_a_client_error(client, body, content_type):
+    response = client.post('/api/readings', data=body, content_type=content_type)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Body must be a JSON object'
+
+
+def test_multi_zone_payload_is_not_mutated(lemos_app):
+    payload = {f'area_{n}': {'area_id': n, 'methane': 400.0, 'co': 10.0, 'temperature': 24.0, 'humidity': 55.0}
+               for n in (1, 2, 3)}
+    payload['water_level'] = 40.0
+    before = copy.deepcopy(payload)
+
+    readings = lemos_app.expand_multi_zone(payload)
+
+    assert payload == before
+    assert [reading['area_id'] for reading in readings] == [1, 2, 3]
+    assert all(reading['water_level'] == 40.0 for reading in readings)
+
+
+def test_batch_rejects_bad_rows_individually(client, lemos_app):
+    multi_zone = {'area_1': {'area_id': 21}, 'area_2': 'not an object', 'area_3': {'area_id': 21}}
+    rows = [make_reading(21), make_reading(21, co=math.nan), multi_zone, 5, make_reading(21, methane=420.0)]
+
+    # The standard encoder writes NaN literally, as a misbehaving device would
+    response = client.post('/api/readings/batch', data=json.dumps(rows), content_type='application/json')
+    body = response.get_json()
+
+    assert response.status_code == 200
+    assert body['status'] == 'partial'
+    assert [result['status'] for result in body['results']] == ['ok', 'error', 'error', 'error', 'ok']
+    assert body['results'][2]['error'] == 'area_2 must be a JSON object'
+    assert body['readings_stored'] == 2
+    assert len(stored(lemos_app, 21)) == 2
+
+
+def test_batch_falls_back_to_row_by_row_on_integrity_errors(client, lemos_app, monkeypatch):
+    process_batch = lemos_app.data_processor.process_batch
+
+    def leaky_process_batch(raw_readings):
+        # Simulate a value validation let through that the database refuses
+        results = process_batch(raw_readings)
+        for processed, _ in results:
+            if processed and processed['methane'] == 123.0:
+                processed['methane'] = math.nan
+        return results
+
+    monkeypatch.setattr(lemos_app.data_processor, 'process_batch', leaky_process_batch)
+    rows = [make_reading(22), make_reading(22, methane=123.0), make_reading(22, methane=410.0)]
+
+    body = client.post('/api/readings/batch', json=rows).get_json()
+
+    assert [result['status'] for result in body['results']] == ['ok', 'error', 'ok']
+    assert body['readings_stored'] == 2
+    assert len(stored(lemos_app, 22)) == 2
+
+
+def test_batch_only_alerts_on_recent_rows(client, lemos_app, monkeypatch):
+    checked = []
+    monkeypatch.setattr(lemos_app, 'check_alerts', checked.append)
+    rows = [make_reading(23, methane=5000.0, timestamp='2020-01-01T00:00:00'),
+            make_reading(23, methane=5000.0, timestamp=datetime.now().isoformat())]
+
+    body = client.post('/api/readings/batch', json=rows).get_json()
+
+    assert body['readings_stored'] == 2
+    assert [reading['timestamp'] for reading in checked] == [rows[1]['timestamp']]
+
+
+def test_ndjson_batch_past_the_row_cap_is_refused(client, lemos_app, monkeypatch):
+    monkeypatch.setattr(lemos_app, 'MAX_BATCH_ROWS', 2)
+    body = '\n'.join(json.dumps(make_reading(24)) for _ in range(3))
+
+    response = client.post('/api/readings/batch', data=body, content_type='application/x-ndjson')
+
+    assert response.status_code == 413
+    assert stored(lemos_app, 24) == []
+
+
+def test_oversized_body_is_refused(client, lemos_app, monkeypatch):
+    monkeypatch.setitem(lemos_app.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    rows = [make_reading(25)] * 20
+
+    for url in ('/api/readings/batch', '/api/readings'):
+        response = client.post(url, json=rows)
+        assert response.status_code == 413
+        assert 'exceeds 1024 bytes' in response.get_json()['error']
+    assert stored(lemos_app, 25) == []
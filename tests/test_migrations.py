@@ -0,0 +1,66 @@
+"""Versioned schema migration of a database in the original schema, directly and on app start."""
+import sqlite3
+
+import pytest
+
+from services.database import MIGRATIONS, DatabaseManager, to_epoch_ms
+
+
+@pytest.fixture
+def migrated_db_path(legacy_database):
+    path = legacy_database()
+    db_manager = DatabaseManager(path)
+    db_manager.init_database()
+    db_manager.close()
+    return path
+
+
+def test_migration_backfills_epoch_timestamps(migrated_db_path, legacy_readings):
+    conn = sqlite3.connect(migrated_db_path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+
+        rows = conn.execute('SELECT ts FROM readings ORDER BY id').fetchall()
+        assert [ts for ts, in rows] == [to_epoch_ms(reading[-1]) for reading in legacy_readings]
+
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'idx_readings_area_ts', 'idx_readings_ts', 'idx_alerts_ts'} <= indexes
+        assert 'idx_readings_area_time' not in indexes
+
+        # Existing readings are folded into the rollups and the latest-reading
+        # table, where 08:30+00:00 is newer than 10:00+02:00
+        assert conn.execute('SELECT SUM(count) FROM readings_rollup_1h').fetchone()[0] == len(legacy_readings)
+        latest = dict(conn.execute('SELECT area_id, methane FROM latest_readings').fetchall())
+        assert latest == {1: 420.0, 2: 430.0}
+    finally:
+        conn.close()
+
+
+def test_migrations_are_idempotent(migrated_db_path, legacy_readings):
+    db_manager = DatabaseManager(migrated_db_path)
+    assert db_manager.migrate() == len(MIGRATIONS)
+    db_manager.init_database()
+    db_manager.close()
+
+    conn = sqlite3.connect(migrated_db_path)
+    try:
+        assert conn.execute('SELECT SUM(count) FROM readings_rollup_1h').fetchone()[0] == len(legacy_readings)
+    finally:
+        conn.close()
+
+
+def test_importing_app_migrates_without_background_services(lemos_app, legacy_db_path):
+    assert lemos_app.ingest_writer is None
+    conn = sqlite3.connect(legacy_db_path)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def test_migrated_database_accepts_readings(client, lemos_app):
+    response = client.post('/api/readings', json={'area_id': 31, 'methane': 400.0, 'co': 10.0, 'temperature': 24.0,
+                                                  'humidity': 55.0, 'water_level': 40.0})
+
+    assert response.status_code == 200
+    assert lemos_app.db_manager.get_latest_reading(31)['ts'] is not None
@@ -0,0 +1,87 @@
+"""NotificationQueue delivery against the fake Twilio API with injected failures."""
+from collections import Counter
+
+import pytest
+
+from benchmarks.fake_twilio import FakeTwilioServer
+from services.database import DatabaseManager
+from services.notification_queue import NotificationQueue
+from services.sms_service import SMSService
+
+ALERTS = [
+    (f"LEMOS ALERT: METHANE level {1200 + i} exceeds threshold 1000 in Area {i % 3 + 1}",
+     'high' if i % 2 else 'medium', i % 3 + 1)
+    for i in range(6)
+]
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / 'lemos.db'))
+    db_manager.init_database()
+    yield db_manager
+    db_manager.close()
+
+
+@pytest.fixture
+def twilio(monkeypatch):
+    """Starts a fake Twilio server and returns an SMSService pointed at it"""
+    servers = []
+
+    def start(fail_every=0):
+        server = FakeTwilioServer(fail_every=fail_every).start()
+        servers.append(server)
+        monkeypatch.setenv('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+        monkeypatch.setenv('TWILIO_AUTH_TOKEN', 'token')
+        monkeypatch.setenv('TWILIO_API_BASE', server.url)
+        return server, SMSService()
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def make_queue(db_manager, sms_service, **kwargs):
+    return NotificationQueue(db_manager, sms_service, workers=4, backoff_base=0.01, rate_limit=100,
+                             poll_interval=0.05, **kwargs)
+
+
+def test_every_message_is_delivered_exactly_once_despite_failures(db_manager, twilio):
+    server, sms_service = twilio(fail_every=3)
+    expected = Counter(
+        (number, sms_service.format_message(message, severity))
+        for message, severity, area_id in ALERTS
+        for number in sms_service.recipients_for(severity, area_id)
+    )
+    queue = make_queue(db_manager, sms_service)
+
+    assert sum(queue.send_alert(*alert) for alert in ALERTS) == sum(expected.values())
+    # The same alerts again inside the dedup window queue nothing
+    assert sum(queue.send_alert(*alert) for alert in ALERTS) == 0
+
+    queue.start()
+    assert queue.wait_idle(timeout=30)
+    queue.stop()
+
+    assert Counter((message['to'], message['body']) for message in server.messages) == expected
+    assert server.requests > len(server.messages)
+    assert queue.counts() == {'sent': sum(expected.values())}
+    with db_manager.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sms_outbox WHERE sid IS NULL").fetchone()[0] == 0
+
+
+def test_messages_fail_after_max_attempts(db_manager, twilio):
+    server, sms_service = twilio(fail_every=1)
+    queue = make_queue(db_manager, sms_service, max_attempts=3)
+
+    queued = queue.send_alert(*ALERTS[0])
+    queue.start()
+    assert queue.wait_idle(timeout=30)
+    queue.stop()
+
+    assert server.messages == []
+    assert server.requests == 3 * queued
+    assert queue.counts() == {'failed': queued}
+    with db_manager.connection() as conn:
+        rows = conn.execute('SELECT attempts, last_error FROM sms_outbox').fetchall()
+    assert all(attempts == 3 and last_error for attempts, last_error in rows)
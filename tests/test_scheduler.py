@@ -0,0 +1,36 @@
+"""ForecastScheduler recovery from a process pool that lost a worker."""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+from services.scheduler import ForecastScheduler
+
+
+class BrokenPool:
+    """Stands in for a ProcessPoolExecutor whose worker was killed"""
+
+    def __init__(self):
+        self.shutdown_calls = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool('A child process terminated abruptly'))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdown_calls.append((wait, cancel_futures))
+
+
+def test_broken_pool_is_shut_down_before_it_is_replaced(tmp_path):
+    db_manager = SimpleNamespace(db_path=str(tmp_path / 'lemos.db'), get_active_areas=lambda hours: [1, 2, 3])
+    forecasts = []
+    scheduler = ForecastScheduler(db_manager, str(tmp_path), forecasts.append, str(tmp_path / 'scheduler.lock'))
+    pool = scheduler._pool = BrokenPool()
+
+    assert scheduler.run_pass() == []
+
+    # Once, however many of its futures report the breakage
+    assert pool.shutdown_calls == [(False, True)]
+    assert scheduler._pool is None
+    assert forecasts == []
+    assert sorted(area_id for _, area_id in scheduler._due) == [1, 2, 3]